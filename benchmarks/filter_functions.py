@@ -0,0 +1,65 @@
+""" Micro-benchmark for filter functions: Compares compiling the filter
+function for every item (the behavior before filter functions were
+cached) with the cached filter function of
+:class:`spykeviewer.plugin_framework.filter_manager.FilterManager.Filter`.
+
+Run from the repository root: ``python benchmarks/filter_functions.py``
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from spykeviewer.plugin_framework.filter_manager import FilterManager
+
+
+class Item(object):
+    def __init__(self, i):
+        self.name = 'Item %d' % i
+        self.index = i
+
+
+def filter_items(manager, items, cached):
+    filters = [f for f, _ in manager.get_active_filters()]
+    ret = []
+    for i in items:
+        for f in filters:
+            if cached:
+                fun = f.function()
+            else:
+                fun = manager._get_filter_function(f)
+            if not fun(i):
+                break
+        else:
+            ret.append(i)
+    return ret
+
+
+def main():
+    for signature in ('unit', 'segment'):
+        manager = FilterManager(signature, '')
+        manager.add_filter('Even', ['return %s.index %% 2 == 0' % signature])
+        manager.add_filter('Named', ['return bool(%s.name)' % signature])
+        manager.add_filter(
+            'Not 7', ['if %s.name.endswith("7"):' % signature,
+                      '\treturn False', 'return True'])
+
+        for num in (1000, 10000):
+            items = [Item(i) for i in xrange(num)]
+            assert filter_items(manager, items, False) == \
+                filter_items(manager, items, True)
+
+            uncached = min(timeit.repeat(
+                lambda: filter_items(manager, items, False),
+                repeat=3, number=1))
+            cached = min(timeit.repeat(
+                lambda: filter_items(manager, items, True),
+                repeat=3, number=1))
+            print '%8s x %5d: compiled per item %.4f s, cached %.4f s ' \
+                  '(%.0fx)' % (signature, num, uncached, cached,
+                               uncached / cached)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+""" Benchmark for restoring a selection in
+:class:`spykeviewer.ui.neo_navigation.NeoNavigationDock`: Creates a
+synthetic Neo hierarchy with many segments, channel groups and units,
+selects everything and measures how long
+:meth:`NeoNavigationDock.set_selection` takes for different sizes.
+
+Needs PyQt4, neo and spykeutils. Run from the repository root:
+``python benchmarks/set_selection.py``
+"""
+import os
+import sys
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import sip
+sip.setapi('QString', 2)
+sip.setapi('QVariant', 2)
+
+from PyQt4.QtGui import QApplication, QMainWindow
+import neo
+from neo.io import PickleIO
+from spykeutils.plugin.data_provider_neo import NeoDataProvider
+
+from spykeviewer.ui.neo_navigation import NeoNavigationDock
+
+
+class BenchmarkWindow(QMainWindow):
+    """ Provides the parts of
+    :class:`spykeviewer.ui.main_window_neo.MainWindowNeo` that are used
+    by the navigation dock, without any filters.
+    """
+    def __init__(self):
+        QMainWindow.__init__(self)
+        self.block_names = OrderedDict()
+        self.block_ids = {}
+        self.block_files = {}
+        self.channel_group_names = {}
+        self.dock = NeoNavigationDock(self)
+
+    def add_file(self, path):
+        for block in NeoDataProvider.get_blocks(path):
+            self.block_ids[block] = self.dock.get_letter_id(
+                len(self.block_names))
+            self.block_names[block] = block.name
+            self.block_files[block] = path
+
+    def get_active_filters(self, filter_type):
+        return []
+
+    def filter_list(self, items, filters):
+        return list(items)
+
+    def is_filtered(self, item, filters):
+        return False
+
+    def refresh_filters(self):
+        pass
+
+
+def create_block(index, segments, channel_groups, channels, units):
+    block = neo.Block(name='Block %d' % index)
+    for s in xrange(segments):
+        seg = neo.Segment(name='Segment %d' % s)
+        seg.block = block
+        block.segments.append(seg)
+    for g in xrange(channel_groups):
+        rcg = neo.RecordingChannelGroup(name='Group %d' % g)
+        rcg.block = block
+        block.recordingchannelgroups.append(rcg)
+        for c in xrange(channels):
+            rc = neo.RecordingChannel(name='Channel %d' % c, index=c)
+            rc.recordingchannelgroups.append(rcg)
+            rcg.recordingchannels.append(rc)
+        for u in xrange(units):
+            unit = neo.Unit(name='Unit %d' % u)
+            unit.recordingchannelgroup = rcg
+            rcg.units.append(unit)
+    return block
+
+
+def selection_data(window):
+    """ Create selection data (as produced by
+    :meth:`spykeviewer.ui.main_window_neo.MainWindowNeo.serialize_selections`)
+    that contains every object of every loaded block.
+    """
+    data = {'blocks': [], 'segments': [], 'channel_groups': [],
+            'channels': [], 'units': []}
+    rcg_idx = 0
+    for b_idx, block in enumerate(window.block_names):
+        data['blocks'].append([NeoDataProvider.block_indices[block],
+                               window.block_files[block]])
+        for s in xrange(len(block.segments)):
+            data['segments'].append([s, b_idx])
+        for g, rcg in enumerate(block.recordingchannelgroups):
+            data['channel_groups'].append([g, b_idx])
+            for c in xrange(len(rcg.recordingchannels)):
+                data['channels'].append([c, rcg_idx])
+            for u in xrange(len(rcg.units)):
+                data['units'].append([u, rcg_idx])
+            rcg_idx += 1
+    return data
+
+
+def main():
+    app = QApplication(sys.argv)
+    directory = tempfile.mkdtemp()
+    try:
+        # (blocks, segments, channel groups, channels, units) per block
+        for blocks, segments, groups, channels, units in (
+                (2, 100, 4, 4, 10), (10, 1000, 10, 4, 20),
+                (10, 5000, 10, 4, 50)):
+            NeoDataProvider.clear()
+            window = BenchmarkWindow()
+            for i in xrange(blocks):
+                path = os.path.join(
+                    directory, '%d_%d_%d.pkl' % (blocks, segments, i))
+                PickleIO(filename=path).write_block(
+                    create_block(i, segments, groups, channels, units))
+                window.add_file(path)
+            window.dock.populate_neo_block_list()
+            data = selection_data(window)
+
+            start = time.time()
+            window.dock.set_selection(data)
+            duration = time.time() - start
+
+            assert len(window.dock.segments()) == len(data['segments'])
+            assert len(window.dock.units()) == len(data['units'])
+            print '%6d segments, %5d units: %.3f s' % (
+                len(data['segments']), len(data['units']), duration)
+            window.close()
+    finally:
+        shutil.rmtree(directory)
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+""" Computations used by the included plugins. The functions work on
+numpy arrays, so they can also be used in worker processes.
+"""
+import sys
+import threading
+import multiprocessing
+
+from .. import api
+
+
+def process_count(tasks, processes=None):
+    """ Return the number of worker processes to use for a number of
+    independent tasks. Only one process (the calling process) is used
+    in frozen applications, which cannot start worker processes, and
+    outside of the main thread: Background jobs run in threads and
+    several of them could start processes at the same time.
+
+    :param int tasks: The number of tasks.
+    :param int processes: The maximum number of processes. Default:
+        ``api.config.analysis_processes``. If this is 0, the number of
+        CPU cores is used.
+    """
+    if hasattr(sys, 'frozen') or \
+            not isinstance(threading.current_thread(), threading._MainThread):
+        return 1
+    if processes is None:
+        processes = api.config.analysis_processes
+    if processes < 1:
+        processes = multiprocessing.cpu_count()
+    return max(1, min(processes, tasks))
+
+
+def imap(function, items, initializer=None, initargs=(), processes=None):
+    """ Generator that applies a function to each item in a list, using a
+    pool of worker processes if more than one process should be used
+    (see :func:`process_count`). Results are returned in the order of
+    the items. Call ``close()`` on the generator if it is not used up,
+    e.g. in a ``finally`` block, so the worker processes are ended.
+
+    :param function function: The function, it needs to be picklable.
+    :param list items: The items.
+    :param function initializer: If given, called with ``initargs`` in
+        each worker process before the first item, or in this process if
+        no workers are used.
+    :param tuple initargs: Arguments for ``initializer``.
+    :param int processes: The maximum number of processes, see
+        :func:`process_count`.
+    """
+    items = list(items)
+    processes = process_count(len(items), processes)
+    if processes < 2:
+        if initializer is not None:
+            initializer(*initargs)
+        for i in items:
+            yield function(i)
+        return
+
+    pool = multiprocessing.Pool(processes, initializer, initargs)
+    try:
+        for result in pool.imap(function, items):
+            yield result
+    finally:
+        pool.terminate()
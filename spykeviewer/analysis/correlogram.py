@@ -0,0 +1,158 @@
+from __future__ import division
+
+import numpy as np
+
+from . import imap
+
+
+def correlogram_bins(bin_size, cut_off):
+    """ Return the bin borders for correlograms. Like in
+    :func:`spykeutils.correlations.correlogram`, 0 is at the center of
+    the central bin.
+
+    :param float bin_size: The size of each bin.
+    :param float cut_off: The maximum time lag.
+    """
+    half_bins = np.arange(bin_size / 2, cut_off, bin_size)
+    return np.concatenate((-half_bins[::-1], half_bins))
+
+
+def cross_counts(train1, train2, bins, chunk_size=4096):
+    """ Return the histogram of time differences ``t1 - t2`` for all
+    pairs of spikes ``t1`` from ``train1`` and ``t2`` from ``train2``.
+    The result is identical to the histogram of all pairwise differences,
+    but only pairs within the range of the bins are considered: The
+    matching spikes for each spike in ``train2`` are found with a binary
+    search in the sorted ``train1``.
+
+    :param train1: The first spike train.
+    :type train1: 1D array
+    :param train2: The second spike train.
+    :type train2: 1D array
+    :param bins: The bin borders, see :func:`numpy.histogram`.
+    :type bins: 1D array
+    :param int chunk_size: Number of spikes of ``train2`` that are
+        processed at once.
+    """
+    train1 = np.sort(np.asarray(train1, dtype=float).ravel())
+    train2 = np.asarray(train2, dtype=float).ravel()
+    counts = np.zeros(len(bins) - 1, dtype=np.int64)
+    if not len(train1) or not len(train2):
+        return counts
+
+    # Search in a slightly larger range, np.histogram decides about the
+    # spikes at the borders
+    margin = bins[1] - bins[0]
+    for i in xrange(0, len(train2), chunk_size):
+        t2 = train2[i:i + chunk_size]
+        lo = train1.searchsorted(t2 + (bins[0] - margin), 'left')
+        hi = train1.searchsorted(t2 + (bins[-1] + margin), 'right')
+        n = hi - lo
+        total = n.sum()
+        if not total:
+            continue
+        starts = np.repeat(lo - (np.cumsum(n) - n), n)
+        diffs = train1[np.arange(total) + starts] - np.repeat(t2, n)
+        counts += np.histogram(diffs, bins)[0]
+    return counts
+
+
+# Spike trains and bins in worker processes, set by _init_worker
+_trains = None
+_bins = None
+
+
+def _init_worker(trains, bins):
+    global _trains, _bins
+    _trains = trains
+    _bins = bins
+
+
+def _row_counts(i1):
+    """ Return the summed counts over all trials of unit ``i1`` with all
+    units ``i2 >= i1``.
+    """
+    counts = np.zeros((len(_trains) - i1, len(_bins) - 1))
+    middle_bin = len(_bins) // 2 - 1
+    for k, i2 in enumerate(xrange(i1, len(_trains))):
+        for train1, train2 in zip(_trains[i1], _trains[i2]):
+            counts[k] += cross_counts(train1, train2, _bins)
+            if i1 == i2:  # Correction for autocorrelogram
+                counts[k, middle_bin] -= len(train2)
+    return counts
+
+
+def border_corrector(trains, bin_size, cut_off):
+    """ Return the border correction factors for correlograms as
+    calculated by :func:`spykeutils.correlations.correlogram` with
+    ``border_correction=True``.
+
+    :param list trains: The spike trains as list of lists of 1D arrays,
+        one list per unit.
+    :param float bin_size: The size of each bin in milliseconds.
+    :param float cut_off: The maximum time lag in milliseconds.
+    """
+    maxima = [t.max() if len(t) else 0 for l in trains for t in l]
+    minima = [t.min() if len(t) else 2 ** 22 for l in trains for t in l]
+    train_length = max(maxima) - min(minima)
+
+    l = len(correlogram_bins(bin_size, cut_off)) // 2
+    c_end = max(train_length - l * bin_size + 1, 1)
+    return train_length / np.concatenate(
+        (np.linspace(c_end, train_length, l - 1, False),
+         np.linspace(train_length, c_end, l)))
+
+
+def correlograms(trains, bin_size, cut_off, border_correction=True,
+                 duration=None, processes=None, progress=None):
+    """ Compute all auto- and cross-correlograms of a number of units.
+    The results are equal to those of
+    :func:`spykeutils.correlations.correlogram`, but only spike pairs
+    within the cut off are considered and the unit pairs are distributed
+    over multiple processes.
+
+    :param list trains: The spike trains in milliseconds as list of lists
+        of 1D arrays, one list per unit. Each unit needs the same number
+        of spike trains (e.g. one per segment).
+    :param float bin_size: The size of each bin in milliseconds.
+    :param float cut_off: The maximum time lag in milliseconds.
+    :param bool border_correction: Apply correction for less data at
+        higher time lags.
+    :param float duration: If given, the counts are divided by this
+        duration in seconds. Otherwise, counts per spike train are
+        returned.
+    :param int processes: Maximum number of worker processes, see
+        :func:`spykeviewer.analysis.process_count`. If 1, the
+        correlograms are computed in this process.
+    :param progress: Set this parameter to report progress. One step is
+        reported for each unit.
+    :type progress: :class:`spykeutils.progress_indicator.ProgressIndicator`
+    :returns: The correlograms as array with shape (units, units, bins)
+        and the bin borders. ``c[i1, i2]`` is the histogram of spike
+        times of unit ``i1`` relative to spike times of unit ``i2``.
+    """
+    trains = [[np.asarray(t, dtype=float).ravel() for t in l]
+              for l in trains]
+    bins = correlogram_bins(bin_size, cut_off)
+    num_units = len(trains)
+    num_trains = len(trains[0])
+
+    values = np.empty((num_units, num_units, len(bins) - 1))
+    rows = imap(_row_counts, xrange(num_units), _init_worker,
+                (trains, bins), processes)
+    try:
+        for i1, counts in enumerate(rows):
+            values[i1, i1:] = counts
+            values[i1:, i1] = counts[:, ::-1]
+            if progress:
+                progress.step()
+    finally:
+        rows.close()
+        _init_worker(None, None)
+
+    if duration is not None:
+        values /= duration
+    if border_correction:
+        values *= border_corrector(trains, bin_size, cut_off)
+    values /= num_trains
+    return values, bins
@@ -0,0 +1,48 @@
+import numpy as np
+
+
+class ISIHistogram(object):
+    """ Interspike interval histograms of multiple series with fixed bins.
+    Spike trains are added one at a time and only the counts are kept,
+    so the histograms of many spike trains can be computed while only one
+    spike train is in memory.
+    """
+    def __init__(self, bins, keys=None):
+        """ Create empty histograms.
+
+        :param bins: The bin borders, see :func:`numpy.histogram`.
+        :type bins: 1D array
+        :param sequence keys: Keys of the series in the order they should
+            appear in :attr:`counts`. Series for other keys are appended
+            when the first spike train for them is added.
+        """
+        self.bins = np.asarray(bins, dtype=float)
+        self.keys = []
+        self._rows = {}
+        self.counts = np.zeros((0, max(len(self.bins) - 1, 0)),
+                               dtype=np.int64)
+        self.num_trains = np.zeros(0, dtype=np.int64)
+        for k in keys or []:
+            self._row(k)
+
+    def _row(self, key):
+        if key not in self._rows:
+            self._rows[key] = len(self.keys)
+            self.keys.append(key)
+            self.counts = np.vstack(
+                (self.counts, np.zeros((1, self.counts.shape[1]),
+                                       dtype=np.int64)))
+            self.num_trains = np.append(self.num_trains, 0)
+        return self._rows[key]
+
+    def add(self, key, train):
+        """ Add the intervals of a spike train to a histogram.
+
+        :param key: The key of the series.
+        :param train: The spike times. They do not need to be sorted.
+        :type train: 1D array
+        """
+        row = self._row(key)
+        intervals = np.diff(np.sort(np.asarray(train, dtype=float).ravel()))
+        self.counts[row] += np.histogram(intervals, self.bins)[0]
+        self.num_trains[row] += 1
@@ -0,0 +1,117 @@
+from __future__ import division
+
+import numpy as np
+
+
+def flatten_trains(trains):
+    """ Concatenate spike trains into one array.
+
+    :param list trains: The spike times as list of 1D arrays.
+    :returns: The concatenated spike times and an array with the index
+        of the train for each spike.
+    """
+    lengths = [len(t) for t in trains]
+    if not trains:
+        return np.zeros(0), np.zeros(0, dtype=np.int64)
+    times = np.concatenate(
+        [np.asarray(t, dtype=float).ravel() for t in trains])
+    indices = np.repeat(np.arange(len(trains)), lengths)
+    return times, indices
+
+
+def psth(times, train_indices, train_units, train_segments, t_starts,
+         t_stops, num_units, bin_size, start=-np.inf, stop=np.inf,
+         offsets=None, rate_correction=True):
+    """ Compute peri stimulus time histograms for multiple units from
+    spike trains in flat arrays (see :func:`flatten_trains`). The results
+    are the same as from :func:`spykeutils.rate_estimation.psth` with
+    spike trains aligned by
+    :func:`spykeutils.rate_estimation.aligned_spike_trains`, but all
+    trains are aligned with one subtraction and all histograms are
+    counted at once.
+
+    All times are in milliseconds.
+
+    :param times: The spike times of all spike trains.
+    :type times: 1D array
+    :param train_indices: The index of the spike train for each spike.
+    :type train_indices: 1D array
+    :param train_units: The index of the unit for each spike train.
+    :type train_units: 1D array
+    :param train_segments: The index of the segment for each spike train.
+        Only needed if ``offsets`` are given.
+    :type train_segments: 1D array
+    :param t_starts: The start time of each spike train.
+    :type t_starts: 1D array
+    :param t_stops: The stop time of each spike train.
+    :type t_stops: 1D array
+    :param int num_units: The number of units.
+    :param float bin_size: The bin size.
+    :param float start: The desired time for the start of the first bin.
+        It will be recalculated if there are spike trains which start
+        later than this time.
+    :param float stop: The desired time for the end of the last bin. It
+        will be recalculated if there are spike trains which end earlier
+        than this time.
+    :param offsets: If given, the spike trains are aligned by subtracting
+        the offset of their segment. Spike trains in segments where the
+        offset is NaN are ignored.
+    :type offsets: 1D array
+    :param bool rate_correction: Determines if the histograms are
+        averaged over spike trains (``True``) or summed (``False``). In
+        both cases, the values are divided by the bin size in seconds.
+    :returns: The histograms as array with shape (units, bins) and the
+        bin borders.
+    """
+    times = np.asarray(times, dtype=float)
+    train_indices = np.asarray(train_indices, dtype=np.int64)
+    train_units = np.asarray(train_units, dtype=np.int64)
+    t_starts = np.asarray(t_starts, dtype=float)
+    t_stops = np.asarray(t_stops, dtype=float)
+
+    if offsets is not None:
+        train_offsets = np.asarray(offsets, dtype=float)[
+            np.asarray(train_segments, dtype=np.int64)]
+        aligned = ~np.isnan(train_offsets)
+        train_offsets[~aligned] = 0.0
+        times = times - train_offsets[train_indices]
+        t_starts = t_starts - train_offsets
+        t_stops = t_stops - train_offsets
+
+        spikes = aligned[train_indices]
+        times = times[spikes]
+        train_indices = train_indices[spikes]
+        train_units = train_units[aligned]
+        t_starts = t_starts[aligned]
+        t_stops = t_stops[aligned]
+        # Index of each remaining spike train
+        new_indices = np.cumsum(aligned) - 1
+        train_indices = new_indices[train_indices]
+
+    # Shortest interval shared by all spike trains
+    if len(t_starts):
+        start = max(start, t_starts.max())
+        stop = min(stop, t_stops.min())
+    if stop == np.inf:
+        stop = start
+
+    duration = stop - start
+    num_bins = duration / bin_size
+    if num_bins <= 0:
+        return np.zeros((num_units, 0)), np.array([start])
+    bins = np.arange(num_bins + 1) * (duration / num_bins) + start
+    nb = len(bins) - 1
+
+    # Bins like numpy.histogram: The last bin includes its right border
+    bin_indices = bins.searchsorted(times, 'right') - 1
+    bin_indices[times == bins[-1]] = nb - 1
+    inside = (bin_indices >= 0) & (bin_indices < nb)
+    flat = (train_units[train_indices[inside]] * nb + bin_indices[inside])
+    values = np.bincount(flat, minlength=num_units * nb).reshape(
+        num_units, nb).astype(float)
+
+    if rate_correction:
+        num_trains = np.bincount(train_units, minlength=num_units)
+        values[num_trains > 0] /= num_trains[num_trains > 0, np.newaxis]
+    values *= 1000.0 / bin_size
+    return values, bins
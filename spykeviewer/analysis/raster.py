@@ -0,0 +1,57 @@
+import numpy as np
+
+
+class SpikeRaster(object):
+    """ Spike times of multiple spike trains in one contiguous array. The
+    times of each train are sorted and stored after the times of the
+    previous train.
+    """
+    def __init__(self, trains):
+        """ Create the raster.
+
+        :param list trains: The spike times as list of 1D arrays.
+        """
+        lengths = [len(t) for t in trains]
+        self.offsets = np.concatenate(([0], np.cumsum(lengths))).astype(int)
+        self.times = np.empty(self.offsets[-1])
+        for i, t in enumerate(trains):
+            self.times[self.offsets[i]:self.offsets[i + 1]] = \
+                np.sort(np.asarray(t, dtype=float).ravel())
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def row(self, index):
+        """ Return the sorted spike times of a train.
+        """
+        return self.times[self.offsets[index]:self.offsets[index + 1]]
+
+    def visible(self, start, stop):
+        """ Return the spike times of each train within a time range.
+
+        :returns: A list with a 1D array for each train.
+        """
+        ret = []
+        for i in xrange(len(self)):
+            row = self.row(i)
+            ret.append(row[row.searchsorted(start):
+                           row.searchsorted(stop, 'right')])
+        return ret
+
+    def binarize(self, start, stop, columns):
+        """ Return which columns of an image of a time range contain
+        spikes.
+
+        :param float start: Start of the time range.
+        :param float stop: End of the time range.
+        :param int columns: Number of columns of the image.
+        :returns: A boolean array with shape (trains, columns).
+        """
+        edges = np.linspace(start, stop, columns + 1)
+        image = np.zeros((len(self), columns), dtype=bool)
+        for i in xrange(len(self)):
+            row = self.row(i)
+            indices = row.searchsorted(edges)
+            indices[-1] = row.searchsorted(stop, 'right')
+            image[i] = np.diff(indices) > 0
+        return image
@@ -0,0 +1,192 @@
+from __future__ import division
+
+import numpy as np
+
+from . import imap
+
+
+def binned_trains(trains, start, stop, num_bins=1024):
+    """ Return the binned spike counts of multiple units. All spike
+    trains of a unit are collapsed into one histogram, like with
+    :func:`spykeutils.rate_estimation.collapsed_spike_trains` and
+    :func:`spykeutils.tools.bin_spike_trains`.
+
+    :param list trains: The spike trains as list of lists of 1D arrays,
+        one list per unit.
+    :param float start: The start of the first bin.
+    :param float stop: The end of the last bin. Spikes at this time are
+        included in the last bin.
+    :param int num_bins: The number of bins.
+    :returns: The spike counts as array with shape (units, bins).
+    """
+    duration = stop - start
+    bins = np.arange(num_bins + 1) * (duration / num_bins) + start
+    counts = np.zeros((len(trains), num_bins))
+    for i, l in enumerate(trains):
+        for t in l:
+            counts[i] += np.histogram(np.asarray(t, dtype=float), bins)[0]
+    return counts
+
+
+def gauss_kernels(kernel_sizes, dt, num_bins=2048):
+    """ Return Gaussian kernels discretized like with
+    :func:`spykeutils.signal_processing.discretize_kernel` with
+    ``ensure_unit_area=True``.
+
+    :param kernel_sizes: The standard deviation for each kernel.
+    :type kernel_sizes: 1D array
+    :param float dt: The bin size.
+    :param int num_bins: The number of bins in each kernel.
+    :returns: The kernels as array with shape (kernels, bins).
+    """
+    t = np.arange(-num_bins // 2, num_bins // 2) * dt
+    sizes = np.asarray(kernel_sizes, dtype=float).reshape(-1, 1)
+    k = np.exp(-0.5 * (t / sizes) ** 2)
+    return k / (k.sum(axis=1)[:, np.newaxis] * dt)
+
+
+def _fft_size(n):
+    return 1 << int(np.ceil(np.log2(n)))
+
+
+def fft_smooth(spectra, kernels, num_bins):
+    """ Convolve binned data with kernels. The result for each pair of
+    data row and kernel is the same as from :func:`scipy.signal.convolve`
+    in 'same' mode.
+
+    :param spectra: The real FFT of the zero padded binned data (see
+        :func:`numpy.fft.rfft`) with one row for each data set. The FFT
+        size has to be at least ``num_bins + kernel bins - 1``.
+    :type spectra: 2D array
+    :param kernels: The kernels, one per row.
+    :type kernels: 2D array
+    :param int num_bins: The number of bins of the binned data.
+    :returns: The smoothed data with shape (data sets, kernels, bins).
+    """
+    size = 2 * (spectra.shape[1] - 1)
+    k = np.fft.rfft(kernels, size)
+    full = np.fft.irfft(spectra[:, np.newaxis, :] * k[np.newaxis], size)
+    offset = (kernels.shape[1] - 1) // 2
+    return full[:, :, offset:offset + num_bins]
+
+
+# Binned data in worker processes, set by _init_worker
+_hists = None
+_spectra = None
+_counts = None
+_dt = None
+
+
+def _init_worker(hists, spectra, counts, dt):
+    global _hists, _spectra, _counts, _dt
+    _hists = hists
+    _spectra = spectra
+    _counts = counts
+    _dt = dt
+
+
+def _step_costs(kernel_size):
+    """ Return the cost of one kernel size for all units. Implements
+    the cost function used by
+    :func:`spykeutils.rate_estimation.optimal_gauss_kernel_size`.
+    """
+    kernel = gauss_kernels([2 * kernel_size], _dt)
+    yh = fft_smooth(_spectra, kernel, _hists.shape[1])[:, 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c = ((yh ** 2).sum(axis=1) * _dt -
+             2 * (yh * _hists).sum(axis=1) * _dt +
+             2 / np.sqrt(2 * np.pi) / kernel_size / _counts)
+    return c * _counts ** 2
+
+
+def kernel_size_costs(counts, dt, kernel_sizes, processes=None,
+                      progress=None):
+    """ Compute the cost of Gaussian kernel sizes for spike density
+    estimations using the algorithm from (Shimazaki, Shinomoto. Journal
+    of Computational Neuroscience. 2010). The costs are the same as in
+    :func:`spykeutils.rate_estimation.optimal_gauss_kernel_size`, but the
+    binned data of all units is transformed only once and the
+    convolutions are done with FFTs. The kernel sizes are distributed
+    over multiple processes.
+
+    :param counts: The binned spike counts, one row per unit (see
+        :func:`binned_trains`).
+    :type counts: 2D array
+    :param float dt: The bin size.
+    :param kernel_sizes: The kernel sizes to try.
+    :type kernel_sizes: 1D array
+    :param int processes: Maximum number of worker processes, see
+        :func:`spykeviewer.analysis.process_count`. If 1, the costs are
+        computed in this process.
+    :param progress: Set this parameter to report progress. One step is
+        reported for each kernel size.
+    :type progress: :class:`spykeutils.progress_indicator.ProgressIndicator`
+    :returns: The costs as array with shape (units, kernel sizes). Units
+        without spikes have NaN costs.
+    """
+    counts = np.atleast_2d(np.asarray(counts, dtype=float))
+    kernel_sizes = np.asarray(kernel_sizes, dtype=float)
+    num_spikes = counts.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hists = counts / num_spikes[:, np.newaxis] / dt
+    hists[num_spikes == 0] = 0.0
+    spectra = np.fft.rfft(
+        hists, _fft_size(hists.shape[1] + 2048 - 1), axis=1)
+
+    costs = np.empty((len(counts), len(kernel_sizes)))
+    steps = imap(_step_costs, kernel_sizes, _init_worker,
+                 (hists, spectra, num_spikes, dt), processes)
+    try:
+        for i, c in enumerate(steps):
+            costs[:, i] = c
+            if progress:
+                progress.step()
+    finally:
+        steps.close()
+        _init_worker(None, None, None, None)
+
+    costs[num_spikes == 0] = np.nan
+    return costs
+
+
+def best_kernel_sizes(costs, kernel_sizes):
+    """ Return the kernel size with the smallest cost for each unit. For
+    units without valid costs, the first kernel size is returned.
+
+    :param costs: The costs from :func:`kernel_size_costs`.
+    :type costs: 2D array
+    :param kernel_sizes: The kernel sizes for the columns of ``costs``.
+    :type kernel_sizes: 1D array
+    """
+    kernel_sizes = np.asarray(kernel_sizes, dtype=float)
+    valid = np.where(np.isnan(costs), np.inf, costs)
+    return kernel_sizes[valid.argmin(axis=1)]
+
+
+def densities(counts, num_trains, dt, kernel_sizes):
+    """ Compute spike density estimations with Gaussian kernels. The
+    results are the same as from
+    :func:`spykeutils.rate_estimation.spike_density_estimation` with
+    Gaussian kernels.
+
+    :param counts: The binned spike counts, one row per unit (see
+        :func:`binned_trains`).
+    :type counts: 2D array
+    :param num_trains: The number of spike trains for each unit.
+    :type num_trains: 1D array
+    :param float dt: The bin size in milliseconds.
+    :param kernel_sizes: The kernel size for each unit in milliseconds.
+    :type kernel_sizes: 1D array
+    :returns: The estimated rates in Hz as array with shape
+        (units, bins).
+    """
+    counts = np.atleast_2d(np.asarray(counts, dtype=float))
+    spectra = np.fft.rfft(
+        counts, _fft_size(counts.shape[1] + 2048 - 1), axis=1)
+    kernels = gauss_kernels(kernel_sizes, dt)
+    values = np.empty(counts.shape)
+    for i in xrange(len(counts)):
+        values[i] = fft_smooth(
+            spectra[i:i + 1], kernels[i:i + 1], counts.shape[1])[0, 0]
+    num_trains = np.asarray(num_trains, dtype=float)
+    return values / num_trains[:, np.newaxis] * 1000.0
@@ -0,0 +1,211 @@
+from __future__ import division
+
+import os
+import tempfile
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from . import imap
+
+
+def spectrogram_shape(num_samples, nfft, noverlap=None, max_columns=0):
+    """ Return the shape of the spectrogram image for a signal and the
+    number of FFT segments that are averaged for each column.
+
+    :param int num_samples: Number of samples in the signal.
+    :param int nfft: Number of samples per FFT segment.
+    :param int noverlap: Number of samples that consecutive segments
+        overlap. Default: ``nfft / 2``
+    :param int max_columns: Maximum number of time bins. If 0, every
+        segment is a time bin.
+    :returns: A tuple of the image shape (frequencies, time bins) and the
+        number of segments per time bin.
+    """
+    if noverlap is None:
+        noverlap = nfft // 2
+    step = nfft - noverlap
+    segments = max((num_samples - noverlap) // step, 0)
+    factor = 1
+    if max_columns and segments > max_columns:
+        factor = -(-segments // max_columns)
+    return (nfft // 2 + 1, -(-segments // factor)), factor
+
+
+def spectrogram(data, sampling_rate, nfft, noverlap=None, max_columns=0,
+                out=None, memmap=False, chunk_size=2 ** 22):
+    """ Compute the log power spectral density of a signal over time.
+
+    The spectrogram equals the logarithm of the PSD returned by
+    :func:`matplotlib.mlab.specgram` with default parameters (Hanning
+    window, no detrending, one-sided). The signal is processed in chunks
+    of segments, so the memory needed is independent of the signal length
+    except for the image itself. The time axis can be reduced to a
+    maximum number of bins by averaging the power of consecutive
+    segments.
+
+    :param data: The signal.
+    :type data: 1D array
+    :param float sampling_rate: The sampling rate of the signal in Hz.
+    :param int nfft: Number of samples per FFT segment.
+    :param int noverlap: Number of samples that consecutive segments
+        overlap. Default: ``nfft / 2``
+    :param int max_columns: Maximum number of time bins. If 0, every
+        segment is a time bin.
+    :param out: Array to write the image to, with the shape returned by
+        :func:`spectrogram_shape`. If ``None``, a new float32 array is
+        created.
+    :param bool memmap: If ``True`` and ``out`` is ``None``, the image is
+        created as a memory-mapped temporary file.
+    :param int chunk_size: Approximate number of values that are
+        transformed at once.
+    :returns: The image (frequencies x time bins), the frequencies in Hz
+        and the centers of the time bins in seconds relative to the start
+        of the signal.
+    """
+    data = np.asarray(data).ravel()
+    if noverlap is None:
+        noverlap = nfft // 2
+    step = nfft - noverlap
+    shape, factor = spectrogram_shape(len(data), nfft, noverlap, max_columns)
+    segments = max((len(data) - noverlap) // step, 0)
+
+    if out is None:
+        if memmap:
+            out = np.memmap(tempfile.TemporaryFile(), dtype=np.float32,
+                            mode='w+', shape=shape)
+        else:
+            out = np.empty(shape, dtype=np.float32)
+
+    window = np.hanning(nfft)
+    # PSD scaling, doubled for the negative frequencies except DC and
+    # (for even nfft) the Nyquist frequency
+    scale = np.empty(shape[0])
+    scale.fill(2.0 / (sampling_rate * (window ** 2).sum()))
+    scale[0] /= 2.0
+    if nfft % 2 == 0:
+        scale[-1] /= 2.0
+
+    # Chunks contain whole time bins
+    bins_per_chunk = max(chunk_size // (nfft * factor), 1)
+    seg_per_chunk = bins_per_chunk * factor
+    stride = data.strides[0]
+    tiny = np.finfo(np.float32).tiny
+    for first in xrange(0, segments, seg_per_chunk):
+        num = min(seg_per_chunk, segments - first)
+        frames = as_strided(data[first * step:], shape=(num, nfft),
+                            strides=(step * stride, stride))
+        power = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2
+        power *= scale
+
+        # Average segments in each time bin
+        bins = -(-num // factor)
+        pad = bins * factor - num
+        if pad:
+            sums = np.add.reduceat(power, np.arange(0, num, factor), axis=0)
+            counts = np.diff(np.append(np.arange(0, num, factor), num))
+            power = sums / counts[:, None]
+        elif factor > 1:
+            power = power.reshape(bins, factor, -1).mean(axis=1)
+
+        column = first // factor
+        out[:, column:column + bins] = np.log(np.maximum(power, tiny)).T
+
+    freqs = np.arange(shape[0]) * (sampling_rate / nfft)
+    # Centers of the segments in each time bin
+    first_centers = np.arange(0, segments, factor) * step + nfft / 2
+    last_centers = np.minimum(first_centers + (factor - 1) * step,
+                              (segments - 1) * step + nfft / 2)
+    times = (first_centers + last_centers) / (2 * sampling_rate)
+    return out, freqs, times
+
+
+# Signals in worker processes, set by _init_worker. The signals are
+# inherited when worker processes are forked instead of being sent to
+# them with each job.
+_signals = None
+
+
+def _init_worker(signals):
+    global _signals
+    _signals = signals
+
+
+def _spectrogram_job(args):
+    """ Compute a spectrogram in a worker process. If an output file is
+    given, the image is written to it instead of being returned.
+    """
+    index, sampling_rate, nfft, noverlap, max_columns, out_file = args
+    data = _signals[index]
+    out = None
+    if out_file:
+        shape = spectrogram_shape(len(data), nfft, noverlap, max_columns)[0]
+        out = np.memmap(out_file, dtype=np.float32, mode='r+', shape=shape)
+    image, freqs, times = spectrogram(
+        data, sampling_rate, nfft, noverlap, max_columns, out)
+    if out_file:
+        out.flush()
+        image = None
+    return image, freqs, times
+
+
+def spectrograms(signals, sampling_rates, nfft, noverlap=None,
+                 max_columns=0, memmap_values=0, processes=None,
+                 progress=None):
+    """ Compute spectrograms of multiple signals in parallel processes.
+    See :func:`spectrogram` for details on the computation.
+
+    :param list signals: The signals as 1D arrays.
+    :param list sampling_rates: The sampling rate of each signal in Hz.
+    :param int nfft: Number of samples per FFT segment.
+    :param int noverlap: Number of samples that consecutive segments
+        overlap. Default: ``nfft / 2``
+    :param int max_columns: Maximum number of time bins. If 0, every
+        segment is a time bin.
+    :param int memmap_values: Images with more values are created as
+        memory-mapped temporary files. If 0, no files are used.
+    :param int processes: Maximum number of worker processes, see
+        :func:`spykeviewer.analysis.process_count`. If 1, all
+        spectrograms are computed in this process.
+    :param progress: Set this parameter to report progress. One step is
+        reported for each finished spectrogram.
+    :type progress: :class:`spykeutils.progress_indicator.ProgressIndicator`
+    :returns: A list with a tuple of image, frequencies and times (as
+        returned by :func:`spectrogram`) for each signal, in the order of
+        ``signals``.
+    """
+    signals = [np.asarray(data).ravel() for data in signals]
+    outs = []
+    jobs = []
+    for i, (data, rate) in enumerate(zip(signals, sampling_rates)):
+        shape = spectrogram_shape(len(data), nfft, noverlap, max_columns)[0]
+        out_file = None
+        out = None
+        if memmap_values and shape[0] * shape[1] > memmap_values:
+            fd, out_file = tempfile.mkstemp(suffix='.spectrogram')
+            os.close(fd)
+            out = np.memmap(out_file, dtype=np.float32, mode='w+',
+                            shape=shape)
+        outs.append(out)
+        jobs.append((i, float(rate), nfft, noverlap, max_columns, out_file))
+
+    results = []
+    finished = imap(_spectrogram_job, jobs, _init_worker, (signals,),
+                    processes)
+    try:
+        for out, result in zip(outs, finished):
+            if out is not None:
+                result = (out,) + result[1:]
+            results.append(result)
+            if progress:
+                progress.step()
+    finally:
+        finished.close()
+        _init_worker(None)
+        for j in jobs:
+            if j[5]:
+                try:  # Mapped files cannot be removed on Windows
+                    os.remove(j[5])
+                except OSError:
+                    pass
+    return results
@@ -0,0 +1,112 @@
+from __future__ import division
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+
+def extract_waveforms(data, sampling_rate, t_start, spike_times, length,
+                      align_time):
+    """ Extract spike waveforms from signals for multiple sets of spike
+    times. Works like :func:`spykeutils.tools.extract_spikes`, but the
+    waveforms for all spike times are cut with a single gather from a
+    strided view of the signals and returned as arrays instead of
+    :class:`neo.core.Spike` objects. Spikes that are too close to the
+    beginning or end of the signals to be fully extracted are ignored.
+
+    :param data: The signals with one row per channel.
+    :type data: 2D array
+    :param float sampling_rate: The sampling rate of the signals in Hz.
+    :param float t_start: The time of the first sample in seconds.
+    :param list spike_times: A list of 1D arrays with spike times in
+        seconds, e.g. one array per unit.
+    :param float length: The length of the waveforms in seconds.
+    :param float align_time: The time from the start of a waveform to
+        the spike time in seconds.
+    :returns: A list with a tuple for each array in ``spike_times``: An
+        array of waveforms with shape (spikes, channels, samples) and a
+        boolean array that indicates which spike times were extracted.
+    """
+    data = np.atleast_2d(np.asarray(data))
+    channels, end = data.shape
+    cut_samples = int(round(length * sampling_rate))
+
+    starts = []
+    extracted = []
+    for times in spike_times:
+        st = (np.asarray(times, dtype=float).ravel() - align_time -
+              t_start) * sampling_rate
+        ok = (st >= 0) & (st < end - cut_samples)
+        starts.append(st[ok].astype(np.int64))
+        extracted.append(ok)
+
+    counts = [len(s) for s in starts]
+    if not sum(counts) or cut_samples < 1:
+        return [(np.empty((0, channels, max(cut_samples, 0)), data.dtype), ok)
+                for ok in extracted]
+
+    # View of all windows: (start sample, channel, sample in window)
+    windows = as_strided(
+        data, shape=(end - cut_samples + 1, channels, cut_samples),
+        strides=(data.strides[1], data.strides[0], data.strides[1]))
+    waves = windows[np.concatenate(starts)]
+
+    bounds = np.cumsum(counts)[:-1]
+    return zip(np.split(waves, bounds), extracted)
+
+
+class WaveformDensity(object):
+    """ A 2D histogram of waveforms over time and amplitude. Waveforms can
+    be added in parts, so the histogram of many waveforms is computed with
+    little memory. The lines between samples are approximated by
+    ``upsample`` - 1 linearly interpolated points between consecutive
+    samples.
+    """
+    def __init__(self, num_samples, y_min, y_max, bins=200, upsample=4):
+        """ Create an empty histogram.
+
+        :param int num_samples: The number of samples in each waveform.
+        :param float y_min: The lower border of the amplitude range.
+        :param float y_max: The upper border of the amplitude range. Values
+            outside of the range are not counted.
+        :param int bins: The number of amplitude bins.
+        :param int upsample: The number of histogram columns per sample.
+        """
+        if y_max <= y_min:
+            y_max = y_min + 1.0
+        self.y_min = float(y_min)
+        self.y_max = float(y_max)
+        self.bins = bins
+        self.num_samples = num_samples
+        self.columns = max((num_samples - 1) * upsample + 1, 1)
+        self.counts = np.zeros((bins, self.columns), dtype=np.int64)
+        self.num_waveforms = 0
+
+        # Interpolation between neighbouring samples for each column
+        pos = np.arange(self.columns) / upsample
+        self._left = np.clip(pos.astype(np.int64), 0,
+                             max(num_samples - 2, 0))
+        self._weight = pos - self._left
+        self._right = np.minimum(self._left + 1, num_samples - 1)
+
+    def add(self, waveforms, chunk_size=4096):
+        """ Add waveforms to the histogram.
+
+        :param waveforms: The waveforms, one per row.
+        :type waveforms: 2D array
+        :param int chunk_size: The number of waveforms that are
+            processed at once.
+        """
+        waveforms = np.atleast_2d(np.asarray(waveforms, dtype=float))
+        scale = self.bins / (self.y_max - self.y_min)
+        columns = np.arange(self.columns)
+        for i in xrange(0, len(waveforms), chunk_size):
+            w = waveforms[i:i + chunk_size]
+            values = (w[:, self._left] * (1 - self._weight) +
+                      w[:, self._right] * self._weight)
+            inside = (values >= self.y_min) & (values <= self.y_max)
+            rows = np.minimum(((values - self.y_min) * scale).astype(
+                np.int64), self.bins - 1)
+            flat = (rows * self.columns + columns)[inside]
+            self.counts += np.bincount(
+                flat, minlength=self.counts.size).reshape(self.counts.shape)
+            self.num_waveforms += len(w)
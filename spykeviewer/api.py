@@ -30,6 +30,28 @@ class __ConfigOptions:
         self.autoselect_units = False
         # Tranformation function for file paths when starting plugin remotely
         self.remote_path_transform = lambda x: x
+        # Maximum number of files that are loaded at the same time
+        self.load_workers = 1
+        # Run plugins that support it as background jobs when started
+        # from the GUI
+        self.run_plugins_in_background = False
+        # Maximum number of background plugin jobs running at the same time
+        self.background_jobs = 1
+        # Maximum number of processes used by the included plugins for
+        # parallel computations (0 - one per CPU core)
+        self.analysis_processes = 0
+        # Number of persistent worker processes for remotely started
+        # plugins (0 - start a new process for every plugin)
+        self.remote_worker_processes = 0
+        # Maximum size of cached plugin results in megabytes
+        # (0 - do not cache results)
+        self.result_cache_size = 256
+        # Maximum size of data in megabytes that is loaded in advance for
+        # the current selection in cached lazy mode (0 - no prefetching)
+        self.prefetch_size = 256
+        # Maximum size of loaded signals and spike trains in megabytes
+        # before data of unselected blocks is unloaded (0 - no limit)
+        self.loaded_data_size = 2048
 
     def __setitem__(self, key, value):
         self.__dict__[key] = value
@@ -43,7 +65,7 @@ window = None
 app = None
 
 
-def start_plugin(name, current=None, selections=None):
+def start_plugin(name, current=None, selections=None, background=False):
     """ Start first plugin with given name and return result of start()
     method. Raises a SpykeException if not exactly one plugins with
     this name exist.
@@ -55,8 +77,15 @@ def start_plugin(name, current=None, selections=None):
     :param list selections: A list of DataProvider objects to use as
         selections. If ``None``, the regular selections from the GUI
         are used.
+    :param bool background: If ``True``, the plugin is run as a
+        background job and a job object is returned immediately. Its
+        ``result()`` method returns the result of the ``compute()``
+        method of the plugin, ``done()`` and ``cancel()`` can be used to
+        check if the job is done or to cancel it. Only possible for
+        plugins that implement ``compute()`` and ``plot_result()``.
     """
-    return window.start_plugin(name, current, selections, False)
+    return window.start_plugin(name, current, selections, False,
+                               background)
 
 
 def start_plugin_remote(plugin, current=None, selections=None):
@@ -78,6 +107,34 @@ def start_plugin_remote(plugin, current=None, selections=None):
     window.start_plugin_remote(plugin, current, selections)
 
 
+def start_plugin_remote_batch(plugin, selection_list=None, selections=None,
+                              max_workers=None):
+    """ Start a plugin once for each selection in a list, using parallel
+    local worker processes. Each selection in the list is used as current
+    selection for one run of the plugin. Returns a batch object with
+    a ``summary()`` method, which returns a dictionary with lists of
+    job ids (``jobs``, ``finished``, ``failed`` and ``pending``) and
+    a list of files that the plugins created or modified in the data
+    directory (``files``). The summary is also printed on the console
+    when all jobs are done. Raises a SpykeException if not exactly one
+    plugins with this name exist or if worker processes cannot be used.
+    Worker processes are only available with the default remote script
+    and when Spyke Viewer is not run as a frozen application.
+
+    :param plugin: The name of the plugin or the plugin object. If this
+        is a string, it should not include the directory.
+    :param list selection_list: A list of DataProvider objects. If
+        ``None``, all stored selections from the GUI are used.
+    :param list selections: A list of DataProvider objects that is passed
+        as ``selections`` to every run of the plugin. Default: Empty list
+    :param int max_workers: Maximum number of worker processes. The
+        number of processes is also limited to the number of CPU cores.
+        If ``None``, one process per core is used.
+    """
+    return window.start_plugin_remote_batch(
+        plugin, selection_list, selections, max_workers)
+
+
 def get_plugin(name):
     """ Get plugin with the given name. Raises a SpykeException if
     multiple plugins with this name exist. Returns None if no such
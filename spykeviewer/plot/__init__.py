@@ -0,0 +1,12 @@
+""" Plotting functions used by the included plugins. The functions for
+results do not compute anything from Neo objects, unlike the functions in
+:mod:`spykeutils.plot`. Their results can be cached or computed in the
+background and plotted later. :func:`signals` draws long signals with a
+level of detail that depends on the zoom level, :func:`waveforms`
+plots spike waveforms given as arrays and :func:`raster` only draws the
+visible part of long spike trains.
+"""
+from results import series_info, histogram, sde, correlogram
+from analog_signals import signals
+from spike_waveforms import waveforms
+from raster import raster
@@ -0,0 +1,268 @@
+from __future__ import division
+
+import scipy as sp
+import quantities as pq
+
+from guiqwt.builder import make
+from guiqwt.baseplot import BasePlot
+from guiqwt.plot import BaseCurveWidget
+
+from spykeutils.progress_indicator import ProgressIndicator
+from spykeutils import conversions
+from spykeutils import SpykeException
+from spykeutils.plot.dialog import PlotDialog
+from spykeutils.plot import helper
+from spykeutils.plot.analog_signals import _add_spike_waveforms
+
+from decimation import MinMaxPyramid, DecimatedCurveItem
+from template_spikes import TemplateSpikesItem
+
+
+def _signal_curve(signal, time_unit, y_unit, offset, max_samples):
+    """ Create a curve item for an analog signal. Signals with more than
+    ``max_samples`` samples are decimated for display.
+    """
+    if y_unit is not None:
+        signal = signal.rescale(y_unit)
+        offset = offset.rescale(y_unit)
+    t_start = float(signal.t_start.rescale(time_unit))
+    period = float((1 / signal.sampling_rate).rescale(time_unit))
+
+    if max_samples and signal.shape[0] > max_samples:
+        pyramid = MinMaxPyramid(sp.asarray(signal), t_start, period,
+                                float(offset.rescale(signal.units)))
+        template = make.curve([], [])
+        curve = DecimatedCurveItem(pyramid, template.curveparam)
+        curve.update_params()
+        return curve
+
+    x = sp.arange(signal.shape[0]) * period + t_start
+    return make.curve(x, sp.asarray(signal + offset))
+
+
+def _add_template_spikes(plot, spike_templates, x_units, channel, offset,
+                         progress):
+    """ Add an item for each template spike that draws its waveform at
+    all times of the corresponding spike train.
+    """
+    for spike, times in spike_templates:
+        if spike.waveform is None or not spike.sampling_rate:
+            continue
+        if channel < 0 or spike.waveform.shape[1] <= channel:
+            continue
+        if not len(times):
+            continue
+
+        color = helper.get_object_color(spike.unit)
+        if spike.left_sweep:
+            lsweep = spike.left_sweep
+        else:
+            lsweep = 0.0 * pq.ms
+        x = (sp.arange(spike.waveform.shape[0]) / spike.sampling_rate -
+             lsweep).rescale(x_units)
+        y = spike.waveform[:, channel] + offset
+
+        template = make.curve([], [], color=color, linewidth=2)
+        item = TemplateSpikesItem(
+            sp.asarray(x), sp.asarray(y), sp.asarray(times.rescale(x_units)),
+            template.curveparam)
+        item.update_params()
+        plot.add_item(item)
+        progress.step()
+
+
+@helper.needs_qt
+def signals(signals, events=None, epochs=None, spike_trains=None,
+            spikes=None, show_waveforms=True, use_subplots=True,
+            subplot_names=True, time_unit=pq.s, y_unit=None, progress=None,
+            max_samples=100000, spike_templates=None):
+    """ Create a plot from a list of analog signals. Works like
+    :func:`spykeutils.plot.signals`, but long signals are drawn using a
+    :class:`decimation.DecimatedCurveItem`. Only the visible range is
+    drawn with about two points per pixel, so even very long signals can
+    be navigated quickly. Samples are drawn when the view is narrow
+    enough.
+
+    :param list signals: The list of :class:`neo.core.AnalogSignal` objects
+        to plot.
+    :param sequence events: A list of Event objects to be included in the
+        plot.
+    :param sequence epochs: A list of Epoch objects to be included in the
+        plot.
+    :param list spike_trains: A list of :class:`neo.core.SpikeTrain` objects
+        to be included in the plot. The ``unit`` property (if it exists) is
+        used for color and legend entries.
+    :param list spikes: A list :class:`neo.core.Spike` objects to be included
+        in the plot. The ``unit`` property (if it exists) is used for color
+        and legend entries.
+    :param bool show_waveforms: Determines if spikes from
+        :class:`neo.core.Spike` and :class:`neo.core.SpikeTrain` objects are
+        shown as waveforms (if available) or vertical lines.
+    :param bool use_subplots: Determines if a separate subplot for is created
+        each signal.
+    :param bool subplot_names: Only valid if ``use_subplots`` is True.
+        Determines if signal (or channel) names are shown for subplots.
+    :param Quantity time_unit: The unit of the x axis.
+    :param progress: Set this parameter to report progress.
+    :type progress: :class:`spykeutils.progress_indicator.ProgressIndicator`
+    :param int max_samples: Signals with more samples are decimated. If
+        0, no signals are decimated.
+    :param list spike_templates: A list of tuples of a
+        :class:`neo.core.Spike` and a time array. The waveform of the
+        spike is shown at each time, which is much faster than creating
+        a spike object for each time.
+    """
+    if not signals:
+        raise SpykeException(
+            'Cannot create signal plot: No signal data provided!')
+    if not progress:
+        progress = ProgressIndicator()
+
+    # Plot title
+    win_title = 'Analog Signal'
+    if len(set((s.recordingchannel for s in signals))) == 1:
+        if signals[0].recordingchannel and signals[0].recordingchannel.name:
+            win_title += ' | Recording Channel: %s' %\
+                         signals[0].recordingchannel.name
+    if len(set((s.segment for s in signals))) == 1:
+        if signals[0].segment and signals[0].segment.name:
+            win_title += ' | Segment: %s' % signals[0].segment.name
+    win = PlotDialog(toolbar=True, wintitle=win_title)
+
+    if events is None:
+        events = []
+    if epochs is None:
+        epochs = []
+    if spike_trains is None:
+        spike_trains = []
+    if spikes is None:
+        spikes = []
+    if spike_templates is None:
+        spike_templates = []
+
+    if show_waveforms:
+        for st in spike_trains:
+            if st.waveforms is not None:
+                spikes.extend(conversions.spike_train_to_spikes(st))
+        spike_trains = []
+    else:
+        unit_spikes = {}
+        for s in spikes:
+            unit_spikes.setdefault(s.unit, []).append(s)
+        for sps in unit_spikes.itervalues():
+            spike_trains.append(conversions.spikes_to_spike_train(sps, False))
+        spikes = []
+
+    channels = range(len(signals))
+
+    channel_indices = []
+    for s in signals:
+        if not s.recordingchannel:
+            channel_indices.append(-1)
+        else:
+            channel_indices.append(s.recordingchannel.index)
+
+    # Heuristic: If multiple channels have the same index, use channel order
+    # as index for spike waveforms
+    nonindices = max(0, channel_indices.count(-1) - 1)
+    if len(set(channel_indices)) != len(channel_indices) - nonindices:
+        channel_indices = range(len(signals))
+
+    progress.set_ticks((len(spike_trains) + len(spikes) +
+                        len(spike_templates) + 1) * len(channels))
+
+    offset = 0 * signals[0].units
+    if use_subplots:
+        plot = None
+        for c in channels:
+            pW = BaseCurveWidget(win)
+            plot = pW.plot
+
+            if subplot_names:
+                if signals[c].name:
+                    win.set_plot_title(plot, signals[c].name)
+                elif signals[c].recordingchannel:
+                    if signals[c].recordingchannel.name:
+                        win.set_plot_title(
+                            plot, signals[c].recordingchannel.name)
+
+            helper.add_epochs(plot, epochs, time_unit)
+            plot.add_item(_signal_curve(
+                signals[c], time_unit, y_unit, offset, max_samples))
+            helper.add_events(plot, events, time_unit)
+
+            _add_spike_waveforms(
+                plot, spikes, time_unit, channel_indices[c], offset, progress)
+            _add_template_spikes(
+                plot, spike_templates, time_unit, channel_indices[c],
+                offset, progress)
+
+            for train in spike_trains:
+                color = helper.get_object_color(train.unit)
+                helper.add_spikes(plot, train, color, units=time_unit)
+                progress.step()
+
+            win.add_plot_widget(pW, c)
+            plot.set_axis_unit(
+                BasePlot.Y_LEFT, signals[c].dimensionality.string)
+            progress.step()
+
+        plot.set_axis_title(BasePlot.X_BOTTOM, 'Time')
+        plot.set_axis_unit(BasePlot.X_BOTTOM, time_unit.dimensionality.string)
+    else:
+        channels.reverse()
+
+        pW = BaseCurveWidget(win)
+        plot = pW.plot
+
+        helper.add_epochs(plot, epochs, time_unit)
+
+        # Find plot y offset
+        max_offset = 0 * signals[0].units
+        for i, c in enumerate(channels[1:], 1):
+            cur_offset = signals[channels[i - 1]].max() - signals[c].min()
+            if cur_offset > max_offset:
+                max_offset = cur_offset
+
+        offset -= signals[channels[0]].min()
+
+        for c in channels:
+            plot.add_item(_signal_curve(
+                signals[c], time_unit, y_unit, offset, max_samples))
+            _add_spike_waveforms(
+                plot, spikes, time_unit, channel_indices[c], offset, progress)
+            _add_template_spikes(
+                plot, spike_templates, time_unit, channel_indices[c],
+                offset, progress)
+            offset += max_offset
+            progress.step()
+
+        helper.add_events(plot, events, time_unit)
+
+        for train in spike_trains:
+            color = helper.get_object_color(train.unit)
+            helper.add_spikes(plot, train, color, units=time_unit)
+            progress.step()
+
+        win.add_plot_widget(pW, 0)
+
+        plot.set_axis_title(BasePlot.X_BOTTOM, 'Time')
+        plot.set_axis_unit(BasePlot.X_BOTTOM, time_unit.dimensionality.string)
+        plot.set_axis_unit(BasePlot.Y_LEFT, signals[0].dimensionality.string)
+
+    win.add_custom_curve_tools()
+
+    units = set([s.unit for s in spike_trains])
+    units = units.union([s.unit for s in spikes])
+    units = units.union([s.unit for s, _ in spike_templates])
+
+    progress.done()
+
+    helper.make_window_legend(win, units, False)
+    win.show()
+
+    if use_subplots:
+        win.add_x_synchronization_option(True, channels)
+        win.add_y_synchronization_option(False, channels)
+
+    return win
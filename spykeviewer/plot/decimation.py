@@ -0,0 +1,122 @@
+from __future__ import division
+
+import scipy as sp
+
+from guiqwt.curve import CurveItem
+
+
+class MinMaxPyramid(object):
+    """ Minimum and maximum envelopes of a regularly sampled signal at
+    multiple resolutions. Each level summarizes blocks of samples of the
+    previous level, so a part of the signal can be drawn with a number
+    of points that depends on the available screen resolution instead
+    of the number of samples.
+    """
+    def __init__(self, data, t_start, sampling_period, offset=0.0,
+                 factor=8, min_blocks=512):
+        """ Create the pyramid for a signal.
+
+        :param data: The samples of the signal. The array is referenced,
+            not copied.
+        :type data: 1D array
+        :param float t_start: The time of the first sample.
+        :param float sampling_period: The time between two samples.
+        :param float offset: A constant that is added to all returned
+            values.
+        :param int factor: The number of blocks of one level that are
+            summarized in one block of the next level.
+        :param int min_blocks: No further levels are created once a level
+            has fewer blocks than this.
+        """
+        self.data = sp.asarray(data).ravel()
+        self.t_start = t_start
+        self.sampling_period = sampling_period
+        self.offset = offset
+
+        # List of (samples per block, minimums, maximums)
+        self.levels = []
+        mins = maxs = self.data
+        block = 1
+        while len(mins) > min_blocks:
+            mins = self._reduce(mins, factor, sp.minimum)
+            maxs = self._reduce(maxs, factor, sp.maximum)
+            block *= factor
+            self.levels.append((block, mins, maxs))
+
+    @staticmethod
+    def _reduce(values, factor, ufunc):
+        full = len(values) // factor * factor
+        reduced = ufunc.reduce(values[:full].reshape(-1, factor), axis=1)
+        if full < len(values):
+            reduced = sp.append(reduced, ufunc.reduce(values[full:]))
+        return reduced
+
+    @property
+    def t_stop(self):
+        return self.t_start + len(self.data) * self.sampling_period
+
+    def envelope(self, start, stop, max_points):
+        """ Return points for drawing a time range of the signal.
+
+        If the range contains at most ``max_points`` samples, the samples
+        are returned. Otherwise, the finest level with at most
+        ``max_points`` / 2 blocks in the range is used and the minimum
+        and maximum of each block are returned alternately, so a line
+        through the points covers the envelope of the signal.
+
+        :param float start: Start of the time range.
+        :param float stop: End of the time range.
+        :param int max_points: The maximum number of points to return.
+        :returns: Two arrays with the x and y values of the points.
+        """
+        n = len(self.data)
+        first = int(sp.floor((start - self.t_start) / self.sampling_period))
+        last = int(sp.ceil((stop - self.t_start) / self.sampling_period))
+        # Include one sample beyond each border for continuous lines
+        first = min(max(first - 1, 0), n)
+        last = min(max(last + 2, first), n)
+
+        if last - first <= max_points or not self.levels:
+            x = self.t_start + sp.arange(first, last) * self.sampling_period
+            return x, self.data[first:last] + self.offset
+
+        for block, mins, maxs in self.levels:
+            if (last - first) / block <= max(max_points // 2, 1):
+                break
+        b_first = first // block
+        b_last = min(int(sp.ceil(last / block)), len(mins))
+
+        centers = (sp.arange(b_first, b_last) + 0.5) * block
+        x = self.t_start + sp.repeat(centers, 2) * self.sampling_period
+        y = sp.empty(len(x))
+        y[0::2] = mins[b_first:b_last]
+        y[1::2] = maxs[b_first:b_last]
+        return x, y + self.offset
+
+
+class DecimatedCurveItem(CurveItem):
+    """ A curve item for long regularly sampled signals. Only the visible
+    part of the signal is drawn, using a :class:`MinMaxPyramid` to limit
+    the number of points to about two per pixel. Samples are drawn when
+    the view is narrow enough.
+    """
+    def __init__(self, pyramid, curveparam=None):
+        CurveItem.__init__(self, curveparam)
+        self.pyramid = pyramid
+        self._view = None
+        # The envelope of the whole signal has the same bounds as the signal
+        self.set_data(*pyramid.envelope(
+            pyramid.t_start, pyramid.t_stop, 4096))
+        self._bounds = CurveItem.boundingRect(self)
+
+    def boundingRect(self):
+        return self._bounds
+
+    def draw(self, painter, xMap, yMap, canvasRect):
+        start, stop = sorted((xMap.s1(), xMap.s2()))
+        width = max(int(abs(xMap.p2() - xMap.p1())), 1)
+        view = (start, stop, width)
+        if view != self._view:
+            self._view = view
+            self.set_data(*self.pyramid.envelope(start, stop, 2 * width))
+        CurveItem.draw(self, painter, xMap, yMap, canvasRect)
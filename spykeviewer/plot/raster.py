@@ -0,0 +1,234 @@
+from __future__ import division
+
+import scipy as sp
+import quantities as pq
+
+from guiqwt.curve import CurveItem
+from guiqwt.baseplot import BasePlot
+from guiqwt.plot import BaseCurveWidget
+from PyQt4.QtCore import Qt, QRectF, QPointF
+from PyQt4.QtGui import QColor, QPen, QImage
+
+from spykeutils import SpykeException
+from spykeutils.plot.dialog import PlotDialog
+from spykeutils.plot import helper
+
+from ..analysis.raster import SpikeRaster
+
+
+class RasterItem(CurveItem):
+    """ A plot item showing a
+    :class:`spykeviewer.analysis.raster.SpikeRaster`. Only visible spikes
+    are drawn as lines. If there are many visible spikes, an image with
+    one pixel column per screen pixel is drawn instead. Events, epochs
+    and the lines for each train are stored as arrays and also only
+    drawn where visible.
+    """
+    MAX_LINES = 2000
+
+    def __init__(self, raster, colors, lines=None, events=None,
+                 epochs=None, spike_height=21):
+        """ Create the item. Train ``i`` is drawn at ``y = len(raster) - i``.
+
+        :param raster: The spike times.
+        :type raster: :class:`spykeviewer.analysis.raster.SpikeRaster`
+        :param list colors: A color for each train.
+        :param lines: Start and end time of horizontal lines for each
+            train. If ``None``, no lines are drawn.
+        :type lines: 2D array
+        :param list events: Tuples of time and label of events.
+        :param list epochs: Tuples of start, end and label of epochs.
+        :param int spike_height: The maximum height of spikes in pixels.
+        """
+        CurveItem.__init__(self)
+        self.set_selectable(False)
+        self.raster = raster
+        self.colors = [QColor(c) for c in colors]
+        self.lines = lines
+        self.spike_height = spike_height
+
+        events = sorted(events or [])
+        self.event_times = sp.array([e[0] for e in events], dtype=float)
+        self.event_labels = [e[1] for e in events]
+        epochs = sorted(epochs or [])
+        self.epoch_times = sp.array([e[:2] for e in epochs],
+                                    dtype=float).reshape(-1, 2)
+        self.epoch_labels = [e[2] for e in epochs]
+
+        # Image of visible spikes for the current view
+        self._view = None
+        self._image = None
+        self._image_data = None
+
+        times = [raster.times, self.event_times, self.epoch_times.ravel()]
+        if lines is not None:
+            times.append(sp.asarray(lines).ravel())
+        times = sp.concatenate(times)
+        if len(times):
+            t_min, t_max = times.min(), times.max()
+        else:
+            t_min = t_max = 0.0
+        self._bounds = QRectF(t_min, 0.5, t_max - t_min, len(raster))
+
+    def boundingRect(self):
+        return self._bounds
+
+    def _row_image(self, start, stop, width):
+        """ Return an image with one row per train and one column per
+        pixel that marks where spikes are.
+        """
+        view = (start, stop, width)
+        if view != self._view:
+            self._view = view
+            spikes = self.raster.binarize(start, stop, width)
+            data = sp.zeros(spikes.shape, dtype=sp.uint32)
+            for i, c in enumerate(self.colors):
+                data[i, spikes[i]] = c.rgba()
+            self._image_data = data
+            self._image = QImage(data.data, width, len(self.raster),
+                                 QImage.Format_ARGB32)
+        return self._image
+
+    def draw(self, painter, xMap, yMap, canvasRect):
+        s1, s2 = xMap.s1(), xMap.s2()
+        start, stop = sorted((s1, s2))
+        if stop <= start:
+            return
+        p1, p2 = xMap.p1(), xMap.p2()
+        scale = (p2 - p1) / (s2 - s1)
+        n = len(self.raster)
+        row_height = abs(yMap.transform(1) - yMap.transform(0))
+        height = max(min(self.spike_height, 0.8 * row_height), 1)
+
+        painter.save()
+
+        # Epochs
+        visible = ((self.epoch_times[:, 1] >= start) &
+                   (self.epoch_times[:, 0] <= stop))
+        fill = QColor(Qt.gray)
+        fill.setAlpha(60)
+        for (e_start, e_stop), label in zip(
+                self.epoch_times[visible],
+                [l for l, v in zip(self.epoch_labels, visible) if v]):
+            x1 = p1 + (e_start - s1) * scale
+            x2 = p1 + (e_stop - s1) * scale
+            rect = QRectF(min(x1, x2), canvasRect.top(), abs(x2 - x1),
+                          canvasRect.height())
+            painter.fillRect(rect, fill)
+            if label:
+                painter.setPen(QPen(Qt.black))
+                painter.drawText(rect, Qt.AlignHCenter | Qt.AlignBottom,
+                                 label)
+
+        # Lines for each train
+        if self.lines is not None:
+            painter.setPen(QPen(Qt.black))
+            for i, (l_start, l_stop) in enumerate(self.lines):
+                if l_stop < start or l_start > stop:
+                    continue
+                y = yMap.transform(n - i)
+                painter.drawLine(
+                    QPointF(p1 + (max(l_start, start) - s1) * scale, y),
+                    QPointF(p1 + (min(l_stop, stop) - s1) * scale, y))
+
+        # Spikes
+        spikes = self.raster.visible(start, stop)
+        if sum(len(s) for s in spikes) <= self.MAX_LINES:
+            for i, s in enumerate(spikes):
+                if not len(s):
+                    continue
+                painter.setPen(QPen(self.colors[i], 2))
+                y = yMap.transform(n - i)
+                for x in p1 + (s - s1) * scale:
+                    painter.drawLine(QPointF(x, y - height / 2),
+                                     QPointF(x, y + height / 2))
+        else:
+            width = max(int(abs(p2 - p1)), 1)
+            image = self._row_image(start, stop, width)
+            left = min(p1, p2)
+            for i in xrange(n):
+                y = yMap.transform(n - i)
+                painter.drawImage(
+                    QRectF(left, y - height / 2, width, height), image,
+                    QRectF(0, i, width, 1))
+
+        # Events
+        first = self.event_times.searchsorted(start)
+        last = self.event_times.searchsorted(stop, 'right')
+        pen = QPen(Qt.black)
+        pen.setStyle(Qt.DotLine)
+        for t, label in zip(self.event_times[first:last],
+                            self.event_labels[first:last]):
+            x = p1 + (t - s1) * scale
+            painter.setPen(pen)
+            painter.drawLine(QPointF(x, canvasRect.top()),
+                             QPointF(x, canvasRect.bottom()))
+            if label and last - first <= self.MAX_LINES // 10:
+                painter.setPen(QPen(Qt.black))
+                painter.drawText(QPointF(x + 2, canvasRect.top() + 12),
+                                 label)
+
+        painter.restore()
+
+
+@helper.needs_qt
+def raster(trains, time_unit=pq.ms, show_lines=True, events=None,
+           epochs=None):
+    """ Create a new plotting window with a rasterplot of spike trains.
+    Works like :func:`spykeutils.plot.raster`, but all spikes are drawn
+    by a single :class:`RasterItem`, so long spike trains of many units
+    can be navigated quickly.
+
+    :param dict trains: Dictionary of spike trains indexed by a
+        Neo object (Unit or Segment).
+    :param Quantity time_unit: Unit of X-Axis.
+    :param bool show_lines: Determines if a horizontal line will be shown
+        for each spike train.
+    :param sequence events: A sequence of neo `Event` objects that will
+        be marked on the plot.
+    :param sequence epochs: A sequence of neo `Epoch` objects that will
+        be marked on the plot.
+    """
+    if not trains:
+        raise SpykeException('No spike trains for rasterplot')
+
+    if not time_unit:
+        time_unit = pq.ms
+
+    win_title = 'Spike Trains'
+    win = PlotDialog(toolbar=True, wintitle=win_title, major_grid=False)
+
+    pW = BaseCurveWidget(win)
+    plot = pW.plot
+
+    keys = trains.keys()
+    raster = SpikeRaster([sp.asarray(trains[k].rescale(time_unit))
+                          for k in keys])
+    colors = [helper.get_object_color(k) for k in keys]
+
+    lines = None
+    if show_lines:
+        lines = sp.array(
+            [[float(trains[k].t_start.rescale(time_unit)),
+              float(trains[k].t_stop.rescale(time_unit))] for k in keys])
+
+    ev = [(float(e.time.rescale(time_unit)), e.label or '')
+          for e in events or []]
+    ep = [(float(e.time.rescale(time_unit)),
+           float((e.time + e.duration).rescale(time_unit)), e.label or '')
+          for e in epochs or []]
+
+    plot.add_item(RasterItem(raster, colors, lines, ev, ep))
+
+    plot.set_axis_title(BasePlot.X_BOTTOM, 'Time')
+    plot.set_axis_unit(BasePlot.X_BOTTOM, time_unit.dimensionality.string)
+
+    win.add_plot_widget(pW, 0)
+    helper.make_window_legend(win, [k for k in keys if k.name], True)
+
+    plot.set_axis_limits(BasePlot.Y_LEFT, 0.5, len(trains) + 0.5)
+
+    win.add_custom_curve_tools()
+    win.show()
+
+    return win
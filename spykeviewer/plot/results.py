@@ -0,0 +1,272 @@
+import scipy as sp
+
+from guiqwt.builder import make
+from guiqwt.baseplot import BasePlot
+from guiqwt.plot import BaseCurveWidget
+
+from spykeutils.plot.dialog import PlotDialog
+from spykeutils.plot import helper
+
+
+def series_info(objects):
+    """ Return names and colors for the series of a result.
+
+    :param sequence objects: Neo objects (e.g. units) identifying the
+        series.
+    :returns: A tuple of a string array of names and a string array of
+        colors.
+    """
+    names = []
+    colors = []
+    for o in objects:
+        if o and hasattr(o, 'name') and o.name:
+            names.append(o.name)
+        else:
+            names.append('Unknown')
+        colors.append(helper.get_object_color(o))
+    return sp.array(names, dtype=unicode), sp.array(colors, dtype=str)
+
+
+def _legend_curve(plot, name, color):
+    """ Add an invisible curve showing a colored rectangle in the legend
+    to a plot and return it.
+    """
+    curve = make.curve(
+        [], [], name, color, 'NoPen', linewidth=1, marker='Rect',
+        markerfacecolor=color, markeredgecolor=color)
+    plot.add_item(curve)
+    return curve
+
+
+@helper.needs_qt
+def histogram(win_title, bins, values, names, colors, bar_plot=False,
+              x_title='Time', x_unit='ms', y_title='', y_unit='',
+              line_x=None):
+    """ Create a plot dialog with histograms for multiple series.
+
+    :param str win_title: The window title.
+    :param bins: The bin borders (length n+1).
+    :type bins: 1D array
+    :param values: The histogram values of each series (shape (m, n)).
+    :type values: 2D array
+    :param sequence names: The names of the series.
+    :param sequence colors: The colors of the series.
+    :param bool bar_plot: If ``True``, create a bar histogram for each
+        series. Else, create one plot with a line for each series.
+    :param str x_title: Title of the X-Axis.
+    :param str x_unit: Unit of the X-Axis.
+    :param str y_title: Title of the Y-Axis.
+    :param str y_unit: Unit of the Y-Axis.
+    :param line_x: X-Values of the line plot (length n). Default: Left
+        bin borders.
+    :type line_x: 1D array
+    """
+    win = PlotDialog(toolbar=True, wintitle=win_title, min_plot_width=150,
+                     min_plot_height=100)
+
+    legends = []
+    if bar_plot:
+        columns = int(sp.sqrt(len(values)))
+        for ind in xrange(len(values)):
+            pW = BaseCurveWidget(win)
+            plot = pW.plot
+
+            show_values = list(values[ind])
+            show_values.insert(0, show_values[0] if show_values else 0)
+            curve = make.curve(
+                bins, show_values, names[ind], color='k',
+                curvestyle="Steps", shade=1.0)
+            plot.add_item(curve)
+
+            color_curve = _legend_curve(plot, names[ind], colors[ind])
+            legends.append(make.legend(restrict_items=[color_curve]))
+            plot.add_item(legends[-1])
+
+            # Prepare plot
+            plot.set_antialiasing(False)
+            scale = plot.axisScaleDiv(BasePlot.Y_LEFT)
+            plot.setAxisScale(BasePlot.Y_LEFT, 0, scale.upperBound())
+            if ind % columns == 0:
+                plot.set_axis_title(BasePlot.Y_LEFT, y_title)
+                plot.set_axis_unit(BasePlot.Y_LEFT, y_unit)
+            if ind >= len(values) - columns:
+                plot.set_axis_title(BasePlot.X_BOTTOM, x_title)
+                plot.set_axis_unit(BasePlot.X_BOTTOM, x_unit)
+
+            win.add_plot_widget(pW, ind, column=ind % columns)
+    else:
+        if line_x is None:
+            line_x = bins[:-1]
+
+        pW = BaseCurveWidget(win)
+        plot = pW.plot
+        legend_items = []
+
+        for ind in xrange(len(values)):
+            curve = make.curve(
+                line_x, values[ind], names[ind], color=colors[ind])
+            legend_items.append(curve)
+            plot.add_item(curve)
+
+        win.add_plot_widget(pW, 0)
+
+        legends.append(make.legend(restrict_items=legend_items))
+        plot.add_item(legends[-1])
+
+        plot.set_axis_title(BasePlot.Y_LEFT, y_title)
+        plot.set_axis_unit(BasePlot.Y_LEFT, y_unit)
+        plot.set_axis_title(BasePlot.X_BOTTOM, x_title)
+        plot.set_axis_unit(BasePlot.X_BOTTOM, x_unit)
+        plot.set_antialiasing(True)
+
+    win.add_custom_curve_tools()
+    win.add_legend_option(legends, True)
+    win.show()
+
+    if bar_plot and len(values) > 1:
+        win.add_x_synchronization_option(True, range(len(values)))
+        win.add_y_synchronization_option(False, range(len(values)))
+
+    return win
+
+
+@helper.needs_qt
+def sde(times, values, names, colors, kernel_sizes, time_unit='ms',
+        cost_steps=None, costs=None):
+    """ Create a spike density estimation plot.
+
+    :param times: The evaluation points of the estimations.
+    :type times: 1D array
+    :param values: The estimated rates in Hz for each series.
+    :type values: 2D array
+    :param sequence names: The names of the series.
+    :param sequence colors: The colors of the series.
+    :param sequence kernel_sizes: The kernel size used for each series.
+    :param str time_unit: Unit of ``times`` and ``kernel_sizes``.
+    :param cost_steps: The kernel sizes that were tried by the kernel
+        width optimization. If given, a second plot shows the costs.
+    :type cost_steps: 1D array
+    :param costs: The cost of each kernel size for each series.
+    :type costs: 2D array
+    """
+    win = PlotDialog(toolbar=True, wintitle='Kernel Density Estimation')
+
+    pW = BaseCurveWidget(win)
+    plot = pW.plot
+    plot.set_antialiasing(True)
+    for ind in xrange(len(values)):
+        curve = make.curve(
+            times, values[ind],
+            title='%s, Kernel width %.2f %s' %
+                  (names[ind], kernel_sizes[ind], time_unit),
+            color=colors[ind])
+        plot.add_item(curve)
+
+    plot.set_axis_title(BasePlot.X_BOTTOM, 'Time')
+    plot.set_axis_unit(BasePlot.X_BOTTOM, time_unit)
+    plot.set_axis_title(BasePlot.Y_LEFT, 'Rate')
+    plot.set_axis_unit(BasePlot.Y_LEFT, 'Hz')
+    l = make.legend()
+    plot.add_item(l)
+
+    win.add_plot_widget(pW, 0)
+    legends = [l]
+
+    if cost_steps is not None and costs is not None:
+        pW = BaseCurveWidget(win)
+        plot = pW.plot
+        plot.set_antialiasing(True)
+        for ind in xrange(len(costs)):
+            plot.add_item(make.curve(cost_steps, costs[ind],
+                                     title=names[ind], color=colors[ind]))
+            # Mark chosen kernel width
+            plot.add_item(make.marker(
+                (kernel_sizes[ind], 0), lambda x, y: '', movable=False,
+                markerstyle='|', color=colors[ind], linestyle='--',
+                linewidth=1))
+
+        plot.set_axis_scale(BasePlot.X_BOTTOM, 'log')
+        plot.set_axis_title(BasePlot.X_BOTTOM, 'Kernel width')
+        plot.set_axis_unit(BasePlot.X_BOTTOM, time_unit)
+        plot.set_axis_title(BasePlot.Y_LEFT, 'Cost')
+        l = make.legend()
+        plot.add_item(l)
+        legends.append(l)
+
+        win.add_plot_widget(pW, 1)
+
+    win.add_custom_curve_tools()
+    win.add_legend_option(legends, True)
+    win.show()
+
+    return win
+
+
+@helper.needs_qt
+def correlogram(win_title, bins, values, names, colors, square=False,
+                per_second=True, time_unit='ms'):
+    """ Create a plot dialog with (cross-)correlograms.
+
+    :param str win_title: The window title.
+    :param bins: The bin borders (length n+1).
+    :type bins: 1D array
+    :param values: The correlogram for each pair of series
+        (shape (m, m, n)).
+    :type values: 3D array
+    :param sequence names: The names of the series.
+    :param sequence colors: The colors of the series.
+    :param bool square: If ``True``, the plot will include all
+        cross-correlograms, even if they are just mirrored versions of each
+        other. If ``False``, mirrored plots are omitted.
+    :param bool per_second: If ``True``, the unit of the y-axis is count
+        per second, otherwise it is count per segment.
+    :param str time_unit: Unit of ``bins``.
+    """
+    win = PlotDialog(toolbar=True, wintitle=win_title, min_plot_width=150,
+                     min_plot_height=100)
+    x = bins[:-1] + sp.diff(bins) / 2
+
+    pairs = []
+    for i1 in xrange(len(names)):
+        start_i = 0
+        if not square:
+            start_i = i1
+        for i2 in xrange(start_i, len(names)):
+            pairs.append((i1, i2))
+
+    columns = int(sp.sqrt(len(pairs)))
+
+    legends = []
+    for i, (i1, i2) in enumerate(pairs):
+        pW = BaseCurveWidget(win)
+        plot = pW.plot
+        plot.set_antialiasing(True)
+        plot.add_item(make.curve(x, values[i1][i2]))
+
+        legend_items = [_legend_curve(plot, names[i1], colors[i1])]
+        if i1 != i2:
+            legend_items.append(_legend_curve(plot, names[i2], colors[i2]))
+        legends.append(make.legend(restrict_items=legend_items))
+        plot.add_item(legends[-1])
+
+        if i >= len(pairs) - columns:
+            plot.set_axis_title(BasePlot.X_BOTTOM, 'Time')
+            plot.set_axis_unit(BasePlot.X_BOTTOM, time_unit)
+        if i % columns == 0:
+            plot.set_axis_title(BasePlot.Y_LEFT, 'Correlation')
+            if per_second:
+                plot.set_axis_unit(BasePlot.Y_LEFT, 'count/second')
+            else:
+                plot.set_axis_unit(BasePlot.Y_LEFT, 'count/segment')
+
+        win.add_plot_widget(pW, i, column=i % columns)
+
+    win.add_custom_curve_tools()
+    win.add_legend_option(legends, True)
+    win.show()
+
+    if len(pairs) > 1:
+        win.add_x_synchronization_option(True, range(len(pairs)))
+        win.add_y_synchronization_option(False, range(len(pairs)))
+
+    return win
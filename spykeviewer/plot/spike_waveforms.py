@@ -0,0 +1,270 @@
+import scipy as sp
+import quantities as pq
+
+from guiqwt.builder import make
+from guiqwt.baseplot import BasePlot
+from guiqwt.plot import BaseCurveWidget
+from PyQt4 import Qt
+
+from spykeutils.progress_indicator import ProgressIndicator
+from spykeutils import SpykeException
+from spykeutils.plot.dialog import PlotDialog
+from spykeutils.plot import helper
+from spykeutils.plot.spike_waveforms import _add_plot, _add_legend
+
+from ..analysis.waveforms import WaveformDensity
+
+
+def _count(waves):
+    return sum(len(w) for w in waves.itervalues())
+
+
+def _find_y_offset(channels, waves, strong):
+    """ Find y offset needed when plotting waveforms split vertically by
+    channel.
+    """
+    arrays = [w for w in waves.values() + strong.values() if len(w)]
+    max_y = [max(w[:, c, :].max() for w in arrays) for c in channels]
+    min_y = [min(w[:, c, :].min() for w in arrays) for c in channels]
+
+    max_offset = 0.0
+    for i in range(1, len(channels)):
+        max_offset = max(max_offset, max_y[i - 1] - min_y[i])
+    return max_offset
+
+
+def _add_density(plot, waves, c, x, y_offset, bins, progress):
+    """ Add an image with the density of one channel of all waveforms to
+    a plot.
+    """
+    arrays = [w[:, c, :] for w in waves.itervalues() if len(w)]
+    if not arrays:
+        return
+    y_min = min(a.min() for a in arrays)
+    y_max = max(a.max() for a in arrays)
+
+    density = WaveformDensity(len(x), y_min, y_max, bins)
+    for a in arrays:
+        for i in xrange(0, len(a), 4096):
+            density.add(a[i:i + 4096])
+            progress.step(len(a[i:i + 4096]))
+
+    image = make.image(sp.log1p(density.counts).astype(sp.float32),
+                       xdata=[x[0], x[-1]],
+                       ydata=[y_min + y_offset, y_max + y_offset],
+                       colormap='jet', interpolation='nearest')
+    plot.add_item(image)
+
+
+def _add_curves(plot, waves, strong, c, x, y_offset, fade, progress,
+                density_bins=0):
+    """ Add curves for one channel of all waveforms to a plot. If
+    ``density_bins`` is larger than 0, an image of the waveform density
+    is shown instead of curves for the waveforms in ``waves``.
+    """
+    if density_bins > 0:
+        _add_density(plot, waves, c, x, y_offset, density_bins, progress)
+        waves = {}
+
+    for u, w in waves.iteritems():
+        if not len(w):
+            continue
+        color = helper.get_object_color(u)
+        qcol = Qt.QColor(color)
+        alpha = fade if fade > 0.0 else 1.0
+        alpha_step = 1.0 - fade if fade > 0.0 else -1.0 - fade
+        alpha_step /= len(w)
+        if len(w) == 1:
+            alpha = 1.0
+
+        for y in w[:, c, :]:
+            curve = make.curve(x, y + y_offset, u.name, color=color)
+            qcol.setAlphaF(alpha)
+            curve.setPen(Qt.QPen(qcol))
+            alpha += alpha_step
+
+            plot.add_item(curve)
+            progress.step()
+
+    for u, w in strong.iteritems():
+        color = helper.get_object_color(u)
+        for y in w[:, c, :]:
+            outline = make.curve(x, y + y_offset, color='#000000',
+                                 linewidth=4)
+            curve = make.curve(x, y + y_offset, color=color, linewidth=2)
+            plot.add_item(outline)
+            plot.add_item(curve)
+            progress.step()
+
+
+def _split_plot_ver(channels, waves, strong, fade, x, progress,
+                    max_offset, plot, density_bins):
+    """ Fill a plot with waveforms vertically split by channel. Returns
+    legend.
+    """
+    offset = 0.0
+    for c in channels:
+        _add_curves(plot, waves, strong, c, x, offset, fade, progress,
+                    density_bins)
+        offset += max_offset
+    return _add_legend(plot, waves, strong)
+
+
+def _split_plot_hor(channels, waves, strong, fade, x, progress, plot,
+                    density_bins):
+    """ Fill a plot with waveforms horizontally split by channel. Returns
+    legend.
+    """
+    offset = 0.0
+    for c in channels:
+        _add_curves(plot, waves, strong, c, x + offset, 0.0, fade, progress,
+                    density_bins)
+        offset += x[-1]
+        if c != channels[-1]:
+            plot.add_item(
+                make.marker((offset, 0), lambda x, y: '',
+                            movable=False, markerstyle='|',
+                            color='k', linestyle='-', linewidth=1))
+    return _add_legend(plot, waves, strong)
+
+
+@helper.needs_qt
+def waveforms(waveforms, sampling_rate, axes_style, strong=None,
+              anti_alias=False, fade=1.0, subplot_layout=0,
+              time_unit=pq.ms, progress=None, density_bins=0):
+    """ Create a plot dialog with spike waveforms. Works like
+    :func:`spykeutils.plot.spikes`, but the waveforms are given as arrays
+    instead of :class:`neo.core.Spike` objects.
+
+    :param dict waveforms: A dictionary of waveform Quantity arrays with
+        the shape (spikes, channels, samples), indexed by unit. All arrays
+        need the same number of channels and samples.
+    :param Quantity sampling_rate: The sampling rate of the waveforms.
+    :param int axes_style: Plotting mode, see
+        :func:`spykeutils.plot.spikes`.
+    :param dict strong: A dictionary of waveform Quantity arrays. When
+        given, these waveforms are shown as thick lines on top of the
+        regular waveforms in the respective plots.
+    :param bool anti_alias: Determines whether an antialiased plot is
+        created.
+    :param float fade: Vary transparency by spike. For values > 0, the
+        first spike for each unit is displayed with the corresponding alpha
+        value and alpha is linearly interpolated until it is 1 for the
+        last spike. For values < 0, alpha is 1 for the first spike and
+        ``fade`` for the last spike. Does not affect waveforms from
+        ``strong``.
+    :param bool subplot_layout: The way subplots are arranged on the
+        window, see :func:`spykeutils.plot.spikes`.
+    :param Quantity time_unit: Unit of X-Axis.
+    :param progress: Set this parameter to report progress.
+    :type progress: :class:`spykeutils.progress_indicator.ProgressIndicator`
+    :param int density_bins: If larger than 0, the waveforms in
+        ``waveforms`` are not drawn as individual lines. Instead, an image
+        of their density over time and amplitude with this number of
+        amplitude bins is shown. The waveforms of all units in a plot are
+        included in one image. ``fade`` and ``anti_alias`` have no effect
+        on the image.
+    """
+    if strong is None:
+        strong = {}
+    if _count(waveforms) < 1 and _count(strong) < 1:
+        raise SpykeException('No spikes for spike waveform plot!')
+    if not progress:
+        progress = ProgressIndicator()
+
+    progress.begin('Creating waveform plot')
+    progress.set_ticks(_count(waveforms) + _count(strong))
+    win = PlotDialog(toolbar=True, wintitle='Spike waveforms')
+
+    ref = [w for w in waveforms.values() + strong.values() if len(w)][0]
+    ref_units = ref.units
+    waveforms = dict((u, sp.asarray(w.rescale(ref_units)))
+                     for u, w in waveforms.iteritems())
+    strong = dict((u, sp.asarray(w.rescale(ref_units)))
+                  for u, w in strong.iteritems())
+    channels = range(ref.shape[1])
+    x = sp.asarray((sp.arange(ref.shape[2]) /
+                    sampling_rate).rescale(time_unit))
+
+    # Keys from waveforms and strong without duplicates in original order
+    seen = set()
+    indices = [k for k in waveforms.keys() + strong.keys()
+               if k not in seen and not seen.add(k)]
+
+    if axes_style <= 2:  # Separate channel plots
+        for c in channels:
+            pw = BaseCurveWidget(win)
+            plot = pw.plot
+            plot.set_antialiasing(anti_alias)
+            _add_curves(plot, waveforms, strong, c, x, 0.0, fade, progress,
+                        density_bins)
+            _add_plot(plot, pw, win, c, len(channels), subplot_layout,
+                      axes_style, time_unit, ref_units)
+
+        helper.make_window_legend(win, indices, True)
+    elif axes_style > 4:  # Only one plot needed
+        pw = BaseCurveWidget(win)
+        plot = pw.plot
+        plot.set_antialiasing(anti_alias)
+
+        if axes_style == 6:  # Horizontal split
+            l = _split_plot_hor(channels, waveforms, strong, fade, x,
+                                progress, plot, density_bins)
+
+            plot.set_axis_title(BasePlot.X_BOTTOM, 'Time')
+            plot.set_axis_unit(
+                BasePlot.X_BOTTOM, time_unit.dimensionality.string)
+        else:  # Vertical split
+            channels.reverse()
+
+            max_offset = _find_y_offset(channels, waveforms, strong)
+            l = _split_plot_ver(channels, waveforms, strong, fade, x,
+                                progress, max_offset, plot, density_bins)
+
+            plot.set_axis_title(BasePlot.Y_LEFT, 'Voltage')
+            plot.set_axis_unit(
+                BasePlot.Y_LEFT, ref_units.dimensionality.string)
+
+        win.add_plot_widget(pw, 0)
+        win.add_legend_option([l], True)
+    else:  # One plot per unit
+        if axes_style == 3:
+            channels.reverse()
+            max_offset = _find_y_offset(channels, waveforms, strong)
+
+        for i, u in enumerate(indices):
+            pw = BaseCurveWidget(win)
+            plot = pw.plot
+            plot.set_antialiasing(anti_alias)
+
+            wav = {}
+            if u in waveforms:
+                wav[u] = waveforms[u]
+            st = {}
+            if u in strong:
+                st[u] = strong[u]
+
+            if axes_style == 3:  # Vertical split
+                _split_plot_ver(channels, wav, st, fade, x, progress,
+                                max_offset, plot, density_bins)
+            else:  # Horizontal split
+                _split_plot_hor(channels, wav, st, fade, x, progress, plot,
+                                density_bins)
+
+            _add_plot(plot, pw, win, i, len(indices), subplot_layout,
+                      axes_style, time_unit, ref_units)
+
+    win.add_custom_curve_tools()
+    progress.done()
+    win.show()
+
+    if axes_style <= 2:
+        if len(channels) > 1:
+            win.add_x_synchronization_option(True, channels)
+            win.add_y_synchronization_option(True, channels)
+    elif axes_style <= 4:
+        if len(indices) > 1:
+            win.add_x_synchronization_option(True, range(len(indices)))
+            win.add_y_synchronization_option(True, range(len(indices)))
+
+    return win
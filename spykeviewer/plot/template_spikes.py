@@ -0,0 +1,74 @@
+from __future__ import division
+
+import scipy as sp
+
+from guiqwt.curve import CurveItem
+
+
+def visible_times(times, start, stop, x_min, x_max, width):
+    """ Return the spike times for which a waveform is visible in a time
+    range. Of multiple spikes that start at the same pixel, only the first
+    is returned since their waveforms look the same.
+
+    :param times: The sorted spike times.
+    :type times: 1D array
+    :param float start: Start of the visible time range.
+    :param float stop: End of the visible time range.
+    :param float x_min: Start of the waveform relative to the spike time.
+    :param float x_max: End of the waveform relative to the spike time.
+    :param int width: The width of the visible range in pixels.
+    """
+    first = times.searchsorted(start - x_max)
+    last = times.searchsorted(stop - x_min, 'right')
+    times = times[first:last]
+    if len(times) < 2 or stop <= start:
+        return times
+
+    pixels = sp.floor((times - start) * (width / (stop - start)))
+    return times[sp.concatenate(([True], sp.diff(pixels) > 0))]
+
+
+class TemplateSpikesItem(CurveItem):
+    """ A curve item that draws the same spike waveform at many times.
+    The waveform is stored once and the item draws it at each visible
+    spike time, so no objects are created for individual spikes.
+    """
+    def __init__(self, x, y, times, curveparam=None):
+        """ Create the item.
+
+        :param x: The times of the waveform samples relative to the spike
+            time.
+        :type x: 1D array
+        :param y: The waveform.
+        :type y: 1D array
+        :param times: The spike times. Must not be empty.
+        :type times: 1D array
+        """
+        CurveItem.__init__(self, curveparam)
+        self.times = sp.sort(sp.asarray(times, dtype=float).ravel())
+        self.set_data(x, y)
+        self._x_min = float(sp.amin(x))
+        self._x_max = float(sp.amax(x))
+
+        self._bounds = CurveItem.boundingRect(self)
+        self._bounds.translate(self.times[0], 0)
+        self._bounds.setRight(
+            self._bounds.right() + self.times[-1] - self.times[0])
+
+    def boundingRect(self):
+        return self._bounds
+
+    def draw(self, painter, xMap, yMap, canvasRect):
+        s1, s2 = xMap.s1(), xMap.s2()
+        start, stop = sorted((s1, s2))
+        width = max(int(abs(xMap.p2() - xMap.p1())), 1)
+        times = visible_times(self.times, start, stop,
+                              self._x_min, self._x_max, width)
+
+        # Draw the waveform at each spike time by shifting the scale
+        try:
+            for t in times:
+                xMap.setScaleInterval(s1 - t, s2 - t)
+                CurveItem.draw(self, painter, xMap, yMap, canvasRect)
+        finally:
+            xMap.setScaleInterval(s1, s2)
@@ -0,0 +1,41 @@
+""" Serialized access to data files from multiple threads. Neo IOs (in
+particular for HDF5 files) and the block caches of
+:class:`spykeutils.plugin.data_provider_neo.NeoDataProvider` are not
+thread safe. After :func:`install` has been called, data providers hold
+:data:`data_lock` while they load files or lazily loaded objects. Code
+that changes the object hierarchy outside of the data provider, e.g.
+when replacing loaded objects, should also hold the lock.
+"""
+import threading
+import functools
+
+from spykeutils.plugin.data_provider_neo import NeoDataProvider
+
+
+data_lock = threading.RLock()
+
+
+def locked(f):
+    """ Decorator that holds :data:`data_lock` while the function runs.
+    """
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        with data_lock:
+            return f(*args, **kwargs)
+    wrapper.data_locked = True
+    return wrapper
+
+
+def install():
+    """ Make :class:`spykeutils.plugin.data_provider_neo.NeoDataProvider`
+    hold :data:`data_lock` while loading blocks and lazily loaded
+    objects. Calling this function more than once has no further effect.
+    """
+    if getattr(NeoDataProvider._load_lazy_object, 'data_locked', False):
+        return
+
+    NeoDataProvider._load_lazy_object = locked(
+        NeoDataProvider.__dict__['_load_lazy_object'])
+    for name in ('get_block', 'get_blocks'):
+        f = NeoDataProvider.__dict__[name].__func__
+        setattr(NeoDataProvider, name, classmethod(locked(f)))
@@ -0,0 +1,132 @@
+""" Removal of loaded data arrays to limit memory usage. In lazy load
+mode (or with lazy cascading), signals and spike trains that were read
+from a file can be replaced by lazy objects again. Like lazily loaded
+objects, they are read again by
+:class:`spykeutils.plugin.data_provider_neo.NeoDataProvider` when a
+plugin accesses them. Containers like segments and units are not
+changed, so navigation works as before.
+"""
+import neo
+from spykeutils.plugin.data_provider_neo import NeoDataProvider
+
+
+# Names of data object lists in segments, their types and the name of the
+# attribute that links to the second container that holds them
+DATA_LISTS = (('analogsignals', neo.AnalogSignal, 'recordingchannel'),
+              ('analogsignalarrays', neo.AnalogSignalArray,
+               'recordingchannelgroup'),
+              ('irregularlysampledsignals', neo.IrregularlySampledSignal,
+               'recordingchannel'),
+              ('spiketrains', neo.SpikeTrain, 'unit'))
+
+
+def _items(l):
+    """ Return the items of a list without loading the items of a
+    :class:`neo.io.tools.LazyList`.
+    """
+    return list(getattr(l, '_data', l))
+
+
+def _replace_in(l, old, new):
+    for i, o in enumerate(_items(l)):
+        if o is old:
+            l[i] = new
+            return
+
+
+def can_reload(block):
+    """ Return if data objects of a block can be read again from its
+    file.
+    """
+    io = NeoDataProvider.block_ios.get(block)
+    if io is None:
+        return False
+    return hasattr(io, 'load_lazy_object') or \
+        isinstance(io, neo.io.NeoHdf5IO)
+
+
+def loaded_objects(block):
+    """ Return the loaded signals and spike trains in a block, without
+    loading any objects. Each entry is a tuple of the object, the name of
+    its list in the segment and the name of its parent attribute.
+    """
+    objects = []
+    for s in _items(block.segments):
+        if not isinstance(s, neo.Segment):
+            continue
+        for name, cls, parent in DATA_LISTS:
+            for o in _items(getattr(s, name)):
+                if isinstance(o, cls) and not hasattr(o, 'lazy_shape'):
+                    objects.append((o, name, parent))
+    return objects
+
+
+def object_size(o):
+    """ Return the memory size of a data object in bytes, including
+    waveforms of spike trains.
+    """
+    size = o.nbytes
+    waveforms = getattr(o, 'waveforms', None)
+    if waveforms is not None:
+        size += waveforms.nbytes
+    return size
+
+
+def lazy_copy(o):
+    """ Return an empty copy of a data object that is marked as lazily
+    loaded, so it can replace the object and be read again from the
+    file.
+    """
+    lazy = o[:0]
+    for k, v in o.__dict__.iteritems():
+        if k not in lazy.__dict__:
+            setattr(lazy, k, v)
+    lazy.lazy_shape = o.shape
+    return lazy
+
+
+def unload(o, name, parent):
+    """ Replace a data object by a lazy copy in its segment and parent
+    container.
+
+    :param o: The data object.
+    :param str name: The name of the list containing the object, e.g.
+        ``'spiketrains'``.
+    :param str parent: The name of the attribute of the second container
+        holding the object, e.g. ``'unit'``.
+    """
+    lazy = lazy_copy(o)
+    _replace_in(getattr(o.segment, name), o, lazy)
+    container = getattr(o, parent, None)
+    if container is not None:
+        _replace_in(getattr(container, name), o, lazy)
+    return lazy
+
+
+def evict(blocks, keep, budget):
+    """ Unload data objects until the total size of loaded objects in all
+    given blocks is at most ``budget`` bytes. Objects are unloaded from
+    the first blocks first.
+
+    :param list blocks: The blocks, ordered from least to most recently
+        used.
+    :param set keep: Blocks from which no data is unloaded, e.g. the
+        currently selected blocks.
+    :param int budget: The maximum total size of loaded data in bytes.
+    :returns: The number of bytes that were unloaded.
+    """
+    loaded = [(b, loaded_objects(b)) for b in blocks]
+    total = sum(object_size(o) for _, l in loaded for o, _, _ in l)
+
+    freed = 0
+    for b, objects in loaded:
+        if total - freed <= budget:
+            break
+        if b in keep or not can_reload(b):
+            continue
+        for o, name, parent in objects:
+            if total - freed <= budget:
+                break
+            unload(o, name, parent)
+            freed += object_size(o)
+    return freed
@@ -37,7 +37,7 @@ class FilterManager:
     """ Manage custom filters for object selection.
     """
 
-    class Filter:
+    class Filter(object):
         """ Represents a single filter.
         """
         def __init__(self, code, parent, active=True, combined=False,
@@ -52,14 +52,36 @@ class FilterManager:
             :param bool on_exception: Should the filter return ``True`` on an
                 exception?
             """
+            self._function = None
+            self._function_key = None
             self.code = code
             self.active = active
             self.combined = combined
             self.on_exception = on_exception
             self._parent = parent
 
+        @property
+        def code(self):
+            """ List of lines of code in the filter function. Setting the
+            code discards the compiled filter function.
+            """
+            return self._code
+
+        @code.setter
+        def code(self, code):
+            self._code = code
+            self._function = None
+
         def function(self):
-            return self._parent._get_filter_function(self)
+            """ Return the filter function. It is compiled on the first
+            call and cached until the code, the type of the filter or the
+            signature of the filter manager changes.
+            """
+            key = (self._parent.signature, self.combined)
+            if self._function is None or self._function_key != key:
+                self._function = self._parent._get_filter_function(self)
+                self._function_key = key
+            return self._function
 
     class FilterGroup:
         """ Represents a filter group.
@@ -4,6 +4,8 @@ import inspect
 import traceback
 import logging
 import re
+import json
+import hashlib
 
 from spykeutils.plugin.analysis_plugin import AnalysisPlugin
 
@@ -19,10 +21,87 @@ def _compare_nodes(x, y):
     return ret or (1 - 2 * int(x.name < y.name))
 
 
+def _file_hash(path):
+    """ Return the SHA-1 hex digest of a file.
+    """
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _load_plugins(path, dir_path):
+    """ Execute a Python file and create an instance of every plugin
+    class defined in it.
+
+    :param str path: The path of the Python file.
+    :param str dir_path: The directory containing the file. It is added
+        to ``sys.path`` while the file is executed.
+    :returns: A tuple of a list of plugin instances and a bool that
+        is ``False`` if there was an error while executing the file.
+    """
+    exc_globals = {}
+    success = True
+    try:
+        # We turn all encodings to UTF-8, so remove encoding
+        # comments manually
+        with open(path, 'r') as f:
+            lines = f.readlines()
+        if not lines:
+            return [], True
+        if re.findall('coding[:=]\s*([-\w.]+)', lines[0]):
+            lines.pop(0)
+        elif len(lines) > 1 and \
+                re.findall('coding[:=]\s*([-\w.]+)', lines[1]):
+            lines.pop(1)
+        source = ''.join(lines).decode('utf-8')
+        code = compile(source, path, 'exec')
+
+        sys.path.insert(0, dir_path)
+        exec(code, exc_globals)
+    except Exception:
+        success = False
+        logger.warning('Error during execution of ' +
+                       'potential plugin file ' + path + ':\n' +
+                       traceback.format_exc() + '\n')
+    finally:
+        if sys.path[0] == dir_path:
+            sys.path.pop(0)
+
+    plugins = []
+    for cl in exc_globals.values():
+        if not inspect.isclass(cl):
+            continue
+
+        # Should be a subclass of AnalysisPlugin...
+        if not issubclass(cl, AnalysisPlugin):
+            continue
+        # ...but should not be AnalysisPlugin (can happen
+        # when directly imported)
+        if cl == AnalysisPlugin:
+            continue
+
+        # Plugin class found
+        try:
+            instance = cl()
+            instance.source_file = path
+        except Exception:
+            etype, evalue, etb = sys.exc_info()
+            evalue = etype('Exception while creating %s: %s' %
+                           (cl.__name__, evalue))
+            raise etype, evalue, etb
+        plugins.append(instance)
+
+    return plugins, success
+
+
 class PluginManager:
     """ Manages plugins loaded from a directory.
+
+    If a manifest file is used, the names of the plugins found in each
+    file are stored in it together with modification time, size and hash
+    of the file. Files that did not change since the manifest was written
+    are only executed when one of their plugins is accessed.
     """
-    class Node:
+    class Node(object):
         def __init__(self, parent, data, path, name):
             self.parent = parent
             self.data = data
@@ -37,13 +116,65 @@ class PluginManager:
                 return self.parent.children.index(self)
             return 0
 
+    class PluginFile(object):
+        """ A Python file with plugins that is executed on first access.
+        """
+        def __init__(self, path, dir_path):
+            self.path = path
+            self.dir_path = dir_path
+            self.plugins = None
+
+        def is_loaded(self):
+            return self.plugins is not None
+
+        def load(self):
+            """ Execute the file if it has not been executed yet.
+
+            :returns: dict of plugin instances indexed by class name.
+            """
+            if self.plugins is None:
+                self.plugins = {}
+                try:
+                    for p in _load_plugins(self.path, self.dir_path)[0]:
+                        self.plugins[type(p).__name__] = p
+                except Exception:
+                    logger.warning('Error while loading plugins from ' +
+                                   self.path + ':\n' +
+                                   traceback.format_exc() + '\n')
+            return self.plugins
+
+    class PluginNode(Node):
+        """ A node for a plugin from the manifest. The plugin is created
+        when the ``data`` attribute is accessed for the first time.
+        """
+        def __init__(self, parent, plugin_file, class_name, name):
+            self.parent = parent
+            self.plugin_file = plugin_file
+            self.class_name = class_name
+            self.name = name
+            self.path = plugin_file.path
+            # Configuration to set when the plugin is created
+            self.pending_config = None
+
+        def is_loaded(self):
+            return self.plugin_file.is_loaded()
+
+        @property
+        def data(self):
+            plugin = self.plugin_file.load().get(self.class_name)
+            if plugin and self.pending_config is not None:
+                plugin.set_parameters(self.pending_config)
+                self.pending_config = None
+            return plugin
+
     class DirNode(Node):
-        def __init__(self, parent, data, path=''):
+        def __init__(self, parent, data, path='', manifest=None):
             """ Recursively walk down the tree, loading all legal
             plugin classes along the way.
             """
             PluginManager.Node.__init__(self, parent, data, path, '')
             self.children = []
+            self.manifest = manifest
 
             if path:
                 self.addPath(path)
@@ -86,69 +217,159 @@ class PluginManager:
                     if new_node:
                         new_node.addPath(p)
                     else:
-                        new_node = PluginManager.DirNode(self, None, p)
+                        new_node = PluginManager.DirNode(
+                            self, None, p, self.manifest)
                         if new_node.childCount():
                             self.children.append(new_node)
                 else:
                     if not f.endswith('.py'):
                         continue
 
-                    # Found a Python file, execute it and look for plugins
-                    exc_globals = {}
-                    try:
-                        # We turn all encodings to UTF-8, so remove encoding
-                        # comments manually
-                        f = open(p, 'r')
-                        lines = f.readlines()
-                        if not lines:
-                            continue
-                        if re.findall('coding[:=]\s*([-\w.]+)', lines[0]):
-                            lines.pop(0)
-                        elif re.findall('coding[:=]\s*([-\w.]+)', lines[1]):
-                            lines.pop(1)
-                        source = ''.join(lines).decode('utf-8')
-                        code = compile(source, p, 'exec')
-
-                        sys.path.insert(0, path)
-                        exec(code, exc_globals)
-                    except Exception:
-                        logger.warning('Error during execution of ' +
-                                       'potential plugin file ' + p + ':\n' +
-                                       traceback.format_exc() + '\n')
-                    finally:
-                        if sys.path[0] == path:
-                            sys.path.pop(0)
-
-                    for cl in exc_globals.values():
-                        if not inspect.isclass(cl):
-                            continue
-
-                        # Should be a subclass of AnalysisPlugin...
-                        if not issubclass(cl, AnalysisPlugin):
-                            continue
-                        # ...but should not be AnalysisPlugin (can happen
-                        # when directly imported)
-                        if cl == AnalysisPlugin:
-                            continue
-
-                        # Plugin class found, add it to tree
-                        try:
-                            instance = cl()
-                            instance.source_file = p
-                        except Exception:
-                            etype, evalue, etb = sys.exc_info()
-                            evalue = etype('Exception while creating %s: %s' %
-                                           (cl.__name__, evalue))
-                            raise etype, evalue, etb
-                        self.children.append(PluginManager.Node(
-                            self, instance, p, instance.get_name()))
+                    self._add_plugin_file(p, path)
 
             self.children.sort(cmp=_compare_nodes)
 
-    def __init__(self):
-        self.root = self.DirNode(None, None)
+        def _add_plugin_file(self, path, dir_path):
+            """ Add nodes for all plugins in a Python file. If the file
+            is unchanged since it was recorded in the manifest, it is not
+            executed.
+            """
+            if self.manifest is None:
+                for plugin in _load_plugins(path, dir_path)[0]:
+                    self.children.append(PluginManager.Node(
+                        self, plugin, path, plugin.get_name()))
+                return
+
+            stat = os.stat(path)
+            key = path.decode('utf-8')
+            entry = self.manifest.get(key)
+            if entry and (entry['mtime'] != stat.st_mtime or
+                          entry['size'] != stat.st_size):
+                if entry['sha1'] == _file_hash(path):
+                    entry['mtime'] = stat.st_mtime
+                    entry['size'] = stat.st_size
+                else:
+                    entry = None
+
+            if entry:
+                plugin_file = PluginManager.PluginFile(path, dir_path)
+                for class_name, name in entry['plugins']:
+                    self.children.append(PluginManager.PluginNode(
+                        self, plugin_file, class_name, name.encode('utf-8')))
+                return
+
+            # Found a new or changed Python file, execute it and look
+            # for plugins
+            plugins, success = _load_plugins(path, dir_path)
+            for plugin in plugins:
+                self.children.append(PluginManager.Node(
+                    self, plugin, path, plugin.get_name()))
+
+            if success:
+                self.manifest[key] = {
+                    'mtime': stat.st_mtime, 'size': stat.st_size,
+                    'sha1': _file_hash(path),
+                    'plugins': [[type(p).__name__, p.get_name()]
+                                for p in plugins]}
+            elif key in self.manifest:
+                del self.manifest[key]
+
+    def __init__(self, manifest_path=None):
+        """ Create a new plugin manager.
+
+        :param str manifest_path: Path of the manifest file. If ``None``,
+            no manifest is used and all plugin files are executed when
+            they are added. Default: ``None``
+        """
+        self.manifest_path = manifest_path
+        manifest = None
+        if manifest_path:
+            manifest = {}
+            if os.path.isfile(manifest_path):
+                try:
+                    with open(manifest_path, 'r') as f:
+                        manifest = json.load(f)
+                except Exception:
+                    logger.warning('Could not read plugin manifest ' +
+                                   manifest_path + ':\n' +
+                                   traceback.format_exc() + '\n')
+        self.root = self.DirNode(None, None, manifest=manifest)
 
     def add_path(self, path):
         """ Add a new path to the manager.
         """
-        self.root.addPath(path)
\ No newline at end of file
+        self.root.addPath(path)
+        self.save_manifest()
+
+    def save_manifest(self):
+        """ Write the manifest file. Entries for files that no longer
+        exist are removed.
+        """
+        if not self.manifest_path:
+            return
+
+        manifest = self.root.manifest
+        for p in manifest.keys():
+            if not os.path.isfile(p):
+                del manifest[p]
+
+        try:
+            directory = os.path.dirname(self.manifest_path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            with open(self.manifest_path, 'w') as f:
+                json.dump(manifest, f)
+        except (IOError, OSError):
+            logger.warning('Could not write plugin manifest ' +
+                           self.manifest_path + ':\n' +
+                           traceback.format_exc() + '\n')
+
+    def _plugin_nodes(self, node=None):
+        """ Return all plugin nodes below a node (default: root).
+        """
+        if node is None:
+            node = self.root
+        nodes = []
+        for c in node.children:
+            if isinstance(c, PluginManager.DirNode):
+                nodes.extend(self._plugin_nodes(c))
+            else:
+                nodes.append(c)
+        return nodes
+
+    def get_plugin_configs(self):
+        """ Return dictionary indexed by (name, path) tuples with
+        configuration dictionaries for all plugins. Plugins that have
+        not been loaded are not created: their configuration is only
+        included if it has been set with :meth:`set_plugin_configs`.
+        """
+        configs = {}
+        for n in self._plugin_nodes():
+            if isinstance(n, PluginManager.PluginNode) and \
+                    not n.is_loaded():
+                if n.pending_config is not None:
+                    configs[(n.name, n.path)] = n.pending_config
+                continue
+
+            plugin = n.data
+            if plugin:
+                configs[(plugin.get_name(), n.path)] = \
+                    plugin.get_parameters()
+        return configs
+
+    def set_plugin_configs(self, configs):
+        """ Takes a dictionary indexed by (name, path) tuples with
+        configuration dictionaries and sets configurations of plugins.
+        For plugins that have not been loaded, the configuration is
+        set when they are created.
+        """
+        for n in self._plugin_nodes():
+            if isinstance(n, PluginManager.PluginNode) and \
+                    not n.is_loaded():
+                if (n.name, n.path) in configs:
+                    n.pending_config = configs[(n.name, n.path)]
+                continue
+
+            plugin = n.data
+            if plugin and (plugin.get_name(), n.path) in configs:
+                plugin.set_parameters(configs[(plugin.get_name(), n.path)])
@@ -0,0 +1,344 @@
+#! /usr/bin/env python
+""" Persistent worker process for running plugins outside of Spyke Viewer.
+
+The worker reads jobs from stdin, one JSON object per line, and runs them
+one after another. Each job contains the same information that is passed
+to the remote script on the command line:
+
+* ``id``: Identifier of the job.
+* ``name``: Name of the plugin class.
+* ``path``: Path of the plugin file.
+* ``selections``: List of serialized selections, the first one is used as
+  current selection.
+* ``config``: Pickled plugin configuration, decoded as Latin-1.
+* ``data_dir``: The data directory for plugins.
+* ``io_files``: List of paths to required IO plugins.
+
+After a job is finished, the line ``JOB_DONE_MARKER <id> <status>`` is
+written to both stdout and stderr. If the plugin output did not end with
+a newline, a newline is written before the marker. The status is ``ok``
+if the plugin finished successfully, ``error`` otherwise. The markers
+can be disabled with ``--nomarkers`` if the worker only runs a single
+job. Plugin files and loaded data files stay in memory between jobs, so
+subsequent jobs do not need to load them again. The worker exits when
+stdin is closed.
+"""
+import sys
+import os
+import json
+import errno
+import pickle
+import inspect
+import argparse
+import threading
+import traceback
+
+from spykeutils.plugin.analysis_plugin import AnalysisPlugin
+from spykeutils.plugin.data_provider import DataProvider
+from spykeutils.plugin.data_provider_neo import NeoDataProvider
+from spykeutils.plugin import io_plugin
+from spykeutils import progress_indicator
+
+# Data provider implementations need to be imported so they can be loaded
+import spykeutils.plugin.data_provider_stored
+
+JOB_DONE_MARKER = '#spykeviewer-worker-done#'
+
+
+def split_marker(line):
+    """ Split a line of worker output at the job done marker.
+
+    :param str line: A line of output.
+    :returns: The output before the marker and a tuple of job id and
+        status. If the line does not contain a marker, the tuple is
+        ``None``.
+    """
+    pos = line.find(JOB_DONE_MARKER)
+    if pos < 0:
+        return line, None
+    fields = line[pos + len(JOB_DONE_MARKER):].split()
+    job_id = fields[0] if fields else None
+    status = fields[1] if len(fields) > 1 else 'error'
+    return line[:pos], (job_id, status)
+
+
+class LineTrackingStream(object):
+    """ Wraps an output stream and records if the last output ended with
+    a newline. Output is discarded when the reading end of the stream
+    is closed, e.g. because Spyke Viewer exited while plugin windows of
+    the worker are still open.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self.at_line_start = True
+
+    def write(self, s):
+        if s:
+            self.at_line_start = s.endswith('\n')
+        self._call(self.stream.write, s)
+
+    def flush(self):
+        self._call(self.stream.flush)
+
+    @staticmethod
+    def _call(method, *args):
+        try:
+            method(*args)
+        except IOError, e:
+            if e.errno != errno.EPIPE:
+                raise
+
+    def writelines(self, lines):
+        for l in lines:
+            self.write(l)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class PluginWorker(object):
+    """ Runs plugin jobs and keeps plugin code and data files in memory.
+    """
+    def __init__(self, max_files, progress, markers=True):
+        """ Create a new worker.
+
+        :param int max_files: The maximum number of data files that are
+            kept in memory between jobs.
+        :param progress: The progress indicator used by plugins.
+        :param bool markers: Write a marker line to stdout and stderr
+            after each job.
+        """
+        self.max_files = max_files
+        self.progress = progress
+        self.markers = markers
+        # Executed plugin files: (modification time, globals) indexed by
+        # path
+        self.plugin_files = {}
+        self.io_files = set()
+        # Paths of loaded data files, most recently used last
+        self.data_files = []
+        # Number of input lines that have been handled
+        self.lines_done = 0
+
+    def load_plugin(self, name, path):
+        """ Return a new instance of a plugin class. The plugin file is
+        only executed again if it changed since it was last executed.
+        """
+        mtime = os.path.getmtime(path)
+        if path not in self.plugin_files or \
+                self.plugin_files[path][0] != mtime:
+            exc_globals = {}
+            directory = os.path.dirname(path)
+            sys.path.insert(0, directory)
+            try:
+                execfile(path, exc_globals)
+            finally:
+                if sys.path[0] == directory:
+                    sys.path.pop(0)
+            self.plugin_files[path] = (mtime, exc_globals)
+
+        for cl in self.plugin_files[path][1].values():
+            if not inspect.isclass(cl):
+                continue
+            if not issubclass(cl, AnalysisPlugin):
+                continue
+            if cl.__name__ == name:
+                return cl()
+        return None
+
+    def run_job(self, job):
+        """ Run a single job. Returns ``True`` if the plugin finished
+        successfully.
+        """
+        for io in job.get('io_files', []):
+            if io not in self.io_files:
+                io_plugin.load_from_file(io)
+                self.io_files.add(io)
+
+        plugin = self.load_plugin(job['name'], job['path'])
+        if not plugin:
+            sys.stderr.write('Could not find plugin class, aborting...\n')
+            return False
+
+        if job.get('config'):
+            plugin.set_parameters(
+                pickle.loads(job['config'].encode('latin-1')))
+
+        selections = []
+        for s in job['selections']:
+            selection = DataProvider.from_data(s)
+            selection.progress = self.progress
+            selections.append(selection)
+
+        data_dir = job.get('data_dir')
+        if data_dir and os.path.isdir(data_dir):
+            AnalysisPlugin.data_dir = data_dir
+
+        success = False
+        try:
+            plugin.start(selections[0], selections[1:])
+            success = True
+        except progress_indicator.CancelException:
+            print 'User canceled.'
+        finally:
+            self.progress.done()
+            self.used_files(job['selections'])
+        return success
+
+    def used_files(self, selections):
+        """ Update the list of recently used data files and remove the
+        least recently used files from memory.
+        """
+        for s in selections:
+            for b in s.get('blocks', []):
+                if b[1] in self.data_files:
+                    self.data_files.remove(b[1])
+                self.data_files.append(b[1])
+
+        while len(self.data_files) > self.max_files:
+            self.remove_file(self.data_files.pop(0))
+
+    @staticmethod
+    def remove_file(filename):
+        """ Remove all blocks of a data file from the data provider cache.
+        """
+        blocks = NeoDataProvider.loaded_blocks.pop(filename, [])
+        ios = set()
+        for b in blocks:
+            NeoDataProvider.block_indices.pop(b, None)
+            NeoDataProvider.block_read_params.pop(b, None)
+            io = NeoDataProvider.block_ios.pop(b, None)
+            if io is not None:
+                ios.add(io)
+        for io in ios:
+            if io not in NeoDataProvider.block_ios.values() and \
+                    hasattr(io, 'close'):
+                io.close()
+
+    def handle_line(self, line):
+        """ Run the job contained in a line of input.
+        """
+        job_id = None
+        success = False
+        try:
+            job = json.loads(line)
+            job_id = job['id']
+            success = self.run_job(job)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            if self.markers:
+                marker = '%s %s %s\n' % (JOB_DONE_MARKER, job_id,
+                                         'ok' if success else 'error')
+                for stream in (sys.stderr, sys.stdout):
+                    # The marker has to start a new line
+                    if not getattr(stream, 'at_line_start', False):
+                        stream.write('\n')
+                    stream.write(marker)
+            sys.stderr.flush()
+            sys.stdout.flush()
+            self.lines_done += 1
+
+
+def _run_qt(max_files, markers):
+    """ Run jobs in a Qt event loop, so plugins can create windows. Lines
+    are read from stdin in a separate thread.
+    """
+    from spykeutils.plot.helper import ProgressIndicatorDialog
+    from PyQt4.QtGui import QApplication
+    from PyQt4.QtCore import QObject, pyqtSignal
+
+    # Prepare matplotlib
+    import matplotlib
+    matplotlib.use('Qt4Agg')
+    import matplotlib.pyplot
+    matplotlib.pyplot.ion()
+
+    app = QApplication([])
+    # Windows created by plugins should not end the worker
+    app.setQuitOnLastWindowClosed(False)
+    progress = ProgressIndicatorDialog(None)
+    worker = PluginWorker(max_files, progress, markers)
+
+    class InputReader(QObject):
+        line_read = pyqtSignal(str)
+        input_closed = pyqtSignal(int)
+
+        def run(self):
+            lines = 0
+            for line in iter(sys.stdin.readline, b''):
+                if line.strip():
+                    lines += 1
+                    self.line_read.emit(line.decode('utf-8'))
+            self.input_closed.emit(lines)
+
+    # Number of lines read from stdin, known when it is closed
+    input_lines = []
+
+    def quit_when_done():
+        # Plugins process events while they run, so the input can be
+        # closed before a job is done and has created its windows
+        if not input_lines or worker.lines_done < input_lines[0]:
+            return
+        # Quit when all plugin windows are closed
+        app.setQuitOnLastWindowClosed(True)
+        if not [w for w in app.topLevelWidgets()
+                if w.isVisible() and w is not progress]:
+            app.quit()
+
+    def line_read(line):
+        worker.handle_line(line)
+        quit_when_done()
+
+    def input_closed(lines):
+        input_lines.append(lines)
+        quit_when_done()
+
+    reader = InputReader()
+    reader.line_read.connect(line_read)
+    reader.input_closed.connect(input_closed)
+    t = threading.Thread(target=reader.run)
+    t.daemon = True
+    t.start()
+    return app.exec_()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run analysis plugin jobs read from stdin')
+    parser.add_argument(
+        '-mf', '--maxfiles', dest='max_files', type=int, default=8,
+        help='Maximum number of data files kept in memory between jobs')
+    parser.add_argument(
+        '-nm', '--nomarkers', dest='markers', action='store_false',
+        help='Do not write a marker line after each job')
+    parser.add_argument(
+        '-ap', '--analysisprocesses', dest='analysis_processes', type=int,
+        help='Maximum number of processes used by the included plugins '
+             '(see spykeviewer.analysis.process_count)')
+    args = parser.parse_known_args()[0]
+    if args.analysis_processes is not None:
+        from spykeviewer import api
+        api.config.analysis_processes = args.analysis_processes
+    if args.markers:
+        sys.stdout = LineTrackingStream(sys.stdout)
+        sys.stderr = LineTrackingStream(sys.stderr)
+
+    try:
+        import PyQt4.QtGui
+    except ImportError:
+        pass
+    else:
+        return _run_qt(args.max_files, args.markers)
+
+    worker = PluginWorker(args.max_files,
+                          progress_indicator.ProgressIndicator(),
+                          args.markers)
+    for line in iter(sys.stdin.readline, b''):
+        if line.strip():
+            worker.handle_line(line)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+""" Prefetching of lazily loaded data objects. In cached lazy load mode,
+signals and spike trains are only read from disk when a plugin first
+uses them. The main window prefetches the objects of the current
+selection in a background thread, so they are already loaded when a
+plugin is started. Only objects up to a memory budget
+(``api.config.prefetch_size``) are loaded for each selection.
+"""
+import numpy as np
+
+from .data_lock import data_lock
+
+
+def is_lazy(o):
+    """ Return if a data object has been lazily loaded and not been read
+    yet.
+    """
+    return hasattr(o, 'lazy_shape')
+
+
+def _is_replaced(o):
+    """ Return if a lazily loaded object has already been replaced by its
+    loaded version in its segment.
+    """
+    if o.segment is None:
+        return False
+    l = getattr(o.segment, type(o).__name__.lower() + 's', [])
+    return not any(x is o for x in l)
+
+
+def object_size(o):
+    """ Return the estimated memory size in bytes of a lazily loaded data
+    object after it is read.
+    """
+    shape = getattr(o, 'lazy_shape', None)
+    if shape is None:
+        return 0
+    if np.isscalar(shape):
+        shape = (shape,)
+    dtype = getattr(o, 'dtype', np.dtype(float))
+    return int(np.prod(shape)) * max(dtype.itemsize, 1)
+
+
+def lazy_objects(segments, channel_groups, channels, units):
+    """ Return the lazily loaded signals and spike trains in a selection.
+    The objects are the same that are returned for the selection by
+    the :class:`spykeutils.plugin.data_provider.DataProvider` methods
+    for analog signals, signal arrays and spike trains, ordered by
+    segment.
+
+    :param sequence segments: The selected segments.
+    :param sequence channel_groups: The selected recording channel groups.
+    :param sequence channels: The selected recording channels.
+    :param sequence units: The selected units.
+    :returns: A list of data objects.
+    """
+    channel_groups = set(channel_groups)
+    channels = set(channels)
+    units = set(units)
+
+    objects = []
+    for s in segments:
+        objects.extend(sig for sig in s.analogsignals
+                       if sig.recordingchannel in channels)
+        objects.extend(sig for sig in s.analogsignalarrays
+                       if sig.recordingchannelgroup in channel_groups)
+        objects.extend(t for t in s.spiketrains
+                       if t.unit in units or t.unit is None)
+    return [o for o in objects if is_lazy(o)]
+
+
+def prefetch(provider, objects, budget, cancelled=None):
+    """ Read lazily loaded objects and replace them in the object
+    hierarchy, like :class:`spykeutils.plugin.data_provider_neo.NeoDataProvider`
+    does in cached lazy mode. Stops before the estimated size of the
+    read objects exceeds the budget. Each object is checked and replaced
+    while holding :data:`data_lock.data_lock`, so this function can run
+    in a background thread if other code that reads data or changes the
+    object hierarchy holds the lock as well.
+
+    :param provider: The data provider used to read the objects.
+    :type provider: :class:`spykeutils.plugin.data_provider_neo.NeoDataProvider`
+    :param list objects: The objects to read (see :func:`lazy_objects`).
+    :param int budget: The maximum number of bytes to read.
+    :param function cancelled: Called before each object is read.
+        Reading stops when it returns ``True``.
+    :returns: The estimated number of bytes that were read.
+    """
+    loaded = 0
+    for o in objects:
+        if cancelled is not None and cancelled():
+            break
+        size = object_size(o)
+        if loaded + size > budget:
+            break
+        with data_lock:
+            if _is_replaced(o):
+                continue
+            provider._load_lazy_object(o, True)
+        loaded += size
+    return loaded
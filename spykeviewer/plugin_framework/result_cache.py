@@ -0,0 +1,196 @@
+""" Cache for computed plugin results. Results are dictionaries of numpy
+arrays that are stored as compressed ``.npz`` files in the
+``result_cache`` subdirectory of the plugin data directory. A result
+is identified by the plugin, its configuration, the selections it was
+computed from and the modification times of the involved data files.
+The least recently used results are removed when the cache grows larger
+than ``api.config.result_cache_size``.
+
+Plugins opt in by setting the class attribute ``cache_results`` to
+``True`` and implementing ``compute(current, selections)``, which
+returns a result dictionary without creating any GUI elements.
+"""
+import os
+import json
+import hashlib
+import logging
+import tempfile
+
+import numpy as np
+
+from spykeutils.plugin.analysis_plugin import AnalysisPlugin
+
+from .. import api
+
+
+logger = logging.getLogger('spykeviewer')
+
+CACHE_DIRECTORY = 'result_cache'
+
+
+def _data_files(data):
+    """ Return the list of data files referenced by a selection
+    dictionary.
+    """
+    return [b[1] for b in data.get('blocks', [])]
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except (OSError, TypeError):
+        return None
+
+
+def result_key(plugin, current, selections):
+    """ Return a string identifying the result of a plugin for the given
+    selections and the current plugin configuration.
+
+    :param plugin: The plugin.
+    :param current: The current selection.
+    :type current: :class:`spykeutils.plugin.data_provider.DataProvider`
+    :param list selections: The other selections.
+    """
+    data = [current.data_dict()] + [s.data_dict() for s in selections]
+    files = set()
+    for d in data:
+        files.update(_data_files(d))
+
+    source = getattr(plugin, 'source_file', None)
+    key = {'plugin': '%s.%s' % (type(plugin).__module__,
+                                type(plugin).__name__),
+           'source': [source, _mtime(source)],
+           'parameters': plugin.get_parameters(),
+           'selections': data,
+           'files': sorted((f, _mtime(f)) for f in files)}
+    s = json.dumps(key, sort_keys=True, default=repr)
+    return hashlib.sha1(s).hexdigest()
+
+
+class ResultCache(object):
+    """ A directory of cached results with least recently used eviction.
+    """
+    def __init__(self, directory, max_size):
+        """ Create a new cache.
+
+        :param str directory: The directory for the result files. It is
+            created when the first result is stored.
+        :param int max_size: The maximum total size of all result files
+            in bytes.
+        """
+        self.directory = directory
+        self.max_size = max_size
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def get(self, key):
+        """ Return the result stored for a key or ``None``.
+        """
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                archive = np.load(f)
+                result = dict((k, archive[k]) for k in archive.files)
+            # Mark result as recently used
+            os.utime(path, None)
+        except Exception:
+            logger.warning('Could not read cached result "%s"' % path)
+            return None
+        return result
+
+    def put(self, key, result):
+        """ Store a result dictionary for a key and remove old results
+        if the cache is too large.
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        # Write to temporary file first so no incomplete files are read
+        fd, temp_path = tempfile.mkstemp(
+            suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, **result)
+            if os.path.exists(self._path(key)):
+                os.remove(self._path(key))
+            os.rename(temp_path, self._path(key))
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """ Remove least recently used results until the total size of
+        the cache is within the limit.
+        """
+        entries = []
+        total = 0
+        for f in os.listdir(self.directory):
+            if not f.endswith('.npz'):
+                continue
+            path = os.path.join(self.directory, f)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        while entries and total > self.max_size:
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        """ Remove all results.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        for f in os.listdir(self.directory):
+            if f.endswith('.npz'):
+                os.remove(os.path.join(self.directory, f))
+
+
+def default_cache():
+    """ Return the cache in the current plugin data directory or ``None``
+    if results should not be cached.
+    """
+    size = api.config.result_cache_size
+    data_dir = AnalysisPlugin.data_dir
+    if size <= 0 or not data_dir or not os.path.isdir(data_dir):
+        return None
+    return ResultCache(os.path.join(data_dir, CACHE_DIRECTORY),
+                       size * 1024 * 1024)
+
+
+def cached_compute(plugin, current, selections):
+    """ Return the result of ``plugin.compute(current, selections)``.
+    If the plugin supports caching, a stored result is returned if one
+    exists and new results are stored.
+    """
+    cache = None
+    if getattr(plugin, 'cache_results', False):
+        cache = default_cache()
+    if cache is None:
+        return plugin.compute(current, selections)
+
+    key = result_key(plugin, current, selections)
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    result = plugin.compute(current, selections)
+    try:
+        cache.put(key, result)
+    except Exception:
+        logger.warning('Could not store result of "%s" in cache' %
+                       plugin.get_name())
+    return result
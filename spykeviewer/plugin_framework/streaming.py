@@ -0,0 +1,34 @@
+""" Access to the data of a data provider one segment at a time. Plugins
+can use these generators instead of the data provider methods that
+return all objects of a selection at once. In lazy mode, only the
+objects of one segment are loaded at the same time, as long as the
+plugin does not keep references to them. In cached lazy mode, loaded
+objects are kept in the object hierarchy like with the regular data
+provider methods.
+"""
+
+
+def spike_trains_by_segment(provider):
+    """ Generator for the selected spike trains of a data provider,
+    grouped by segment. Contains the same spike trains as
+    :meth:`spykeutils.plugin.data_provider.DataProvider.spike_trains_by_segment`.
+
+    :param provider: The data provider.
+    :type provider: :class:`spykeutils.plugin.data_provider_neo.NeoDataProvider`
+    :returns: Tuples of a segment and a list of its spike trains. Spike
+        trains that are not attached to a segment are returned last with
+        the segment ``DataProvider.no_segment``.
+    """
+    units = provider.units()
+    for s in provider.segments():
+        trains = [t for t in s.spiketrains
+                  if t.unit in units or t.unit is None]
+        if trains:
+            # No reference to the loaded list is kept here
+            yield s, provider._load_object_list(trains)
+
+    trains = []
+    for u in units:
+        trains.extend([t for t in u.spiketrains if t.segment is None])
+    if trains:
+        yield provider.no_segment, provider._load_object_list(trains)
@@ -1,7 +1,7 @@
 from spykeutils.plugin import analysis_plugin, gui_data
 from spykeutils import SpykeException
-from spykeutils import plot
-from copy import copy
+
+from spykeviewer import plot
 
 spike_prop = gui_data.ValueProp(False)
 subplot_prop = gui_data.ValueProp(False)
@@ -18,6 +18,7 @@ class SignalPlotPlugin(analysis_plugin.AnalysisPlugin):
     show_events = gui_data.BoolItem('Show events', default=True)
     show_epochs = gui_data.BoolItem('Show epochs', default=True)
     multiple_plots = gui_data.BoolItem('One plot per segment', default=False)
+    decimate = gui_data.BoolItem('Fast drawing of long signals', default=True)
     
     _g = gui_data.BeginGroup('Spikes')
     show_spikes = gui_data.BoolItem(
@@ -84,7 +85,9 @@ class SignalPlotPlugin(analysis_plugin.AnalysisPlugin):
             if spikes and spikes.has_key(seg):
                 seg_spikes = spikes[seg]
             
-            # Prepare template spikes
+            # Prepare template spikes: The waveform of the first spike
+            # of each unit is shown at all times of its spike trains
+            seg_templates = []
             if self.spike_form == 0 and self.template_mode:
                 template_spikes = {}
                 for s in seg_spikes[:]:
@@ -96,10 +99,7 @@ class SignalPlotPlugin(analysis_plugin.AnalysisPlugin):
                 for st in seg_trains[:]:
                     if st.unit not in template_spikes:
                         continue
-                    for t in st:
-                        s = copy(template_spikes[st.unit])
-                        s.time = t
-                        seg_spikes.append(s)
+                    seg_templates.append((template_spikes[st.unit], st))
                     seg_trains.remove(st)
 
             plot.signals(signals[seg], events=seg_events, 
@@ -107,7 +107,9 @@ class SignalPlotPlugin(analysis_plugin.AnalysisPlugin):
                          spikes=seg_spikes, use_subplots=self.subplots, 
                          show_waveforms=(self.spike_form==0),
                          subplot_names=self.subplot_titles,
-                         progress=current.progress)
+                         progress=current.progress,
+                         max_samples=100000 if self.decimate else 0,
+                         spike_templates=seg_templates)
             
             if not self.multiple_plots:
                 break
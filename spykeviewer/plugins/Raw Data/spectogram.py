@@ -1,6 +1,5 @@
 from spykeutils.plugin import analysis_plugin, gui_data
 import scipy as sp
-import matplotlib.mlab as mlab
 from guiqwt.plot import BaseImageWidget
 from guiqwt.builder import make
 from spykeutils.plot.dialog import PlotDialog
@@ -8,6 +7,11 @@ import spykeutils.plot.helper as helper
 from spykeutils import SpykeException
 import quantities as pq
 
+from spykeviewer.analysis.spectrogram import spectrograms
+
+# Larger spectrogram images are stored in temporary files
+MEMMAP_VALUES = 2 ** 25
+
 
 class SpectrogramPlugin(analysis_plugin.AnalysisPlugin):
     nfft_index = (32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
@@ -15,6 +19,8 @@ class SpectrogramPlugin(analysis_plugin.AnalysisPlugin):
     interpolate = gui_data.BoolItem('Interpolate', default=True)
     show_color_bar = gui_data.BoolItem('Show color bar', default=False)
     fft_samples = gui_data.ChoiceItem('FFT samples', nfft_names, default=3)
+    max_columns = gui_data.IntItem('Maximum time bins (0: unlimited)',
+                                   default=2000, min=0)
     which_signals = gui_data.ChoiceItem('Included signals',
                                         ('AnalogSignal',
                                          'AnalogSignalArray', 'Both'),
@@ -37,6 +43,13 @@ class SpectrogramPlugin(analysis_plugin.AnalysisPlugin):
     
         current.progress.set_ticks(num_signals)
         samples = self.nfft_index[self.fft_samples]
+
+        # Calculate spectrograms for all signals in parallel
+        results = spectrograms(
+            signals, [s.sampling_rate.rescale(pq.Hz) for s in signals],
+            samples, samples / 2, self.max_columns, MEMMAP_VALUES,
+            progress=current.progress)
+
         win = PlotDialog(toolbar=True, 
                          wintitle="Signal Spectogram (FFT window size %d)" 
                          % samples)
@@ -47,16 +60,19 @@ class SpectrogramPlugin(analysis_plugin.AnalysisPlugin):
             plot = pW.plot
             
             s = signals[c]
-            
-            # Calculate spectrogram and create plot
-            v = mlab.specgram(s, NFFT=samples, noverlap=samples/2,
-                              Fs=s.sampling_rate.rescale(pq.Hz))
+            image, freqs, times = results[c]
+            if not len(times):
+                raise SpykeException(
+                    'Signal is too short for FFT window size!')
+
+            # Create plot
+            t_start = float(s.t_start.rescale(pq.s))
             interpolation = 'nearest'
             if self.interpolate:
                 interpolation = 'linear'
-            img = make.image(sp.log(v[0]), ydata=[v[1][0],v[1][-1]], 
-                             xdata=[v[2][0] + s.t_start.rescale(pq.s), 
-                                    v[2][-1] + s.t_start.rescale(pq.s)],
+            img = make.image(image, ydata=[freqs[0], freqs[-1]],
+                             xdata=[times[0] + t_start,
+                                    times[-1] + t_start],
                              interpolation=interpolation)
             plot.add_item(img)
             
@@ -79,7 +95,6 @@ class SpectrogramPlugin(analysis_plugin.AnalysisPlugin):
             plot.set_axis_unit(plot.X_BOTTOM, 
                                time_unit.dimensionality.string)
             win.add_plot_widget(pW, c, column=c%columns)
-            current.progress.step()
     
         current.progress.done()
         win.add_custom_image_tools()
@@ -1,12 +1,17 @@
 from spykeutils.plugin import analysis_plugin, gui_data
-from spykeutils import plot
-from spykeutils.tools import extract_spikes
-import spykeutils.conversions as convert
+from spykeutils import SpykeException
+import scipy as sp
 import quantities as pq
 
+from spykeviewer import plot
+from spykeviewer.analysis.waveforms import extract_waveforms
+
 
 extract_prop = gui_data.ValueProp(False)
 
+# Number of amplitude bins for waveform density images
+DENSITY_BINS = 200
+
 
 class SpikePlotPlugin(analysis_plugin.AnalysisPlugin):
     anti_aliased = gui_data.BoolItem('Antialiased lines (slow for '
@@ -35,6 +40,8 @@ class SpikePlotPlugin(analysis_plugin.AnalysisPlugin):
                                                         'Horizontally'))
     layout = gui_data.ChoiceItem('Subplot layout', ('Linear', 'Square'))
     fade = gui_data.BoolItem('Fade earlier spikes')
+    density = gui_data.BoolItem('Show density instead of lines (fast for '
+                                'large amounts of spikes)')
     
     def get_name(self):
         return 'Spike Waveform Plot'
@@ -43,12 +50,16 @@ class SpikePlotPlugin(analysis_plugin.AnalysisPlugin):
         current.progress.begin('Creating spike waveform plot')
         current.progress.set_status('Loading spikes')
         
-        spikes = {}
+        waves = {}
         strong = {}
-        if self.spike_mode == 1:
-            spikes = current.spikes_by_unit()
-        elif self.spike_mode == 2:
-            strong = current.spikes_by_unit()
+        rates = set()
+        if self.spike_mode > 0:
+            target = waves if self.spike_mode == 1 else strong
+            for u, spikes in current.spikes_by_unit().iteritems():
+                if not spikes:
+                    continue
+                w, rate = _spike_waveforms(spikes)
+                _add_waveforms(target, rates, u, w, rate)
         
         spike_trains = None
         if self.inc_spikes:
@@ -56,13 +67,12 @@ class SpikePlotPlugin(analysis_plugin.AnalysisPlugin):
             spike_trains = current.spike_trains_by_unit_and_segment()
             
             for u, trains in spike_trains.iteritems():
-                s = []
                 for st in trains.values():
-                    if st.waveforms is not None:
-                        s.extend(convert.spike_train_to_spikes(st))
-                if not s:
-                    continue
-                spikes.setdefault(u, []).extend(s)
+                    if st.waveforms is None or not len(st):
+                        continue
+                    _add_waveforms(waves, rates, u,
+                                   st.waveforms.swapaxes(1, 2),
+                                   st.sampling_rate)
                 
         if self.inc_extracted:
             current.progress.set_status('Extracting spikes from signals')
@@ -70,28 +80,91 @@ class SpikePlotPlugin(analysis_plugin.AnalysisPlugin):
                 conversion_mode=3)
             if spike_trains is None:
                 spike_trains = current.spike_trains_by_unit_and_segment()
-                
-            for u, trains in spike_trains.iteritems():
-                s = []
-                rcg = u.recordingchannelgroup
-                for seg, train in trains.iteritems():
-                    if seg not in signals:
-                        continue
-                    
+
+            for seg, seg_signals in signals.iteritems():
+                # Extract all units of a channel group at once
+                groups = {}
+                for u, trains in spike_trains.iteritems():
+                    if seg in trains:
+                        groups.setdefault(
+                            u.recordingchannelgroup, []).append(u)
+
+                for rcg, units in groups.iteritems():
                     train_sigs = []
-                    for rc in signals[seg]:
+                    for rc in seg_signals:
                         if rcg in rc.recordingchannelgroups:
-                            train_sigs.append(signals[seg][rc])
+                            train_sigs.append(seg_signals[rc])
                     if not train_sigs:
                         continue
-                    s.extend(extract_spikes(
-                        train, train_sigs,
-                        self.length * pq.ms, self.align * pq.ms))
-                if not s:
-                    continue
-                spikes.setdefault(u, []).extend(s)
+
+                    ref = train_sigs[0]
+                    for sig in train_sigs[1:]:
+                        if sig.sampling_rate != ref.sampling_rate:
+                            raise SpykeException(
+                                'All signals for spike extraction need '
+                                'the same sampling rate!')
+                    end = min(sig.shape[0] for sig in train_sigs)
+                    data = sp.vstack(
+                        [sp.asarray(sig.rescale(ref.units)).ravel()[:end]
+                         for sig in train_sigs])
+
+                    extracted = extract_waveforms(
+                        data, float(ref.sampling_rate.rescale(pq.Hz)),
+                        float(ref.t_start.rescale(pq.s)),
+                        [spike_trains[u][seg].rescale(pq.s) for u in units],
+                        self.length / 1000.0, self.align / 1000.0)
+                    for u, (w, _) in zip(units, extracted):
+                        if len(w):
+                            _add_waveforms(waves, rates, u, w * ref.units,
+                                           ref.sampling_rate)
+
+        if len(rates) > 1:
+            raise SpykeException('Cannot create waveform plot: '
+                                 'Spikes have different sampling rates!')
+        if not rates:
+            raise SpykeException('No spikes for spike waveform plot!')
 
         fade = 0.2 if self.fade else 1.0
-        plot.spikes(spikes, self.plot_type * 2 + self.split_type + 1,
-                    strong, anti_alias=self.anti_aliased, fade=fade,
-                    subplot_layout=self.layout, progress=current.progress)
\ No newline at end of file
+        plot.waveforms(_concatenate(waves), rates.pop() * pq.Hz,
+                       self.plot_type * 2 + self.split_type + 1,
+                       _concatenate(strong), anti_alias=self.anti_aliased,
+                       fade=fade, subplot_layout=self.layout,
+                       progress=current.progress,
+                       density_bins=DENSITY_BINS if self.density else 0)
+
+
+def _spike_waveforms(spikes):
+    """ Return the waveforms of a list of spikes as an array with shape
+    (spikes, channels, samples) and their sampling rate.
+    """
+    for s in spikes:
+        if s.waveform is None or s.sampling_rate is None:
+            raise SpykeException('Cannot create waveform plot: '
+                                 'At least one spike has no '
+                                 'waveform or sampling rate!')
+        if s.sampling_rate != spikes[0].sampling_rate:
+            raise SpykeException('Cannot create waveform plot: '
+                                 'Spikes have different sampling rates!')
+    units = spikes[0].waveform.units
+    w = sp.array([sp.asarray(s.waveform.rescale(units)).T for s in spikes])
+    return w * units, spikes[0].sampling_rate
+
+
+def _add_waveforms(waves, rates, unit, w, rate):
+    waves.setdefault(unit, []).append(w)
+    rates.add(float(rate.rescale(pq.Hz)))
+
+
+def _concatenate(waves):
+    """ Join the waveform arrays collected for each unit.
+    """
+    ret = {}
+    for u, arrays in waves.iteritems():
+        units = arrays[0].units
+        try:
+            ret[u] = sp.concatenate(
+                [sp.asarray(w.rescale(units)) for w in arrays]) * units
+        except ValueError:
+            raise SpykeException('Cannot create waveform plot: '
+                                 'Waveforms have different shapes!')
+    return ret
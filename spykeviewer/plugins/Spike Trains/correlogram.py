@@ -1,11 +1,18 @@
+import scipy as sp
 import quantities as pq
 import neo
 
 from spykeutils.plugin import analysis_plugin, gui_data
-from spykeutils import plot
+from spykeutils import SpykeException
+
+from spykeviewer.analysis.correlogram import correlograms
+from spykeviewer.plugin_framework import result_cache
+from spykeviewer.plot import results
 
 
 class CorrelogramPlugin(analysis_plugin.AnalysisPlugin):
+    cache_results = True
+
     bin_size = gui_data.FloatItem('Bin size', 1.0, 0.001, 10000.0, unit='ms')
     cut_off = gui_data.FloatItem('Cut off', 50.0, 2.0, 10000.0, unit='ms')
     data_source = gui_data.ChoiceItem('Data source', ('Units', 'Selections'))
@@ -16,20 +23,63 @@ class CorrelogramPlugin(analysis_plugin.AnalysisPlugin):
     def get_name(self):
         return 'Correlogram'
 
-    def start(self, current, selections):
+    def compute(self, current, selections):
         current.progress.begin('Creating correlogram')
         if self.data_source == 0:
             d = current.spike_trains_by_unit()
         else:
-            # Prepare dictionary for cross_correlogram():
+            # Prepare dictionary for correlogram():
             # One entry of spike trains for each selection
             d = {}
             for s in selections:
                 d[neo.Unit(s.name)] = s.spike_trains()
+        if not d:
+            raise SpykeException('No spike trains for correlogram')
+        if self.cut_off <= self.bin_size / 2:
+            raise SpykeException('Could not create correlogram: '
+                                 'Cut off is too small for bin size!')
+
+        units = d.keys()
+        num_trains = len(d[units[0]])
+        if not num_trains:
+            raise SpykeException(
+                'Could not create correlogram: No spike trains!')
+        for u in units[1:]:
+            if len(d[u]) != num_trains:
+                raise SpykeException('Could not create correlogram: All '
+                                     'units need the same number of spike '
+                                     'trains!')
 
-        plot.cross_correlogram(
-            d, self.bin_size * pq.ms, self.cut_off * pq.ms,
-            border_correction=self.border_correction,
-            per_second=self.count_per == 0, square=self.square,
-            progress=current.progress)
+        duration = None
+        if self.count_per == 0:
+            # Counts per second are based on the last spike trains
+            lengths = set(float((d[u][-1].t_stop - d[u][-1].t_start)
+                                .rescale(pq.s)) for u in units)
+            if len(lengths) > 1:
+                raise SpykeException(
+                    'A spike train pair does not have equal length,'
+                    'cannot calculate count per second.')
+            duration = lengths.pop()
 
+        current.progress.set_status('Calculating...')
+        current.progress.set_ticks(len(units))
+        trains = [[sp.asarray(t.rescale(pq.ms)) for t in d[u]]
+                  for u in units]
+        values, bins = correlograms(
+            trains, self.bin_size, self.cut_off, self.border_correction,
+            duration, progress=current.progress)
+        current.progress.done()
+
+        names, colors = results.series_info(units)
+        return {'bins': bins, 'values': values,
+                'names': names, 'colors': colors}
+
+    def plot_result(self, result):
+        results.correlogram(
+            'Correlogram | Bin size %s ms' % self.bin_size, result['bins'],
+            result['values'], result['names'], result['colors'],
+            square=self.square, per_second=self.count_per == 0)
+
+    def start(self, current, selections):
+        self.plot_result(
+            result_cache.cached_compute(self, current, selections))
@@ -1,35 +1,90 @@
-import quantities as pq
-import neo
-
-from spykeutils.plugin import analysis_plugin, gui_data
-from spykeutils import plot
-
-
-class ISIPlugin(analysis_plugin.AnalysisPlugin):
-    bin_size = gui_data.FloatItem('Bin size', 1.0, 0.1, 10000.0, unit='ms')
-    cut_off = gui_data.FloatItem('Cut off', 50.0, 2.0, 10000.0, unit='ms')
-    diagram_type = gui_data.ChoiceItem('Type', ('Bar', 'Line'))
-    data_source = gui_data.ChoiceItem('Data source', ('Units', 'Selections'))
-
-    def get_name(self):
-        return 'Interspike Interval Histogram'
-
-    def start(self, current, selections):
-        current.progress.begin('Creating Interspike Interval Histogram')
-        if self.data_source == 0:
-            d = current.spike_trains_by_unit()
-        else:
-            # Prepare dictionary for isi():
-            # One entry of spike trains for each selection
-            d = {}
-            for s in selections:
-                d[neo.Unit(s.name)] = s.spike_trains()
-        current.progress.done()
-        plot.isi(
-            d, self.bin_size * pq.ms, self.cut_off * pq.ms,
-            self.diagram_type == 0, time_unit=pq.ms)
-
-
-
-
-
+import scipy as sp
+import quantities as pq
+import neo
+
+from spykeutils.plugin import analysis_plugin, gui_data
+from spykeutils import SpykeException
+
+from spykeviewer.analysis.isi import ISIHistogram
+from spykeviewer.plugin_framework import result_cache, streaming
+from spykeviewer.plot import results
+
+
+class ISIPlugin(analysis_plugin.AnalysisPlugin):
+    cache_results = True
+
+    bin_size = gui_data.FloatItem('Bin size', 1.0, 0.1, 10000.0, unit='ms')
+    cut_off = gui_data.FloatItem('Cut off', 50.0, 2.0, 10000.0, unit='ms')
+    diagram_type = gui_data.ChoiceItem('Type', ('Bar', 'Line'))
+    data_source = gui_data.ChoiceItem('Data source', ('Units', 'Selections'))
+    streaming = gui_data.BoolItem('Load one segment at a time',
+                                  default=False)
+
+    def get_name(self):
+        return 'Interspike Interval Histogram'
+
+    def _add_segments(self, hist, provider, progress, key=None):
+        """ Add the spike trains of a data provider to the histograms one
+        segment at a time. If ``key`` is ``None``, the spike trains are
+        added to the histogram of their unit, like with
+        ``spike_trains_by_unit()``.
+        """
+        for s, trains in streaming.spike_trains_by_segment(provider):
+            for t in trains:
+                if key is not None:
+                    hist.add(key, t.rescale(pq.ms))
+                elif t.unit is not None:
+                    hist.add(t.unit, t.rescale(pq.ms))
+                else:
+                    hist.add(provider.no_unit, t.rescale(pq.ms))
+            del trains
+            progress.step()
+
+    def compute(self, current, selections):
+        current.progress.begin('Creating Interspike Interval Histogram')
+        bins = sp.arange(0, self.cut_off, self.bin_size)
+        if self.data_source == 0:
+            hist = ISIHistogram(bins, current.units())
+            if self.streaming:
+                current.progress.set_ticks(len(current.segments()))
+                self._add_segments(hist, current, current.progress)
+            else:
+                for u, trains in current.spike_trains_by_unit().iteritems():
+                    for t in trains:
+                        hist.add(u, t.rescale(pq.ms))
+            # Only units with spike trains
+            rows = hist.num_trains > 0
+        else:
+            # One histogram of spike trains for each selection
+            hist = ISIHistogram(bins, [neo.Unit(s.name) for s in selections])
+            if self.streaming:
+                current.progress.set_ticks(
+                    sum(len(s.segments()) for s in selections))
+            for k, s in zip(hist.keys, selections):
+                if self.streaming:
+                    self._add_segments(hist, s, current.progress, k)
+                else:
+                    for t in s.spike_trains():
+                        hist.add(k, t.rescale(pq.ms))
+            rows = sp.ones(len(hist.keys), dtype=bool)
+        if not rows.any():
+            raise SpykeException('No spike trains for ISI histogram')
+
+        units = [k for k, r in zip(hist.keys, rows) if r]
+        names, colors = results.series_info(units)
+        values = hist.counts[rows].astype(float)
+        current.progress.done()
+
+        return {'bins': bins, 'values': values,
+                'names': names, 'colors': colors}
+
+    def plot_result(self, result):
+        results.histogram(
+            'ISI Histogram | Bin size: %s ms' % self.bin_size,
+            result['bins'], result['values'], result['names'],
+            result['colors'], bar_plot=self.diagram_type == 0,
+            x_title='Interval length', y_title='Number of intervals')
+
+    def start(self, current, selections):
+        self.plot_result(
+            result_cache.cached_compute(self, current, selections))
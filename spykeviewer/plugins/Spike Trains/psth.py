@@ -1,8 +1,13 @@
+import scipy as sp
 import quantities as pq
 import neo
 
 from spykeutils.plugin import analysis_plugin, gui_data
-from spykeutils import plot
+from spykeutils import SpykeException
+
+from spykeviewer.analysis.psth import psth, flatten_trains
+from spykeviewer.plugin_framework import result_cache
+from spykeviewer.plot import results
 
 # Needed for activatable parameters
 stop_prop = gui_data.ValueProp(False)
@@ -11,6 +16,8 @@ optimize_prop = gui_data.ValueProp(False)
 
 
 class PSTHPlugin(analysis_plugin.AnalysisPlugin):
+    cache_results = True
+
     # Configurable parameters
     bin_size = gui_data.FloatItem('Bin size', min=1.0, default=500.0, unit='ms')
     start_time = gui_data.FloatItem('Start time', default=0.0, unit='ms')
@@ -31,14 +38,7 @@ class PSTHPlugin(analysis_plugin.AnalysisPlugin):
     def get_name(self):
         return 'Peristimulus Time Histogram'
 
-    def start(self, current, selections):
-        # Prepare quantities
-        start = float(self.start_time) * pq.ms
-        stop = None
-        if self.stop_enabled:
-            stop = float(self.stop) * pq.ms
-        bin_size = float(self.bin_size) * pq.ms
-
+    def compute(self, current, selections):
         # Load data
         current.progress.begin('Creating PSTH')
         events = None
@@ -57,13 +57,50 @@ class PSTHPlugin(analysis_plugin.AnalysisPlugin):
                 trains[neo.Unit(s.name)] = s.spike_trains()
                 if self.align_enabled:
                     events.update(s.labeled_events(self.align))
-        
-        if events:
-            for s in events:  # Align on first event in each segment
-                events[s] = events[s][0]
-
-        plot.psth(
-            trains, events, start, stop, bin_size, 
-            rate_correction=True, time_unit=pq.ms,
-            bar_plot=self.diagram_type == 0, 
-            progress=current.progress)
\ No newline at end of file
+        if not trains:
+            raise SpykeException('No spike trains for PSTH!')
+
+        # All spike trains in flat arrays with unit and segment indices
+        units = trains.keys()
+        all_trains = [t for u in units for t in trains[u]]
+        train_units = [i for i, u in enumerate(units) for _ in trains[u]]
+        segments = {}
+        train_segments = [segments.setdefault(t.segment, len(segments))
+                          for t in all_trains]
+        times, train_indices = flatten_trains(
+            [t.rescale(pq.ms) for t in all_trains])
+
+        offsets = None
+        if events:  # Align on first event in each segment
+            offsets = sp.empty(len(segments))
+            offsets.fill(sp.nan)
+            for seg, i in segments.iteritems():
+                if seg in events:
+                    offsets[i] = events[seg][0].time.rescale(pq.ms)
+
+        stop = sp.inf
+        if self.stop_enabled:
+            stop = float(self.stop)
+        values, bins = psth(
+            times, train_indices, train_units, train_segments,
+            [float(t.t_start.rescale(pq.ms)) for t in all_trains],
+            [float(t.t_stop.rescale(pq.ms)) for t in all_trains],
+            len(units), float(self.bin_size), float(self.start_time), stop,
+            offsets, rate_correction=True)
+        current.progress.done()
+
+        names, colors = results.series_info(units)
+        return {'bins': bins, 'values': values,
+                'names': names, 'colors': colors}
+
+    def plot_result(self, result):
+        bins = result['bins']
+        results.histogram(
+            'PSTH | Bin size %.2f ms' % self.bin_size, bins,
+            result['values'], result['names'], result['colors'],
+            bar_plot=self.diagram_type == 0, y_title='Rate', y_unit='Hz',
+            line_x=0.5 * sp.diff(bins) + bins[:-1])
+
+    def start(self, current, selections):
+        self.plot_result(
+            result_cache.cached_compute(self, current, selections))
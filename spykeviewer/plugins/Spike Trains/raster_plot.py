@@ -1,7 +1,8 @@
 import quantities as pq
 
 from spykeutils.plugin import analysis_plugin, gui_data
-from spykeutils import plot
+
+from spykeviewer import plot
 
 
 class RasterPlotPlugin(analysis_plugin.AnalysisPlugin):
@@ -1,9 +1,14 @@
+import scipy as sp
 import quantities as pq
 import neo
 from PyQt4.Qt import QMessageBox
 
 from spykeutils.plugin import analysis_plugin, gui_data
-from spykeutils import plot
+from spykeutils import rate_estimation, tools, SpykeException
+
+from spykeviewer.analysis import sde
+from spykeviewer.plugin_framework import result_cache
+from spykeviewer.plot import results
 
 # Needed for activatable parameters
 stop_prop = gui_data.ValueProp(False)
@@ -12,6 +17,8 @@ optimize_prop = gui_data.ValueProp(False)
 
 
 class SDEPlugin(analysis_plugin.AnalysisPlugin):
+    cache_results = True
+
     # Configurable parameters
     kernel_size = gui_data.FloatItem('Kernel size', min=1.0, default=300.0,
         unit='ms')
@@ -46,7 +53,7 @@ class SDEPlugin(analysis_plugin.AnalysisPlugin):
     def get_name(self):
         return 'Spike Density Estimation'
 
-    def start(self, current, selections):
+    def compute(self, current, selections):
         current.progress.begin('Creating spike density estimation')
 
         # Prepare quantities
@@ -55,9 +62,6 @@ class SDEPlugin(analysis_plugin.AnalysisPlugin):
         if self.stop_enabled:
             stop = float(self.stop) * self.unit
         kernel_size = float(self.kernel_size) * self.unit
-        optimize_steps = 0
-        if self.optimize_enabled:
-            optimize_steps = self.optimize_steps
         minimum_kernel = self.minimum_kernel * self.unit
         maximum_kernel = self.maximum_kernel * self.unit
 
@@ -82,10 +86,70 @@ class SDEPlugin(analysis_plugin.AnalysisPlugin):
         if events:
             for s in events:  # Align on first event in each segment
                 events[s] = events[s][0]
+            for u in trains:
+                trains[u] = rate_estimation.aligned_spike_trains(
+                    trains[u], events)
+
+        trains = dict((u, t) for u, t in trains.iteritems() if t)
+        if not trains:
+            raise SpykeException('No spike trains for SDE!')
+        units = trains.keys()
+
+        # Evaluation interval shared by all spike trains
+        max_start, max_stop = tools.minimum_spike_train_interval(trains)
+        start = max(float(start), float(max_start.rescale(self.unit)))
+        max_stop = float(max_stop.rescale(self.unit))
+        if stop is not None:
+            stop = min(float(stop), max_stop)
+        else:
+            stop = max_stop
+        if stop <= start:
+            raise SpykeException('No time range for SDE!')
+        bins = sp.linspace(start, stop, 1025)
+        eval_points = bins[:-1] + (bins[1] - bins[0]) / 2
+        dt = (stop - start) / 1024
+
+        counts = sde.binned_trains(
+            [[sp.asarray(t.rescale(self.unit)) for t in trains[u]]
+             for u in units], start, stop)
 
-        plot.sde(
-            trains, events, start, stop, kernel_size, optimize_steps,
-            minimum_kernel, maximum_kernel, None, self.unit, current.progress)
+        result = {}
+        if self.optimize_enabled:
+            steps = sp.logspace(sp.log10(float(minimum_kernel)),
+                                sp.log10(float(maximum_kernel)),
+                                self.optimize_steps)
+            current.progress.set_ticks(len(steps))
+            current.progress.set_status('Calculating optimal kernel size')
+            costs = sde.kernel_size_costs(counts, dt, steps,
+                                          progress=current.progress)
+            kernel_sizes = sde.best_kernel_sizes(costs, steps)
+            result['cost_steps'] = steps
+            result['costs'] = costs
+        else:
+            kernel_sizes = sp.ones(len(units)) * float(kernel_size)
+
+        current.progress.set_status('Creating spike density estimation')
+        values = sde.densities(
+            counts, [len(trains[u]) for u in units], dt, kernel_sizes)
+        current.progress.done()
+
+        names, colors = results.series_info(units)
+        result.update({
+            'times': eval_points, 'values': values,
+            'kernel_sizes': kernel_sizes, 'names': names,
+            'colors': colors})
+        return result
+
+    def plot_result(self, result):
+        results.sde(
+            result['times'], result['values'], result['names'],
+            result['colors'], result['kernel_sizes'],
+            self.unit.dimensionality.string, result.get('cost_steps'),
+            result.get('costs'))
+
+    def start(self, current, selections):
+        self.plot_result(
+            result_cache.cached_compute(self, current, selections))
 
     def configure(self):
         super(SDEPlugin, self).configure()
@@ -0,0 +1,75 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import threading
+import multiprocessing
+
+from spykeviewer import api
+from spykeviewer import analysis
+
+
+_offset = 0
+
+
+def _init(offset):
+    global _offset
+    _offset = offset
+
+
+def _add_offset(x):
+    return x + _offset
+
+
+class TestProcessCount(ut.TestCase):
+    def setUp(self):
+        self.config = api.config.analysis_processes
+
+    def tearDown(self):
+        api.config.analysis_processes = self.config
+
+    def test_limits(self):
+        self.assertEqual(analysis.process_count(3, 2), 2)
+        self.assertEqual(analysis.process_count(1, 4), 1)
+        self.assertEqual(analysis.process_count(0, 4), 1)
+
+    def test_config(self):
+        api.config.analysis_processes = 2
+        self.assertEqual(analysis.process_count(10), 2)
+        api.config.analysis_processes = 0
+        self.assertEqual(analysis.process_count(10 ** 6),
+                         multiprocessing.cpu_count())
+
+    def test_other_thread(self):
+        counts = []
+        t = threading.Thread(
+            target=lambda: counts.append(analysis.process_count(10, 4)))
+        t.start()
+        t.join()
+        self.assertEqual(counts, [1])
+
+
+class TestImap(ut.TestCase):
+    def tearDown(self):
+        _init(0)
+
+    def test_in_process(self):
+        results = analysis.imap(_add_offset, range(5), _init, (10,), 1)
+        self.assertEqual(list(results), range(10, 15))
+
+    def test_in_worker_processes(self):
+        results = analysis.imap(_add_offset, range(5), _init, (10,), 2)
+        self.assertEqual(list(results), range(10, 15))
+        # The initializer only ran in the worker processes
+        self.assertEqual(_offset, 0)
+
+    def test_close(self):
+        results = analysis.imap(_add_offset, range(5), _init, (10,), 2)
+        self.assertEqual(next(results), 10)
+        results.close()
+        self.assertRaises(StopIteration, next, results)
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,67 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import numpy as np
+
+from spykeviewer.analysis.correlogram import (
+    correlograms, correlogram_bins, cross_counts, border_corrector)
+
+
+class TestCorrelograms(ut.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(1234)
+        self.trains = [[np.sort(rng.uniform(0, 5000, rng.randint(50, 200)))
+                        for _ in xrange(3)] for _ in xrange(4)]
+        self.trains[1][2] = np.array([])
+        self.bins = correlogram_bins(2.0, 40.0)
+
+    def brute_force(self):
+        """ Correlograms from all pairwise differences
+        """
+        n = len(self.trains)
+        middle_bin = len(self.bins) // 2 - 1
+        values = np.zeros((n, n, len(self.bins) - 1))
+        for i1 in xrange(n):
+            for i2 in xrange(n):
+                for t1, t2 in zip(self.trains[i1], self.trains[i2]):
+                    values[i1, i2] += np.histogram(
+                        np.subtract.outer(t1, t2).ravel(), self.bins)[0]
+                    if i1 == i2:
+                        values[i1, i2, middle_bin] -= len(t2)
+        return values
+
+    def test_bins(self):
+        self.assertEqual(len(self.bins), 40)
+        self.assertEqual(self.bins[19], -1.0)
+        self.assertEqual(self.bins[20], 1.0)
+        self.assertTrue(np.allclose(np.diff(self.bins), 2.0))
+
+    def test_cross_counts(self):
+        t1, t2 = self.trains[0][0], self.trains[2][0]
+        expected = np.histogram(
+            np.subtract.outer(t1, t2).ravel(), self.bins)[0]
+        counts = cross_counts(t1[::-1], t2, self.bins, chunk_size=7)
+        self.assertTrue(np.all(counts == expected))
+
+    def test_matches_brute_force(self):
+        expected = self.brute_force() / 3
+        for processes in (1, 2):
+            values, bins = correlograms(
+                self.trains, 2.0, 40.0, False, processes=processes)
+            self.assertTrue(np.all(bins == self.bins))
+            self.assertTrue(np.allclose(values, expected))
+
+    def test_normalization(self):
+        corrector = border_corrector(self.trains, 2.0, 40.0)
+        self.assertEqual(len(corrector), len(self.bins) - 1)
+        self.assertTrue(np.allclose(corrector, corrector[::-1]))
+        values, _ = correlograms(
+            self.trains, 2.0, 40.0, True, duration=5.0, processes=1)
+        expected = self.brute_force() * corrector / 5.0 / 3
+        self.assertTrue(np.allclose(values, expected))
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,85 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import threading
+
+import neo
+import quantities as pq
+
+from spykeutils.plugin.data_provider_neo import NeoDataProvider
+
+from spykeviewer.plugin_framework import data_lock
+
+
+class IO(object):
+    """ IO that records if the data lock was available while an object
+    was loaded.
+    """
+    def __init__(self):
+        self.lock_available = None
+
+    def load_lazy_object(self, o):
+        # The lock is reentrant, so it is checked from another thread
+        t = threading.Thread(target=self._check_lock)
+        t.start()
+        t.join()
+        return neo.SpikeTrain([1, 2] * pq.s, t_stop=10 * pq.s)
+
+    def _check_lock(self):
+        self.lock_available = data_lock.data_lock.acquire(False)
+        if self.lock_available:
+            data_lock.data_lock.release()
+
+
+class Provider(NeoDataProvider):
+    def __init__(self, io):
+        super(Provider, self).__init__('Test', None)
+        self.io = io
+
+    def _get_object_io(self, o):
+        return self.io
+
+
+class TestDataLock(ut.TestCase):
+    def setUp(self):
+        data_lock.install()
+
+    def test_install_once(self):
+        f = NeoDataProvider._load_lazy_object
+        g = NeoDataProvider.get_blocks
+        data_lock.install()
+        self.assertEqual(NeoDataProvider._load_lazy_object, f)
+        self.assertEqual(NeoDataProvider.get_blocks, g)
+
+    def load_in_thread(self):
+        io = IO()
+        train = neo.SpikeTrain([] * pq.s, t_stop=10 * pq.s)
+        train.lazy_shape = (2,)
+        result = []
+        t = threading.Thread(
+            target=lambda: result.append(
+                Provider(io)._load_lazy_object(train)))
+        t.start()
+        return t, io, result
+
+    def test_lazy_load_holds_lock(self):
+        t, io, result = self.load_in_thread()
+        t.join()
+        self.assertEqual(len(result), 1)
+        self.assertEqual(len(result[0]), 2)
+        self.assertFalse(io.lock_available)
+
+    def test_lazy_load_waits_for_lock(self):
+        with data_lock.data_lock:
+            t, io, result = self.load_in_thread()
+            t.join(0.2)
+            self.assertTrue(t.is_alive())
+            self.assertEqual(result, [])
+        t.join()
+        self.assertEqual(len(result), 1)
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,59 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import numpy as np
+
+from spykeviewer.plot.decimation import MinMaxPyramid
+
+
+class TestMinMaxPyramid(ut.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(1234)
+        self.data = rng.randn(100000)
+        self.pyramid = MinMaxPyramid(self.data, 2.0, 0.001)
+
+    def test_levels(self):
+        block, mins, maxs = self.pyramid.levels[0]
+        self.assertEqual(block, 8)
+        self.assertEqual(len(mins), 12500)
+        self.assertEqual(mins[3], self.data[24:32].min())
+        self.assertEqual(maxs[3], self.data[24:32].max())
+        self.assertLessEqual(len(self.pyramid.levels[-1][1]), 512)
+
+    def test_narrow_range_returns_samples(self):
+        x, y = self.pyramid.envelope(3.0, 3.1, 1000)
+        self.assertLessEqual(len(x), 1000)
+        self.assertTrue(np.all(y == self.data[999:999 + len(y)]))
+        self.assertAlmostEqual(x[0], 2.999)
+        self.assertLessEqual(x[0], 3.0)
+        self.assertGreaterEqual(x[-1], 3.1)
+
+    def test_wide_range_is_decimated(self):
+        x, y = self.pyramid.envelope(2.0, 102.0, 1000)
+        self.assertLessEqual(len(x), 1000)
+        self.assertEqual(len(x), len(y))
+        self.assertEqual(y.min(), self.data.min())
+        self.assertEqual(y.max(), self.data.max())
+        self.assertTrue(np.all(np.diff(x) >= 0))
+
+    def test_partial_range_covers_extremes(self):
+        x, y = self.pyramid.envelope(20.0, 60.0, 500)
+        self.assertLessEqual(len(x), 500)
+        visible = self.data[18000:58000]
+        self.assertLessEqual(y.min(), visible.min())
+        self.assertGreaterEqual(y.max(), visible.max())
+
+    def test_offset(self):
+        pyramid = MinMaxPyramid(self.data, 2.0, 0.001, offset=5.0)
+        x, y = pyramid.envelope(2.0, 102.0, 1000)
+        self.assertEqual(y.max(), self.data.max() + 5.0)
+
+    def test_outside_range(self):
+        x, y = self.pyramid.envelope(200.0, 300.0, 1000)
+        self.assertEqual(len(x), 0)
+
+
+if __name__ == '__main__':
+    ut.main()
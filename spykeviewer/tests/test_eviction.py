@@ -0,0 +1,135 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import numpy as np
+import neo
+import quantities as pq
+
+from spykeutils.plugin.data_provider_neo import NeoDataProvider
+
+from spykeviewer.plugin_framework import eviction
+
+
+class ReloadIO(object):
+    """ Reads objects again by their path, like NeoHdf5IO.
+    """
+    def __init__(self):
+        self.objects = {}
+        self.reads = 0
+
+    def load_lazy_object(self, o):
+        self.reads += 1
+        return self.objects[o.hdf5_path].copy()
+
+
+def create_block(io, name, num_segments=2, samples=1000):
+    b = neo.Block(name=name)
+    rcg = neo.RecordingChannelGroup()
+    rc = neo.RecordingChannel(index=0)
+    rcg.recordingchannels.append(rc)
+    rc.recordingchannelgroups.append(rcg)
+    unit = neo.Unit()
+    rcg.units.append(unit)
+    b.recordingchannelgroups.append(rcg)
+    for i in xrange(num_segments):
+        s = neo.Segment()
+        s.block = b
+        b.segments.append(s)
+
+        sig = neo.AnalogSignal(np.arange(samples) * pq.mV,
+                               sampling_rate=1 * pq.kHz)
+        sig.hdf5_path = '/%s/%d/sig' % (name, i)
+        sig.segment = s
+        sig.recordingchannel = rc
+        s.analogsignals.append(sig)
+        rc.analogsignals.append(sig)
+
+        st = neo.SpikeTrain(np.arange(10) * pq.s, t_stop=10 * pq.s,
+                            waveforms=np.ones((10, 1, 50)) * pq.mV)
+        st.hdf5_path = '/%s/%d/st' % (name, i)
+        st.segment = s
+        st.unit = unit
+        s.spiketrains.append(st)
+        unit.spiketrains.append(st)
+
+        io.objects[sig.hdf5_path] = sig
+        io.objects[st.hdf5_path] = st
+    NeoDataProvider.block_ios[b] = io
+    return b
+
+
+class TestEviction(ut.TestCase):
+    def setUp(self):
+        self.io = ReloadIO()
+        self.blocks = [create_block(self.io, n) for n in 'abc']
+        # Signal: 8000 bytes, spike train: 80 + 4000 bytes
+        self.block_size = 2 * (8000 + 4080)
+
+    def tearDown(self):
+        NeoDataProvider.block_ios.clear()
+
+    def test_object_size(self):
+        st = self.blocks[0].segments[0].spiketrains[0]
+        self.assertEqual(eviction.object_size(st), 4080)
+        self.assertEqual(
+            len(eviction.loaded_objects(self.blocks[0])), 4)
+
+    def test_lazy_copy(self):
+        sig = self.blocks[0].segments[0].analogsignals[0]
+        lazy = eviction.lazy_copy(sig)
+        self.assertEqual(len(lazy), 0)
+        self.assertEqual(lazy.lazy_shape, sig.shape)
+        self.assertEqual(lazy.hdf5_path, sig.hdf5_path)
+        self.assertIs(lazy.segment, sig.segment)
+        self.assertIs(lazy.recordingchannel, sig.recordingchannel)
+
+    def test_evicts_least_recently_used(self):
+        freed = eviction.evict(self.blocks, set([self.blocks[0]]),
+                               self.block_size)
+        self.assertEqual(freed, 2 * self.block_size)
+        self.assertEqual(len(eviction.loaded_objects(self.blocks[0])), 4)
+        self.assertEqual(len(eviction.loaded_objects(self.blocks[1])), 0)
+        self.assertEqual(len(eviction.loaded_objects(self.blocks[2])), 0)
+
+        # Containers still hold the (lazy) objects
+        b = self.blocks[1]
+        st = b.segments[0].spiketrains[0]
+        self.assertTrue(hasattr(st, 'lazy_shape'))
+        self.assertIs(b.recordingchannelgroups[0].units[0].spiketrains[0],
+                      st)
+        self.assertIs(
+            b.recordingchannelgroups[0].recordingchannels[0]
+            .analogsignals[0], b.segments[0].analogsignals[0])
+
+    def test_stops_at_budget(self):
+        freed = eviction.evict(self.blocks, set(),
+                               3 * self.block_size - 8000)
+        self.assertEqual(freed, 8000)
+        self.assertTrue(hasattr(
+            self.blocks[0].segments[0].analogsignals[0], 'lazy_shape'))
+        self.assertFalse(hasattr(
+            self.blocks[0].segments[0].spiketrains[0], 'lazy_shape'))
+
+    def test_blocks_without_io_are_kept(self):
+        del NeoDataProvider.block_ios[self.blocks[0]]
+        eviction.evict(self.blocks, set(), 0)
+        self.assertEqual(len(eviction.loaded_objects(self.blocks[0])), 4)
+        self.assertEqual(len(eviction.loaded_objects(self.blocks[1])), 0)
+
+    def test_reload(self):
+        eviction.evict(self.blocks, set(), 0)
+        provider = NeoDataProvider('test', None)
+        seg = self.blocks[1].segments[1]
+        st = provider._load_lazy_object(seg.spiketrains[0], True)
+        self.assertEqual(self.io.reads, 1)
+        self.assertTrue(np.all(st == np.arange(10) * pq.s))
+        self.assertEqual(st.waveforms.shape, (10, 1, 50))
+        self.assertIs(st.unit, self.blocks[1].recordingchannelgroups[0]
+                      .units[0])
+        self.assertIs(seg.spiketrains[0], st)
+
+
+if __name__ == '__main__':
+    ut.main()
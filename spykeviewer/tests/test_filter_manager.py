@@ -0,0 +1,44 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+from spykeviewer.plugin_framework.filter_manager import FilterManager
+
+
+class TestFilterManager(ut.TestCase):
+    def setUp(self):
+        # Nonexistent file, so no filters are loaded
+        self.manager = FilterManager('unit', '')
+        self.manager.add_filter('even', ['return unit % 2 == 0'])
+        self.filter = self.manager.get_item('even')
+
+    def test_function_cached(self):
+        f = self.filter.function()
+        self.assertTrue(f(2))
+        self.assertFalse(f(3))
+        self.assertIs(f, self.filter.function())
+
+    def test_code_change_recompiles(self):
+        f = self.filter.function()
+        self.filter.code = ['return unit % 2 == 1']
+        g = self.filter.function()
+        self.assertIsNot(f, g)
+        self.assertTrue(g(3))
+
+    def test_signature_change_recompiles(self):
+        f = self.filter.function()
+        self.manager.signature = 'unit, *args'
+        g = self.filter.function()
+        self.assertIsNot(f, g)
+        self.assertTrue(g(2, 'ignored'))
+
+    def test_combined_filter(self):
+        self.manager.add_filter('first', ['return units[:1]'],
+                                combined=True)
+        f = self.manager.get_item('first').function()
+        self.assertEqual(f([1, 2, 3]), [1])
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,47 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import numpy as np
+
+from spykeviewer.analysis.isi import ISIHistogram
+
+
+class TestISIHistogram(ut.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(1234)
+        self.trains = [rng.uniform(0, 1000, 100) for _ in xrange(4)]
+        self.bins = np.arange(0, 50.0, 2.0)
+
+    def test_incremental_counts(self):
+        hist = ISIHistogram(self.bins)
+        for i, t in enumerate(self.trains):
+            hist.add(i % 2, t)
+
+        self.assertEqual(hist.keys, [0, 1])
+        self.assertEqual(list(hist.num_trains), [2, 2])
+        for k in (0, 1):
+            intervals = np.concatenate(
+                [np.diff(np.sort(t)) for t in self.trains[k::2]])
+            self.assertTrue(np.array_equal(
+                hist.counts[k], np.histogram(intervals, self.bins)[0]))
+
+    def test_key_order(self):
+        hist = ISIHistogram(self.bins, ['a', 'b'])
+        hist.add('c', self.trains[0])
+        hist.add('b', self.trains[1])
+        self.assertEqual(hist.keys, ['a', 'b', 'c'])
+        self.assertEqual(list(hist.num_trains), [0, 1, 1])
+        self.assertEqual(hist.counts[0].sum(), 0)
+        self.assertEqual(hist.counts.shape, (3, len(self.bins) - 1))
+
+    def test_empty_train(self):
+        hist = ISIHistogram(self.bins)
+        hist.add('a', np.zeros(0))
+        self.assertEqual(hist.counts.sum(), 0)
+        self.assertEqual(list(hist.num_trains), [1])
+
+
+if __name__ == '__main__':
+    ut.main()
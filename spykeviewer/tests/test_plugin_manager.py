@@ -5,6 +5,8 @@ except ImportError:
 
 import sys
 import os
+import shutil
+import tempfile
 from spykeviewer.plugin_framework.plugin_manager import PluginManager
 
 class TestPluginManager(ut.TestCase):
@@ -42,5 +44,93 @@ class TestPluginManager(ut.TestCase):
         self.assertGreater(find_plugins(self.manager.root), 0,
             'No plugins loaded')
 
+
+PLUGIN_SOURCE = """
+from spykeutils.plugin.analysis_plugin import AnalysisPlugin
+from spykeutils.plugin import gui_data
+
+with open(%r, 'a') as f:
+    f.write('x')
+
+class ManifestPlugin(AnalysisPlugin):
+    number = gui_data.IntItem('Number', default=%d)
+
+    def get_name(self):
+        return 'Manifest Plugin'
+"""
+
+
+class TestPluginManifest(ut.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.plugin_dir = os.path.join(self.directory, 'plugins')
+        os.mkdir(self.plugin_dir)
+        self.plugin_path = os.path.join(self.plugin_dir, 'plugin.py')
+        self.counter_path = os.path.join(self.directory, 'executed')
+        self.manifest_path = os.path.join(self.directory, 'manifest.json')
+        self.write_plugin(1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_plugin(self, default):
+        with open(self.plugin_path, 'w') as f:
+            f.write(PLUGIN_SOURCE % (self.counter_path, default))
+
+    def executions(self):
+        if not os.path.isfile(self.counter_path):
+            return 0
+        with open(self.counter_path, 'r') as f:
+            return len(f.read())
+
+    def create_manager(self):
+        manager = PluginManager(self.manifest_path)
+        manager.add_path(self.plugin_dir)
+        return manager
+
+    def test_unchanged_file_not_executed(self):
+        manager = self.create_manager()
+        self.assertEqual(self.executions(), 1)
+        self.assertTrue(os.path.isfile(self.manifest_path))
+
+        manager = self.create_manager()
+        self.assertEqual(self.executions(), 1)
+        node = manager.root.children[0]
+        self.assertEqual(node.name, 'Manifest Plugin')
+        self.assertEqual(node.path, self.plugin_path)
+
+        plugin = node.data
+        self.assertEqual(self.executions(), 2)
+        self.assertEqual(plugin.get_name(), 'Manifest Plugin')
+        self.assertEqual(plugin.source_file, self.plugin_path)
+        self.assertIs(node.data, plugin)
+        self.assertEqual(self.executions(), 2)
+
+    def test_changed_file_executed(self):
+        self.create_manager()
+        self.write_plugin(2)
+        st = os.stat(self.plugin_path)
+        os.utime(self.plugin_path, (st.st_atime, st.st_mtime + 10))
+
+        manager = self.create_manager()
+        self.assertEqual(self.executions(), 2)
+        self.assertEqual(
+            manager.root.children[0].data.get_parameters()['number'], 2)
+
+    def test_configs_of_unloaded_plugins(self):
+        self.create_manager()
+        manager = self.create_manager()
+        key = ('Manifest Plugin', self.plugin_path)
+        self.assertEqual(manager.get_plugin_configs(), {})
+
+        manager.set_plugin_configs({key: {'number': 5}})
+        self.assertEqual(manager.get_plugin_configs(),
+                         {key: {'number': 5}})
+        self.assertEqual(self.executions(), 1)
+
+        plugin = manager.root.children[0].data
+        self.assertEqual(plugin.get_parameters()['number'], 5)
+
+
 if __name__ == '__main__':
     ut.main()
@@ -0,0 +1,147 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import os
+import sys
+import json
+import errno
+import shutil
+import tempfile
+import subprocess
+
+from spykeviewer.plugin_framework import plugin_worker
+from spykeviewer.plugin_framework.plugin_worker import (
+    JOB_DONE_MARKER, split_marker, LineTrackingStream)
+
+
+PLUGIN = '''import sys
+import time
+from spykeutils.plugin import analysis_plugin
+
+
+class NoNewlinePlugin(analysis_plugin.AnalysisPlugin):
+    def get_name(self):
+        return 'No newline'
+
+    def start(self, current, selections):
+        sys.stdout.write('partial')
+        sys.stderr.write('partial')
+
+
+class SlowPlugin(analysis_plugin.AnalysisPlugin):
+    def get_name(self):
+        return 'Slow'
+
+    def start(self, current, selections):
+        sys.stdout.write('started\\n')
+        current.progress.begin('Slow')
+        current.progress.set_ticks(5)
+        for _ in xrange(5):
+            time.sleep(0.1)
+            current.progress.step()
+        sys.stdout.write('finished\\n')
+'''
+
+
+class TestSplitMarker(ut.TestCase):
+    def test_no_marker(self):
+        self.assertEqual(split_marker('output'), ('output', None))
+
+    def test_marker(self):
+        self.assertEqual(split_marker('%s 3 ok' % JOB_DONE_MARKER),
+                         ('', ('3', 'ok')))
+
+    def test_marker_after_output(self):
+        self.assertEqual(split_marker('out%s 3 error' % JOB_DONE_MARKER),
+                         ('out', ('3', 'error')))
+
+    def test_incomplete_marker(self):
+        self.assertEqual(split_marker(JOB_DONE_MARKER),
+                         ('', (None, 'error')))
+
+
+class ClosedStream(object):
+    def write(self, s):
+        raise IOError(errno.EPIPE, 'Broken pipe')
+
+    def flush(self):
+        raise IOError(errno.EPIPE, 'Broken pipe')
+
+
+class TestLineTrackingStream(ut.TestCase):
+    def test_line_start(self):
+        s = LineTrackingStream(open(os.devnull, 'w'))
+        self.assertTrue(s.at_line_start)
+        s.write('text')
+        self.assertFalse(s.at_line_start)
+        s.write('')
+        self.assertFalse(s.at_line_start)
+        s.write('line\n')
+        self.assertTrue(s.at_line_start)
+
+    def test_closed_stream(self):
+        s = LineTrackingStream(ClosedStream())
+        s.write('text\n')
+        s.flush()
+        self.assertTrue(s.at_line_start)
+
+
+class TestPluginWorker(ut.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.plugin = os.path.join(self.dir, 'no_newline.py')
+        with open(self.plugin, 'w') as f:
+            f.write(PLUGIN)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def start_worker(self):
+        script = plugin_worker.__file__
+        if script.endswith('.pyc'):
+            script = script[:-1]
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(sys.path)
+        return subprocess.Popen(
+            [sys.executable, '-u', script], stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+
+    def run_jobs(self, jobs):
+        p = self.start_worker()
+        return p.communicate(''.join(json.dumps(j) + '\n' for j in jobs))
+
+    def job(self, job_id, name='NoNewlinePlugin'):
+        selection = {'type': 'Neo', 'name': 'Current', 'blocks': [],
+                     'channel_groups': [], 'channels': [], 'units': [],
+                     'segments': []}
+        return {'id': job_id, 'name': name,
+                'path': self.plugin, 'selections': [selection]}
+
+    def test_output_without_newline(self):
+        out, err = self.run_jobs([self.job(1), self.job(2)])
+        for output in (out, err):
+            lines = output.splitlines()
+            self.assertEqual(lines[-4:], [
+                'partial', '%s 1 ok' % JOB_DONE_MARKER,
+                'partial', '%s 2 ok' % JOB_DONE_MARKER])
+
+    def test_input_closed_while_running(self):
+        p = self.start_worker()
+        p.stdin.write(json.dumps(self.job(1, 'SlowPlugin')) + '\n')
+        p.stdin.flush()
+        self.assertEqual(p.stdout.readline().strip(), 'started')
+        # The worker exits when its input is closed, but only after the
+        # running job is done
+        p.stdin.close()
+        out, err = p.stdout.read(), p.stderr.read()
+        p.wait()
+        self.assertEqual(out.splitlines(),
+                         ['finished', '%s 1 ok' % JOB_DONE_MARKER])
+        self.assertEqual(err.splitlines()[-1], '%s 1 ok' % JOB_DONE_MARKER)
+        self.assertEqual(p.returncode, 0)
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,121 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import threading
+
+import neo
+import quantities as pq
+
+from spykeviewer.plugin_framework import prefetch
+from spykeviewer.plugin_framework.data_lock import data_lock
+
+
+def lazy_train(segment, unit, size):
+    t = neo.SpikeTrain([] * pq.s, t_stop=10 * pq.s)
+    t.lazy_shape = (size,)
+    t.segment = segment
+    t.unit = unit
+    segment.spiketrains.append(t)
+    return t
+
+
+def lazy_signal(segment, channel, size):
+    s = neo.AnalogSignal([] * pq.mV, sampling_rate=1 * pq.kHz)
+    s.lazy_shape = (size,)
+    s.segment = segment
+    s.recordingchannel = channel
+    segment.analogsignals.append(s)
+    return s
+
+
+class Provider(object):
+    """ Replaces lazy objects in their segment like a data provider in
+    cached lazy mode.
+    """
+    def __init__(self):
+        self.loaded = []
+
+    def _load_lazy_object(self, o, change_links=False):
+        self.loaded.append(o)
+        ret = neo.SpikeTrain([1.0] * pq.s, t_stop=10 * pq.s)
+        l = o.segment.spiketrains if isinstance(o, neo.SpikeTrain) \
+            else o.segment.analogsignals
+        l[l.index(o)] = ret
+        return ret
+
+
+class TestPrefetch(ut.TestCase):
+    def setUp(self):
+        self.segments = [neo.Segment(), neo.Segment()]
+        self.units = [neo.Unit(), neo.Unit()]
+        self.channels = [neo.RecordingChannel(index=0),
+                         neo.RecordingChannel(index=1)]
+        self.trains = [lazy_train(s, u, 100)
+                       for s in self.segments for u in self.units]
+        self.signals = [lazy_signal(s, c, 1000)
+                        for s in self.segments for c in self.channels]
+
+    def test_object_size(self):
+        self.assertEqual(prefetch.object_size(self.trains[0]), 800)
+        self.assertEqual(prefetch.object_size(neo.Segment()), 0)
+
+    def test_lazy_objects_of_selection(self):
+        objects = prefetch.lazy_objects(
+            self.segments[1:], [], self.channels[:1], self.units[1:])
+        self.assertEqual(len(objects), 2)
+        self.assertIs(objects[0], self.signals[2])
+        self.assertIs(objects[1], self.trains[3])
+
+    def test_loaded_objects_are_skipped(self):
+        self.segments[0].spiketrains[0] = neo.SpikeTrain(
+            [] * pq.s, t_stop=10 * pq.s)
+        objects = prefetch.lazy_objects(
+            self.segments[:1], [], [], self.units)
+        self.assertEqual(len(objects), 1)
+        self.assertIs(objects[0], self.trains[1])
+
+    def test_budget(self):
+        provider = Provider()
+        objects = prefetch.lazy_objects(
+            self.segments, [], [], self.units)
+        loaded = prefetch.prefetch(provider, objects, 2500)
+        self.assertEqual(loaded, 2400)
+        self.assertEqual(provider.loaded, self.trains[:3])
+        self.assertFalse(prefetch.is_lazy(self.segments[0].spiketrains[0]))
+        self.assertTrue(prefetch.is_lazy(self.segments[1].spiketrains[1]))
+
+    def test_cancel(self):
+        provider = Provider()
+        objects = prefetch.lazy_objects(
+            self.segments, [], [], self.units)
+        loaded = prefetch.prefetch(
+            provider, objects, 10 ** 6, lambda: len(provider.loaded) >= 2)
+        self.assertEqual(loaded, 1600)
+        self.assertEqual(provider.loaded, self.trains[:2])
+
+    def test_replaced_objects_are_not_loaded_again(self):
+        provider = Provider()
+        objects = prefetch.lazy_objects(
+            self.segments, [], [], self.units)
+        prefetch.prefetch(provider, objects[:1], 10 ** 6)
+        prefetch.prefetch(provider, objects, 10 ** 6)
+        self.assertEqual(provider.loaded, self.trains)
+
+    def test_waits_for_data_lock(self):
+        provider = Provider()
+        objects = prefetch.lazy_objects(
+            self.segments, [], [], self.units)
+        t = threading.Thread(
+            target=lambda: prefetch.prefetch(provider, objects, 10 ** 6))
+        with data_lock:
+            t.start()
+            t.join(0.2)
+            self.assertEqual(provider.loaded, [])
+        t.join()
+        self.assertEqual(provider.loaded, self.trains)
+
+
+if __name__ == '__main__':
+    ut.main()
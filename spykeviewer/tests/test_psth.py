@@ -0,0 +1,68 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import numpy as np
+
+from spykeviewer.analysis.psth import psth, flatten_trains
+
+
+class TestPSTH(ut.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(1234)
+        # Two units in three segments
+        self.trains = [np.sort(rng.uniform(0, 10000, 100))
+                       for _ in xrange(6)]
+        self.units = [0, 0, 0, 1, 1, 1]
+        self.segments = [0, 1, 2, 0, 1, 2]
+        self.t_starts = [0.0] * 6
+        self.t_stops = [10000.0] * 6
+        self.times, self.indices = flatten_trains(self.trains)
+
+    def expected(self, trains, bins):
+        values = np.zeros((2, len(bins) - 1))
+        counts = np.zeros(2)
+        for t, u in trains:
+            values[u] += np.histogram(t, bins)[0]
+            counts[u] += 1
+        return values / counts[:, np.newaxis] * 1000.0 / 500.0
+
+    def test_flatten(self):
+        self.assertEqual(len(self.times), 600)
+        self.assertTrue(np.all(self.times[100:200] == self.trains[1]))
+        self.assertTrue(np.all(self.indices[100:200] == 1))
+
+    def test_histograms(self):
+        values, bins = psth(
+            self.times, self.indices, self.units, self.segments,
+            self.t_starts, self.t_stops, 2, 500.0, 0.0, 7001.0)
+        self.assertEqual(len(bins), 16)
+        self.assertEqual(bins[0], 0.0)
+        self.assertEqual(bins[1], 500.0)
+        expected = self.expected(zip(self.trains, self.units), bins)
+        self.assertTrue(np.allclose(values, expected))
+
+    def test_alignment(self):
+        offsets = np.array([1000.0, np.nan, 3000.0])
+        values, bins = psth(
+            self.times, self.indices, self.units, self.segments,
+            self.t_starts, self.t_stops, 2, 500.0, -2000.0,
+            offsets=offsets)
+        # Shared interval of the aligned trains
+        self.assertEqual(bins[0], -1000.0)
+        self.assertEqual(bins[-1], 7000.0)
+        aligned = [(t - offsets[s], u) for t, u, s in
+                   zip(self.trains, self.units, self.segments)
+                   if not np.isnan(offsets[s])]
+        self.assertTrue(np.allclose(values, self.expected(aligned, bins)))
+
+    def test_no_interval(self):
+        values, bins = psth(
+            self.times, self.indices, self.units, self.segments,
+            self.t_starts, self.t_stops, 2, 500.0, 10000.0)
+        self.assertEqual(values.shape, (2, 0))
+
+
+if __name__ == '__main__':
+    ut.main()
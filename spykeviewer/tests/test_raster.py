@@ -0,0 +1,42 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import numpy as np
+
+from spykeviewer.analysis.raster import SpikeRaster
+
+
+class TestSpikeRaster(ut.TestCase):
+    def setUp(self):
+        self.raster = SpikeRaster([np.array([3.0, 1.0, 2.0]), np.array([]),
+                                   np.array([0.5, 9.5])])
+
+    def test_rows(self):
+        self.assertEqual(len(self.raster), 3)
+        self.assertEqual(list(self.raster.offsets), [0, 3, 3, 5])
+        self.assertEqual(list(self.raster.row(0)), [1.0, 2.0, 3.0])
+        self.assertEqual(len(self.raster.row(1)), 0)
+        self.assertEqual(list(self.raster.row(2)), [0.5, 9.5])
+
+    def test_visible(self):
+        visible = self.raster.visible(1.0, 2.5)
+        self.assertEqual(list(visible[0]), [1.0, 2.0])
+        self.assertEqual(len(visible[1]), 0)
+        self.assertEqual(len(visible[2]), 0)
+
+    def test_binarize(self):
+        image = self.raster.binarize(0.0, 10.0, 10)
+        self.assertEqual(image.shape, (3, 10))
+        self.assertEqual(list(np.nonzero(image[0])[0]), [1, 2, 3])
+        self.assertFalse(image[1].any())
+        self.assertEqual(list(np.nonzero(image[2])[0]), [0, 9])
+
+    def test_binarize_range_end(self):
+        image = self.raster.binarize(1.0, 3.0, 2)
+        self.assertTrue(np.all(image[0]))
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,115 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from spykeutils.plugin.analysis_plugin import AnalysisPlugin
+
+from spykeviewer import api
+from spykeviewer.plugin_framework import result_cache
+
+
+class Selection(object):
+    def __init__(self, data_file):
+        self.data = {'type': 'Neo', 'name': 'Selection',
+                     'blocks': [[0, data_file]]}
+
+    def data_dict(self):
+        return self.data
+
+
+class CountingPlugin(object):
+    cache_results = True
+
+    def __init__(self):
+        self.parameters = {'size': 1.0}
+        self.computed = 0
+
+    def get_name(self):
+        return 'Counting Plugin'
+
+    def get_parameters(self):
+        return self.parameters
+
+    def compute(self, current, selections):
+        self.computed += 1
+        return {'values': np.arange(10) * self.parameters['size'],
+                'names': np.array([u'Unit'])}
+
+
+class TestResultCache(ut.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.directory, 'data.bin')
+        with open(self.data_file, 'w') as f:
+            f.write('data')
+        self.old_data_dir = AnalysisPlugin.data_dir
+        self.old_size = api.config.result_cache_size
+        AnalysisPlugin.data_dir = self.directory
+        api.config.result_cache_size = 1
+        self.plugin = CountingPlugin()
+        self.current = Selection(self.data_file)
+
+    def tearDown(self):
+        AnalysisPlugin.data_dir = self.old_data_dir
+        api.config.result_cache_size = self.old_size
+        shutil.rmtree(self.directory)
+
+    def compute(self):
+        return result_cache.cached_compute(self.plugin, self.current, [])
+
+    def test_cached_result_used(self):
+        first = self.compute()
+        second = self.compute()
+        self.assertEqual(self.plugin.computed, 1)
+        self.assertTrue(np.all(first['values'] == second['values']))
+        self.assertEqual(second['names'][0], u'Unit')
+
+    def test_changed_parameters_computed(self):
+        self.compute()
+        self.plugin.parameters = {'size': 2.0}
+        result = self.compute()
+        self.assertEqual(self.plugin.computed, 2)
+        self.assertEqual(result['values'][1], 2.0)
+
+    def test_changed_data_file_computed(self):
+        self.compute()
+        st = os.stat(self.data_file)
+        os.utime(self.data_file, (st.st_atime, st.st_mtime + 10))
+        self.compute()
+        self.assertEqual(self.plugin.computed, 2)
+
+    def test_disabled(self):
+        api.config.result_cache_size = 0
+        self.compute()
+        self.compute()
+        self.assertEqual(self.plugin.computed, 2)
+        self.assertFalse(os.path.exists(os.path.join(
+            self.directory, result_cache.CACHE_DIRECTORY)))
+
+    def test_least_recently_used_evicted(self):
+        cache = result_cache.ResultCache(
+            os.path.join(self.directory, 'cache'), 1024 * 1024)
+        cache.put('a', {'values': np.zeros(10)})
+        size = os.path.getsize(cache._path('a'))
+        cache.max_size = 2 * size
+        cache.put('b', {'values': np.zeros(10)})
+
+        # 'b' is older than 'a', which is used again
+        os.utime(cache._path('b'), (0, 0))
+        self.assertIsNotNone(cache.get('a'))
+        cache.put('c', {'values': np.zeros(10)})
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+
+if __name__ == '__main__':
+    ut.main()
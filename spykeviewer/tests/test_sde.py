@@ -0,0 +1,75 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import numpy as np
+import scipy.signal
+
+from spykeviewer.analysis import sde
+
+
+class TestSDE(ut.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(1234)
+        self.trains = [
+            [np.sort(rng.uniform(0, 5000, n)) for n in (40, 60)],
+            [np.sort(rng.uniform(0, 5000, 300))]]
+        self.dt = 5000.0 / 1024
+        self.counts = sde.binned_trains(self.trains, 0.0, 5000.0)
+        self.steps = np.logspace(1, 3, 10)
+
+    def kernel(self, size):
+        t = np.arange(-1024, 1024) * self.dt
+        k = np.exp(-0.5 * (t / size) ** 2)
+        return k / (k.sum() * self.dt)
+
+    def test_binned_trains(self):
+        self.assertEqual(self.counts.shape, (2, 1024))
+        self.assertEqual(self.counts[0].sum(), 100)
+        self.assertEqual(self.counts[1].sum(), 300)
+
+    def test_costs(self):
+        costs = sde.kernel_size_costs(self.counts, self.dt, self.steps,
+                                      processes=1)
+        for u in xrange(2):
+            n = self.counts[u].sum()
+            y = self.counts[u] / n / self.dt
+            expected = []
+            for s in self.steps:
+                yh = scipy.signal.convolve(y, self.kernel(2 * s), 'same')
+                c = (np.sum(yh ** 2) * self.dt -
+                     2 * np.sum(yh * y) * self.dt +
+                     2 / np.sqrt(2 * np.pi) / s / n)
+                expected.append(c * n * n)
+            self.assertTrue(np.allclose(costs[u], expected))
+
+    def test_costs_parallel(self):
+        serial = sde.kernel_size_costs(self.counts, self.dt, self.steps,
+                                       processes=1)
+        parallel = sde.kernel_size_costs(self.counts, self.dt, self.steps,
+                                         processes=2)
+        self.assertTrue(np.allclose(serial, parallel))
+
+    def test_best_kernel_sizes(self):
+        costs = np.array([[3.0, 1.0, 2.0], [np.nan] * 3])
+        sizes = sde.best_kernel_sizes(costs, [10.0, 20.0, 30.0])
+        self.assertEqual(list(sizes), [20.0, 10.0])
+
+    def test_empty_unit(self):
+        counts = np.vstack((self.counts[0], np.zeros(1024)))
+        costs = sde.kernel_size_costs(counts, self.dt, self.steps,
+                                      processes=1)
+        self.assertFalse(np.any(np.isnan(costs[0])))
+        self.assertTrue(np.all(np.isnan(costs[1])))
+
+    def test_densities(self):
+        values = sde.densities(self.counts, [2, 1], self.dt, [100.0, 50.0])
+        for u, (n, s) in enumerate(((2, 100.0), (1, 50.0))):
+            expected = scipy.signal.convolve(
+                self.counts[u], self.kernel(s), 'same') / n * 1000.0
+            self.assertTrue(np.allclose(values[u], expected))
+
+
+if __name__ == '__main__':
+    ut.main()
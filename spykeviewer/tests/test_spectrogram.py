@@ -0,0 +1,70 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import numpy as np
+from scipy import signal
+
+from spykeviewer.analysis.spectrogram import (
+    spectrogram, spectrogram_shape, spectrograms)
+
+
+class TestSpectrogram(ut.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(1234)
+        self.data = rng.randn(50003)
+        self.freqs, self.times, self.power = signal.spectrogram(
+            self.data, 1000.0, window=np.hanning(256), nperseg=256,
+            noverlap=128, detrend=False, scaling='density', mode='psd')
+
+    def test_matches_psd(self):
+        image, freqs, times = spectrogram(
+            self.data, 1000.0, 256, chunk_size=5000)
+        self.assertEqual(image.shape, self.power.shape)
+        self.assertTrue(np.allclose(freqs, self.freqs))
+        self.assertTrue(np.allclose(times, self.times))
+        self.assertTrue(np.allclose(image, np.log(self.power), atol=1e-4))
+
+    def test_time_bins_averaged(self):
+        shape, factor = spectrogram_shape(len(self.data), 256, 128, 100)
+        self.assertLessEqual(shape[1], 100)
+        image, freqs, times = spectrogram(
+            self.data, 1000.0, 256, max_columns=100, chunk_size=5000)
+        self.assertEqual(image.shape, shape)
+
+        n = self.power.shape[1]
+        expected = np.array([self.power[:, i:i + factor].mean(axis=1)
+                             for i in xrange(0, n, factor)]).T
+        expected_times = np.array([self.times[i:i + factor].mean()
+                                   for i in xrange(0, n, factor)])
+        self.assertTrue(np.allclose(image, np.log(expected), atol=1e-4))
+        self.assertTrue(np.allclose(times, expected_times))
+
+    def test_memmap(self):
+        image, _, _ = spectrogram(self.data, 1000.0, 256, memmap=True)
+        self.assertIsInstance(image, np.memmap)
+        self.assertTrue(np.allclose(image, np.log(self.power), atol=1e-4))
+
+    def test_short_signal(self):
+        image, freqs, times = spectrogram(self.data[:100], 1000.0, 256)
+        self.assertEqual(image.shape, (129, 0))
+        self.assertEqual(len(times), 0)
+
+    def test_multiple_signals_in_order(self):
+        signals = [self.data, self.data[:20000], self.data[:100],
+                   self.data[10000:]]
+        rates = [1000.0, 500.0, 1000.0, 2000.0]
+        for processes in (1, 2):
+            results = spectrograms(signals, rates, 256, max_columns=100,
+                                   memmap_values=1000, processes=processes)
+            self.assertEqual(len(results), len(signals))
+            for d, r, result in zip(signals, rates, results):
+                expected = spectrogram(d, r, 256, max_columns=100)
+                for a, b in zip(result, expected):
+                    self.assertEqual(a.shape, b.shape)
+                    self.assertTrue(np.allclose(a, b))
+
+
+if __name__ == '__main__':
+    ut.main()
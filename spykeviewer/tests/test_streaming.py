@@ -0,0 +1,93 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import numpy as np
+import quantities as pq
+import neo
+
+from spykeutils.plugin.data_provider_neo import NeoDataProvider
+
+from spykeviewer.analysis.isi import ISIHistogram
+from spykeviewer.plugin_framework import streaming
+
+
+class Provider(NeoDataProvider):
+    """ Data provider with a fixed selection of segments and units.
+    """
+    def __init__(self, segments, units):
+        super(Provider, self).__init__('Test', None)
+        self._segments = segments
+        self._units = units
+
+    def segments(self):
+        return self._segments
+
+    def units(self):
+        return self._units
+
+
+class TestSpikeTrainsBySegment(ut.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(1234)
+
+        def train(segment, unit):
+            t = neo.SpikeTrain(np.sort(rng.uniform(0, 10, 100)) * pq.s,
+                               t_stop=10 * pq.s)
+            t.segment = segment
+            t.unit = unit
+            if segment is not None:
+                segment.spiketrains.append(t)
+            if unit is not None:
+                unit.spiketrains.append(t)
+            return t
+
+        self.segments = [neo.Segment('Segment %d' % i) for i in xrange(3)]
+        self.units = [neo.Unit('Unit %d' % i) for i in xrange(3)]
+        for s in self.segments:
+            for u in self.units:
+                train(s, u)
+            # Spike trains without unit
+            train(s, None)
+        # Spike train without segment
+        train(None, self.units[1])
+
+        self.provider = Provider(self.segments[:2], self.units[:2])
+
+    def test_same_trains(self):
+        by_segment = list(streaming.spike_trains_by_segment(self.provider))
+        self.assertEqual([s for s, _ in by_segment],
+                         self.segments[:2] + [self.provider.no_segment])
+
+        streamed = [t for _, trains in by_segment for t in trains]
+        trains = self.provider.spike_trains_by_segment()
+        self.assertEqual(
+            set(id(t) for t in streamed),
+            set(id(t) for l in trains.itervalues() for t in l))
+        self.assertEqual(len([t for t in streamed if t.unit is None]), 2)
+
+    def test_same_isi_histograms(self):
+        bins = np.arange(0, 500.0, 10.0)
+        units = self.provider.units()
+
+        hist = ISIHistogram(bins, units)
+        for u, trains in self.provider.spike_trains_by_unit().iteritems():
+            for t in trains:
+                hist.add(u, t.rescale(pq.ms))
+
+        streamed = ISIHistogram(bins, units)
+        for _, trains in streaming.spike_trains_by_segment(self.provider):
+            for t in trains:
+                key = t.unit if t.unit is not None else self.provider.no_unit
+                streamed.add(key, t.rescale(pq.ms))
+
+        self.assertEqual(streamed.keys, hist.keys)
+        self.assertIn(self.provider.no_unit, streamed.keys)
+        self.assertTrue(np.array_equal(streamed.counts, hist.counts))
+        self.assertTrue(np.array_equal(streamed.num_trains,
+                                       hist.num_trains))
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,32 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import numpy as np
+
+from spykeviewer.plot.template_spikes import visible_times
+
+
+class TestVisibleTimes(ut.TestCase):
+    def setUp(self):
+        self.times = np.arange(0.0, 100.0, 0.5)
+
+    def test_range(self):
+        t = visible_times(self.times, 10.0, 20.0, -0.2, 0.6, 10000)
+        self.assertEqual(t[0], 9.5)
+        self.assertEqual(t[-1], 20.0)
+        self.assertEqual(len(t), 22)
+
+    def test_outside(self):
+        t = visible_times(self.times, 200.0, 300.0, -0.2, 0.6, 100)
+        self.assertEqual(len(t), 0)
+
+    def test_one_spike_per_pixel(self):
+        t = visible_times(self.times, 0.0, 100.0, 0.0, 0.1, 50)
+        self.assertEqual(len(t), 50)
+        self.assertTrue(np.all(np.diff(t) == 2.0))
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,73 @@
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import numpy as np
+
+from spykeviewer.analysis.waveforms import (
+    extract_waveforms, WaveformDensity)
+
+
+class TestExtractWaveforms(ut.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(1234)
+        self.data = rng.randn(3, 10000)
+        self.times = [np.sort(rng.uniform(0, 10, 200)),
+                      np.array([0.0005, 5.0, 9.999])]
+
+    def test_matches_loop(self):
+        result = extract_waveforms(
+            self.data, 1000.0, 0.0, self.times, 0.005, 0.001)
+        self.assertEqual(len(result), 2)
+        for times, (waves, extracted) in zip(self.times, result):
+            self.assertEqual(waves.shape, (extracted.sum(), 3, 5))
+            starts = ((times[extracted] - 0.001) * 1000.0).astype(int)
+            for w, s in zip(waves, starts):
+                self.assertTrue(np.all(w == self.data[:, s:s + 5]))
+
+    def test_borders_ignored(self):
+        waves, extracted = extract_waveforms(
+            self.data, 1000.0, 0.0, self.times[1:], 0.005, 0.001)[0]
+        self.assertEqual(list(extracted), [False, True, False])
+        self.assertEqual(len(waves), 1)
+
+    def test_t_start(self):
+        waves, _ = extract_waveforms(
+            self.data, 1000.0, 2.0, [[7.001]], 0.005, 0.001)[0]
+        self.assertTrue(np.all(waves[0] == self.data[:, 5000:5005]))
+
+    def test_no_spikes(self):
+        waves, extracted = extract_waveforms(
+            self.data, 1000.0, 0.0, [[]], 0.005, 0.001)[0]
+        self.assertEqual(waves.shape, (0, 3, 5))
+        self.assertEqual(len(extracted), 0)
+
+
+class TestWaveformDensity(ut.TestCase):
+    def test_counts(self):
+        density = WaveformDensity(3, 0.0, 1.0, bins=4, upsample=2)
+        density.add([[0.0, 0.5, 1.0], [1.0, 1.0, 1.0], [2.0, 2.0, 2.0]],
+                    chunk_size=2)
+        self.assertEqual(density.num_waveforms, 3)
+        self.assertEqual(density.counts.shape, (4, 5))
+        expected = np.array([[1, 0, 0, 0, 0],
+                             [0, 1, 0, 0, 0],
+                             [0, 0, 1, 0, 0],
+                             [1, 1, 1, 2, 2]])
+        self.assertTrue(np.all(density.counts == expected))
+
+    def test_incremental(self):
+        rng = np.random.RandomState(1234)
+        waves = rng.randn(1000, 32)
+        whole = WaveformDensity(32, -3.0, 3.0, bins=50)
+        whole.add(waves)
+        parts = WaveformDensity(32, -3.0, 3.0, bins=50)
+        for i in xrange(0, 1000, 300):
+            parts.add(waves[i:i + 300], chunk_size=64)
+        self.assertTrue(np.all(whole.counts == parts.counts))
+        self.assertEqual(parts.num_waveforms, 1000)
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,80 @@
+from PyQt4.QtGui import (QDockWidget, QTreeWidget, QTreeWidgetItem,
+                         QProgressBar, QPushButton, QWidget, QVBoxLayout,
+                         QAbstractItemView)
+
+
+class JobDock(QDockWidget):
+    """ Dock listing queued and running plugin jobs with their progress.
+    Selected jobs can be cancelled.
+    """
+    def __init__(self, title='Plugin Jobs', parent=None):
+        QDockWidget.__init__(self, title, parent)
+        self.setupUi()
+        self.items = {}
+
+        self.cancelButton.clicked.connect(self.cancel_selected)
+        self.jobTreeWidget.itemSelectionChanged.connect(
+            self._selection_changed)
+
+    def add_job(self, job):
+        """ Add a :class:`plugin_job.PluginJob` to the list.
+        """
+        item = QTreeWidgetItem([job.name, 'Queued'])
+        self.jobTreeWidget.addTopLevelItem(item)
+        bar = QProgressBar()
+        bar.setMaximum(0)
+        bar.setTextVisible(False)
+        self.jobTreeWidget.setItemWidget(item, 2, bar)
+        self.items[job] = item
+
+        job.started.connect(lambda: item.setText(1, 'Running'))
+        job.status_changed.connect(lambda s: item.setText(1, s))
+        job.progress_changed.connect(
+            lambda steps, ticks: self._set_progress(bar, steps, ticks))
+
+    def remove_job(self, job):
+        """ Remove a job from the list.
+        """
+        item = self.items.pop(job, None)
+        if item is None:
+            return
+        index = self.jobTreeWidget.indexOfTopLevelItem(item)
+        self.jobTreeWidget.takeTopLevelItem(index)
+
+    def cancel_selected(self):
+        """ Cancel all selected jobs.
+        """
+        selected = self.jobTreeWidget.selectedItems()
+        for job, item in self.items.iteritems():
+            if item in selected:
+                job.cancel()
+                item.setText(1, 'Cancelling...')
+
+    def _set_progress(self, bar, steps, ticks):
+        bar.setMaximum(ticks)
+        bar.setValue(min(steps, ticks))
+
+    def _selection_changed(self):
+        self.cancelButton.setEnabled(
+            bool(self.jobTreeWidget.selectedItems()))
+
+    def setupUi(self):
+        widget = QWidget(self)
+        layout = QVBoxLayout(widget)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.jobTreeWidget = QTreeWidget(widget)
+        self.jobTreeWidget.setColumnCount(3)
+        self.jobTreeWidget.setHeaderLabels(['Plugin', 'Status', 'Progress'])
+        self.jobTreeWidget.setRootIsDecorated(False)
+        self.jobTreeWidget.setSelectionMode(
+            QAbstractItemView.ExtendedSelection)
+        self.jobTreeWidget.setObjectName('jobTreeWidget')
+        layout.addWidget(self.jobTreeWidget)
+
+        self.cancelButton = QPushButton('Cancel', widget)
+        self.cancelButton.setEnabled(False)
+        self.cancelButton.setObjectName('cancelButton')
+        layout.addWidget(self.cancelButton)
+
+        self.setWidget(widget)
@@ -8,8 +8,8 @@ import webbrowser
 import copy
 import pickle
 import platform
-import subprocess
 import time
+import multiprocessing
 
 from PyQt4.QtGui import (QMainWindow, QMessageBox,
                          QApplication, QFileDialog, QInputDialog,
@@ -17,7 +17,7 @@ from PyQt4.QtGui import (QMainWindow, QMessageBox,
                          QPalette, QDesktopServices, QFont,
                          QPixmap, QFileSystemModel, QHeaderView,
                          QActionGroup, QDockWidget)
-from PyQt4.QtCore import (Qt, pyqtSignature, SIGNAL, QMimeData, QTimer,
+from PyQt4.QtCore import (Qt, pyqtSignature, SIGNAL, QMimeData,
                           QSettings, QCoreApplication, QUrl)
 
 from spyderlib.widgets.internalshell import InternalShell
@@ -44,9 +44,14 @@ from filter_dock import FilterDock
 from filter_dialog import FilterDialog
 from filter_group_dialog import FilterGroupDialog
 from plugin_editor_dock import PluginEditorDock
+from job_dock import JobDock
+from plugin_job import PluginJob, supports_background
+from worker_pool import WorkerPool
+from remote_batch import RemoteBatch
+from ..plugin_framework import plugin_worker
 import ipython_connection as ipy
 from plugin_model import PluginModel
-from remote_thread import RemoteThread
+from remote_process import RemoteProcess
 
 
 logger = logging.getLogger('spykeviewer')
@@ -92,10 +97,11 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.setupUi(self)
         self.dir = os.getcwd()
 
-        # Threads providing output from remotely started plugins
-        self.process_threads = {}
+        # Processes of remotely started plugins, indexed by id
+        self.remote_processes = {}
         self.remote_process_counter = 0
-        QTimer.singleShot(1000, self.clean_finished_process_threads)
+        # Persistent worker processes for remotely started plugins
+        self.worker_pool = None
 
         # Lazy load mode menu
         self.load_actions = QActionGroup(self)
@@ -187,6 +193,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.pluginEditorDock.plugin_saved.connect(self.plugin_saved)
         self.pluginEditorDock.file_available.connect(self.on_file_available)
 
+        # Background plugin jobs (queued and running)
+        self.plugin_jobs = []
+        self.jobDock = JobDock(parent=self)
+        self.jobDock.setObjectName('jobDock')
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.jobDock)
+        self.jobDock.setVisible(False)
+
         self.consoleDock.edit_script = lambda (path): \
             self.pluginEditorDock.add_file(path)
 
@@ -337,17 +350,19 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         else:
             AnalysisPlugin.data_dir = settings.value('dataPath')
 
+        if hasattr(sys, 'frozen'):
+            path = os.path.dirname(sys.executable)
+        else:
+            path = os.path.dirname(spykeutils.__file__)
+            path = os.path.join(os.path.abspath(path), 'plugin')
+        self.default_remote_script = os.path.join(path, 'startplugin.py')
+
         if not settings.contains('remoteScript') or not os.path.isfile(
                 settings.value('remoteScript')):
             if settings.contains('remoteScript'):
                 logger.warning('Remote script not found! Reverting to '
                                'default location...')
-            if hasattr(sys, 'frozen'):
-                path = os.path.dirname(sys.executable)
-            else:
-                path = os.path.dirname(spykeutils.__file__)
-                path = os.path.join(os.path.abspath(path), 'plugin')
-            self.remote_script = os.path.join(path, 'startplugin.py')
+            self.remote_script = self.default_remote_script
         else:
             self.remote_script = settings.value('remoteScript')
 
@@ -488,6 +503,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                 cmd_line = cmd + '\n'
                 self.interpreter.stdin_write.write(cmd_line.encode('utf-8'))
                 if not self.multithreaded:
+                    self.emit(SIGNAL("executing()"))
                     self.interpreter.run_line()
                     self.emit(SIGNAL("refresh()"))
 
@@ -552,6 +568,8 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.historyDock.setWidget(self.history)
         self.console.connect(self.console, SIGNAL("refresh()"),
                              self._append_python_history)
+        self.console.connect(self.console, SIGNAL("executing()"),
+                             self._console_executing)
 
         # Duplicate stdout and stderr for console
         # Not using previous stdout, only stderr. Using StreamDuplicator
@@ -565,6 +583,11 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         root_logger = logging.getLogger()
         root_logger.addHandler(ch)
 
+    def _console_executing(self):
+        """ Called before a command is run in the console.
+        """
+        pass
+
     def _append_python_history(self):
         self.browser.refresh_table()
         try:
@@ -991,35 +1014,14 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         """ Return dictionary indexed by (name,path) tuples with configuration
         dictionaries for all plugins.
         """
-        indices = self.plugin_model.get_all_indices()
-        c = {}
-
-        for idx in indices:
-            path = self.plugin_model.data(
-                idx, self.plugin_model.FilePathRole)
-            plug = self.plugin_model.data(idx, self.plugin_model.DataRole)
-            if plug:
-                c[(plug.get_name(), path)] = plug.get_parameters()
-
-        return c
+        return self.plugin_model.get_plugin_configs()
 
     def set_plugin_configs(self, configs):
-        """ Takes a dictionary indexed by plugin name with configuration
-        dictionaries for plugins and sets configurations of plugins.
+        """ Takes a dictionary indexed by (name,path) tuples with
+        configuration dictionaries for plugins and sets configurations of
+        plugins.
         """
-        indices = self.plugin_model.get_all_indices()
-
-        d = {}
-        for idx in indices:
-            path = self.plugin_model.data(
-                idx, self.plugin_model.FilePathRole)
-            plug = self.plugin_model.data(idx, self.plugin_model.DataRole)
-            if plug:
-                d[(plug.get_name(), path)] = plug
-
-        for n, c in configs.iteritems():
-            if n in d:
-                d[n].set_parameters(c)
+        self.plugin_model.set_plugin_configs(configs)
 
     def reload_plugins(self, keep_configs=True):
         """ Reloads all plugins.
@@ -1040,7 +1042,8 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                     item, self.plugin_model.FilePathRole)
 
         try:
-            self.plugin_model = PluginModel()
+            self.plugin_model = PluginModel(
+                os.path.join(self.data_path, 'plugin_manifest.json'))
             for p in self.plugin_paths:
                 self.plugin_model.add_path(p)
         except Exception, e:
@@ -1118,7 +1121,11 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         if not plugin:
             return
 
-        self._run_plugin(plugin)
+        if api.config.run_plugins_in_background and \
+                supports_background(plugin):
+            self.start_plugin_job(plugin)
+        else:
+            self._run_plugin(plugin)
 
     def _save_plugin_before_run(self):
         ana = self.current_plugin()
@@ -1162,6 +1169,81 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             if finish_progress:
                 self.progress.done()
 
+    def job_provider(self, provider):
+        """ Return a function that creates a copy of a data provider for
+        use in a background job, given a progress indicator. Called in the
+        GUI thread, the copy must not depend on the GUI afterwards.
+        """
+        def create(progress):
+            p = copy.copy(provider)
+            p.progress = progress
+            return p
+        return create
+
+    def start_plugin_job(self, plugin, current=None, selections=None):
+        """ Queue a plugin for execution in a background thread and
+        return the :class:`plugin_job.PluginJob`.
+        """
+        if not supports_background(plugin):
+            raise SpykeException(
+                'Plugin "%s" does not support background execution!' %
+                plugin.get_name())
+        if current is None:
+            current = self.provider
+        if selections is None:
+            selections = self.selections
+
+        job = PluginJob(plugin, self.job_provider(current),
+                        [self.job_provider(s) for s in selections], self)
+        job.finished.connect(
+            lambda: self._plugin_job_finished(job))
+        job.cancel_requested.connect(self._start_plugin_jobs)
+        self.plugin_jobs.append(job)
+        self.jobDock.add_job(job)
+        self.jobDock.setVisible(True)
+        self._start_plugin_jobs()
+        return job
+
+    def _start_plugin_jobs(self):
+        """ Remove plugin jobs that were cancelled before they started and
+        start queued jobs until the maximum number of jobs is running.
+        """
+        for job in self.plugin_jobs[:]:
+            if job.done() and not job.is_started():
+                self.plugin_jobs.remove(job)
+                self.jobDock.remove_job(job)
+
+        running = len([j for j in self.plugin_jobs if j.isRunning()])
+        for job in self.plugin_jobs:
+            if running >= max(1, api.config.background_jobs):
+                break
+            if job.is_started() or job.done():
+                continue
+            job.start()
+            running += 1
+
+    def _plugin_job_finished(self, job):
+        if job not in self.plugin_jobs:
+            return
+        self.plugin_jobs.remove(job)
+        self.jobDock.remove_job(job)
+
+        if not job.is_cancelled():
+            exc_info = job.exc_info()
+            if exc_info is None:
+                try:
+                    job.plugin.plot_result(job.result())
+                except Exception:
+                    exc_info = sys.exc_info()
+            if exc_info is not None:
+                if isinstance(exc_info[1], SpykeException):
+                    QMessageBox.critical(self, 'Error executing plugin',
+                                         str(exc_info[1]))
+                else:
+                    traceback.print_exception(*exc_info)
+
+        self._start_plugin_jobs()
+
     @pyqtSignature("")
     def on_actionEditPlugin_triggered(self):
         item = self.pluginsTreeView.currentIndex()
@@ -1235,6 +1317,20 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         :param str config: Pickled plugin configuration
         :param list io_files: List of paths to required IO plugins.
         """
+        pool = self._get_worker_pool()
+        if pool is not None:
+            pool.submit(self._worker_job(
+                name, path, selections, config, io_files))
+            return
+
+        if self._can_use_worker():
+            # Send the job on stdin to a worker that exits when it is done
+            job = self._worker_job(name, path, selections, config, io_files)
+            params = ['python', '-u', self._worker_script(), '-nm']
+            self._start_remote_process(
+                job['id'], params, json.dumps(job) + '\n')
+            return
+
         # Save files to circumvent length limit for command line
         selection_path = os.path.join(
             self.selection_path, '.temp_%f_.sel' % time.time())
@@ -1248,19 +1344,65 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             params.append('-io')
             params.extend(io_files)
         params.extend(api.config.remote_script_parameters)
-        p = subprocess.Popen(
-            params, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        std = RemoteThread(p, self.remote_process_counter, False, self)
-        err = RemoteThread(p, self.remote_process_counter, True, self)
-        self.connect(std, SIGNAL("output(int, QString)"), self.output_std)
-        self.connect(err, SIGNAL("output(int, QString)"), self.output_err)
-        self.connect(err, SIGNAL("execution_complete(int)"),
-                     self.remote_plugin_done)
-        std.start()
-        err.start()
-        self.process_threads[self.remote_process_counter] = (std, err, p)
+        self._start_remote_process(
+            self.remote_process_counter, params, temp_file=selection_path)
+        print '[#%d started]' % self.remote_process_counter
+        self.remote_process_counter += 1
+
+    def _start_remote_process(self, id_, params, input_data=None,
+                              temp_file=None):
+        p = RemoteProcess(id_, params, self, input_data)
+        p.temp_file = temp_file
+        p.output_std.connect(self.output_std)
+        p.output_err.connect(self.output_err)
+        p.execution_complete.connect(self.remote_process_complete)
+        self.remote_processes[id_] = p
+
+    def _worker_job(self, name, path, selections, config, io_files):
+        """ Create a job for a worker process from the same parameters as
+        :meth:`send_plugin_info` and assign it the next remote process id.
+        """
+        job = {'id': self.remote_process_counter,
+               'name': name, 'path': path,
+               'selections': json.loads(selections),
+               'config': config.decode('latin-1'),
+               'data_dir': AnalysisPlugin.data_dir,
+               'io_files': io_files}
         print '[#%d started]' % self.remote_process_counter
         self.remote_process_counter += 1
+        return job
+
+    def _worker_script(self):
+        return os.path.join(
+            os.path.dirname(os.path.abspath(plugin_worker.__file__)),
+            'plugin_worker.py')
+
+    def _can_use_worker(self):
+        """ Return if plugins can be started with the worker script
+        instead of the configured remote script. This is the case when
+        the default remote script is configured.
+        """
+        return not hasattr(sys, 'frozen') and \
+            self.remote_script == self.default_remote_script
+
+    def _get_worker_pool(self):
+        """ Return the pool of persistent worker processes or ``None`` if
+        plugins should be started with the remote script. Workers are
+        only used with the default remote script.
+        """
+        if api.config.remote_worker_processes < 1 or \
+                not self._can_use_worker():
+            return None
+
+        if self.worker_pool is None:
+            self.worker_pool = WorkerPool(
+                self._worker_script(), api.config.remote_worker_processes,
+                self)
+            self.worker_pool.output_std.connect(self.output_std)
+            self.worker_pool.output_err.connect(self.output_err)
+            self.worker_pool.job_done.connect(self.remote_plugin_done)
+        self.worker_pool.max_workers = api.config.remote_worker_processes
+        return self.worker_pool
 
     def output_std(self, id_, line):
         print '[#%d]' % id_, line
@@ -1271,16 +1413,16 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     def remote_plugin_done(self, id_):
         print '[#%d done]' % id_
 
-    def clean_finished_process_threads(self):
-        """ Periodically checks if threads for remote plugin output are
-        still running, removes them otherwise.
-        """
-        for k in self.process_threads.keys():
-            t = self.process_threads[k]
-            if not t[0].isRunning() and not t[1].isRunning():
-                t[2].wait()
-                del self.process_threads[k]
-        QTimer.singleShot(1000, self.clean_finished_process_threads)
+    def remote_process_complete(self, id_):
+        p = self.remote_processes.pop(id_, None)
+        if p is not None:
+            if p.temp_file:
+                try:
+                    os.remove(p.temp_file)
+                except OSError:
+                    pass
+            p.deleteLater()
+        self.remote_plugin_done(id_)
 
     @pyqtSignature("")
     def on_actionEdit_Startup_Script_triggered(self):
@@ -1355,7 +1497,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         return plugins[0]
 
     def start_plugin(self, name, current=None, selections=None,
-                     finish_progress=True):
+                     finish_progress=True, background=False):
         """ Start first plugin with given name and return result of start()
         method. Raises a SpykeException if not exactly one plugins with
         this name exist.
@@ -1370,6 +1512,9 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             are used. Default: ``None``
         :param bool finish_progress: If ``True``, progress indicators are
             closed automatically after the plugin finishes.
+        :param bool background: If ``True``, the plugin is run as a
+            background job and the :class:`plugin_job.PluginJob` is
+            returned instead of the result.
         """
         plugins = self.plugin_model.get_plugins_for_name(name)
         if not plugins:
@@ -1390,6 +1535,8 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                     raise SpykeException(
                         'Multiple plugins named "%s" exist!' % name)
 
+        if background:
+            return self.start_plugin_job(plugins[0], current, selections)
         return self._run_plugin(plugins[0], current, selections,
                                 finish_progress)
 
@@ -1409,6 +1556,68 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
         self._execute_remote_plugin(plugin, current, selections)
 
+    def start_plugin_remote_batch(self, plugin, selection_list=None,
+                                  selections=None, max_workers=None):
+        """ Start given plugin (or plugin with given name) once for each
+        entry of a list of selections, using parallel worker processes.
+        Returns a :class:`remote_batch.RemoteBatch`. Raises a
+        SpykeException if not exactly one plugins with this name exist or
+        if worker processes cannot be used (see :meth:`_can_use_worker`).
+        """
+        if not isinstance(plugin, AnalysisPlugin):
+            plugins = self.plugin_model.get_plugins_for_name(plugin)
+            if not plugins:
+                raise SpykeException('No plugin named "%s" exists!' % plugin)
+            if len(plugins) > 1:
+                raise SpykeException(
+                    'Multiple plugins named "%s" exist!' % plugin)
+            plugin = plugins[0]
+
+        if selection_list is None:
+            selection_list = self.selections
+        if selections is None:
+            selections = []
+        if not selection_list:
+            raise SpykeException('No selections for batch execution!')
+        if not self._can_use_worker():
+            raise SpykeException(
+                'Batch execution needs worker processes, which are only '
+                'available with the default remote script and when '
+                'Spyke Viewer is not a frozen application!')
+
+        workers = multiprocessing.cpu_count()
+        if max_workers is not None:
+            workers = min(workers, max_workers)
+        workers = max(1, min(workers, len(selection_list)))
+
+        jobs = [self._worker_job(
+                *self._remote_plugin_info(plugin, s, selections))
+                for s in selection_list]
+        batch = RemoteBatch(self._worker_script(), jobs, workers,
+                            AnalysisPlugin.data_dir, self)
+        batch.pool.output_std.connect(self.output_std)
+        batch.pool.output_err.connect(self.output_err)
+        batch.job_finished.connect(
+            lambda id_, ok: self._batch_job_finished(batch, id_, ok))
+        batch.finished.connect(lambda: self._batch_finished(batch, plugin))
+        return batch
+
+    def _batch_job_finished(self, batch, id_, success):
+        summary = batch.summary()
+        print '[#%d %s] (%d of %d jobs done)' % (
+            id_, 'done' if success else 'failed',
+            len(summary['jobs']) - len(summary['pending']),
+            len(summary['jobs']))
+
+    def _batch_finished(self, batch, plugin):
+        summary = batch.summary()
+        print 'Batch of %d jobs for "%s" done, %d failed.' % (
+            len(summary['jobs']), plugin.get_name(), len(summary['failed']))
+        if summary['files']:
+            print 'Files written to data directory:'
+            for f in summary['files']:
+                print ' ', f
+
     def on_file_available(self, available):
         """ Callback when availability of a file for a plugin changes.
         """
@@ -1508,6 +1717,21 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             event.ignore()
             return
 
+        # Stop background plugin jobs
+        for job in self.plugin_jobs:
+            job.cancel()
+        for job in self.plugin_jobs:
+            job.wait()
+        # Workers keep running until their plugin windows are closed
+        if self.worker_pool is not None:
+            self.worker_pool.shutdown()
+        for batch in self.findChildren(RemoteBatch):
+            batch.pool.shutdown()
+        # Remote plugins also keep running
+        for p in self.remote_processes.values():
+            p.detach()
+        self.remote_processes.clear()
+
         # Ensure that selection folder exists
         if not os.path.exists(self.selection_path):
             try:
@@ -7,7 +7,7 @@ import json
 
 import neo
 
-from PyQt4.QtCore import (Qt, pyqtSignature, QThread)
+from PyQt4.QtCore import (Qt, pyqtSignature, QThread, QTimer)
 from PyQt4.QtGui import (QMessageBox, QApplication,
                          QProgressDialog, QFileDialog)
 try:  # Support for spyder < 3
@@ -17,13 +17,14 @@ except ImportError:
          CollectionsEditor as DictEditor
 
 from spykeutils import SpykeException
-from spykeutils.progress_indicator import ignores_cancel
+from spykeutils.progress_indicator import ignores_cancel, CancelException
 from spykeutils.plugin.data_provider_neo import NeoDataProvider
 from spykeutils.plugin.data_provider_stored import NeoStoredProvider
 from spykeutils.plugin import io_plugin
 
 from .main_window import MainWindow
 from ..plugin_framework.data_provider_viewer import NeoViewerProvider
+from ..plugin_framework import prefetch, eviction, data_lock
 from .neo_navigation import NeoNavigationDock
 from .dir_files_dialog import DirFilesDialog
 from . import io_settings
@@ -39,6 +40,10 @@ class MainWindowNeo(MainWindow):
     def __init__(self, parent=None, splash=None):
         super(MainWindowNeo, self).__init__(parent, splash)
 
+        # Background jobs, load workers and prefetching read data files
+        # in other threads
+        data_lock.install()
+
         self.block_ids = {}
         self.block_names = OrderedDict()  # Just for the display order
         self.block_files = {}
@@ -47,6 +52,14 @@ class MainWindowNeo(MainWindow):
         self.channel_group_names = {}
         self.io_write_params = {}
 
+        # File loading
+        self.load_paths = []
+        self.load_queue = []
+        self.load_workers = {}
+        self.load_results = {}
+        self.load_errors = []
+        self.load_next_index = 0
+
         # Neo navigation
         nav = NeoNavigationDock(self)
         self.neoNavigationDock = nav
@@ -55,6 +68,19 @@ class MainWindowNeo(MainWindow):
         self.neoNavigationDock.setVisible(True)
         self.neoNavigationDock.object_removed.connect(self.refresh_neo_view)
 
+        # Prefetching of selected data in cached lazy mode and unloading
+        # of data in other blocks. Starts when the selection has not
+        # changed for a moment.
+        self.prefetch_worker = None
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(500)
+        self.prefetch_timer.timeout.connect(self._selection_settled)
+        # Blocks ordered from least to most recently selected
+        self.block_usage = OrderedDict()
+        self.neoNavigationDock.selection_changed.connect(
+            self._schedule_prefetch)
+
         # Initialize filters
         self.filter_populate_function = \
             {'Block': nav.populate_neo_block_list,
@@ -173,33 +199,203 @@ class MainWindowNeo(MainWindow):
         return self.neoNavigationDock.get_letter_id(id_, small)
 
     class LoadWorker(QThread):
-        def __init__(self, paths):
+        def __init__(self, path, index):
             QThread.__init__(self)
-            self.paths = paths
+            self.path = path
+            self.index = index
             self.blocks = []
             self.error = None
 
         def run(self):
             try:
-                self.blocks = NeoDataProvider.get_blocks(self.paths[0])
+                # get_blocks holds the data lock (see data_lock.install)
+                self.blocks = NeoDataProvider.get_blocks(self.path)
             except Exception as e:
                 self.error = e
                 raise
 
+    class PrefetchWorker(QThread):
+        def __init__(self, provider, objects, budget):
+            QThread.__init__(self)
+            self.provider = provider
+            self.objects = objects
+            self.budget = budget
+            self.cancelled = False
+
+        def cancel(self):
+            self.cancelled = True
+
+        def run(self):
+            try:
+                prefetch.prefetch(self.provider, self.objects, self.budget,
+                                  lambda: self.cancelled)
+            except Exception:
+                logger.exception('Error while prefetching data')
+
+    def _schedule_prefetch(self):
+        """ Cancel prefetching for the previous selection and start it for
+        the current selection after a short delay. Data of blocks that
+        are not selected is unloaded before if needed.
+        """
+        self._stop_prefetch()
+        for b in self.neo_blocks():
+            self.block_usage.pop(b, None)
+            self.block_usage[b] = True
+        if api.config.loaded_data_size > 0 or \
+                (NeoDataProvider.data_lazy_mode == 2 and
+                 api.config.prefetch_size > 0):
+            self.prefetch_timer.start()
+
+    def _selection_settled(self):
+        self._evict_data()
+        self._start_prefetch()
+
+    def _evict_data(self):
+        """ Unload signals and spike trains from the least recently
+        selected blocks until the loaded data is smaller than
+        ``api.config.loaded_data_size`` megabytes. Unloaded objects are
+        read again from their file when they are used.
+        """
+        if api.config.loaded_data_size <= 0:
+            return
+        # Background jobs might use the data
+        if [j for j in self.plugin_jobs if not j.done()]:
+            return
+
+        for b in self.block_usage.keys():
+            if b not in self.block_names:  # Removed block
+                del self.block_usage[b]
+
+        self._stop_prefetch(True)
+        with data_lock.data_lock:
+            eviction.evict(self.block_usage.keys(), set(self.neo_blocks()),
+                           api.config.loaded_data_size * 1024 * 1024)
+
+    def _start_prefetch(self):
+        """ Start loading the lazily loaded signals and spike trains of
+        the current selection in a background thread, up to
+        ``api.config.prefetch_size`` megabytes.
+        """
+        if NeoDataProvider.data_lazy_mode != 2 or \
+                api.config.prefetch_size <= 0:
+            return
+        # Background jobs might read from the same files
+        if [j for j in self.plugin_jobs if not j.done()]:
+            return
+
+        self._stop_prefetch(True)
+        with data_lock.data_lock:
+            objects = prefetch.lazy_objects(
+                self.neo_segments(), self.neo_channel_groups(),
+                self.neo_channels(), self.neo_units())
+        if not objects:
+            return
+        self.prefetch_worker = self.PrefetchWorker(
+            self.provider, objects, api.config.prefetch_size * 1024 * 1024)
+        self.prefetch_worker.start()
+
+    def _stop_prefetch(self, wait=False):
+        """ Cancel prefetching. If ``wait`` is ``True``, return only after
+        the object that is currently loaded is finished.
+        """
+        self.prefetch_timer.stop()
+        if self.prefetch_worker is None:
+            return
+        self.prefetch_worker.cancel()
+        if wait:
+            self.prefetch_worker.wait()
+            self.prefetch_worker = None
+
+    def _run_plugin(self, plugin, current=None, selections=None,
+                    finish_progress=True):
+        # Plugins read data in the GUI thread, so prefetching is
+        # paused until the plugin is finished
+        self._stop_prefetch(True)
+        try:
+            return super(MainWindowNeo, self)._run_plugin(
+                plugin, current, selections, finish_progress)
+        finally:
+            self._schedule_prefetch()
+
+    def _console_executing(self):
+        # Console commands can use the data, prefetching starts again
+        # when the selection changes
+        self._stop_prefetch(True)
+
+    def start_plugin_job(self, plugin, current=None, selections=None):
+        self._stop_prefetch(True)
+        return super(MainWindowNeo, self).start_plugin_job(
+            plugin, current, selections)
+
+    def _plugin_job_finished(self, job):
+        super(MainWindowNeo, self)._plugin_job_finished(job)
+        self._schedule_prefetch()
+
     def load_files(self, file_paths):
+        """ Load a list of files. Up to ``api.config.load_workers`` files
+        are loaded in background threads, the resulting blocks are added
+        in the order of ``file_paths``. Files are read while holding
+        :data:`data_lock.data_lock`.
+        """
+        if not file_paths:
+            return
+
+        if self.load_paths:  # Loading is in progress, just extend queue
+            start = len(self.load_paths)
+            self.load_paths.extend(file_paths)
+            self.load_queue.extend(
+                range(start, start + len(file_paths)))
+            self.progress.set_ticks(len(self.load_paths))
+            self.load_progress.setMaximum(len(self.load_paths))
+            self._start_load_workers()
+            return
+
         self.progress.begin('Loading data files...')
         self.progress.set_ticks(len(file_paths))
 
-        self.load_worker = self.LoadWorker(file_paths)
+        self.load_paths = list(file_paths)
+        self.load_queue = range(len(file_paths))
+        self.load_results = {}
+        self.load_errors = []
+        self.load_next_index = 0
+
         self.load_progress = QProgressDialog(self.progress)
-        self.load_progress.setWindowTitle('Loading File')
-        self.load_progress.setLabelText(file_paths[0])
-        self.load_progress.setMaximum(0)
+        self.load_progress.setWindowTitle('Loading Files')
+        self.load_progress.setMaximum(len(file_paths))
+        self.load_progress.setValue(0)
         self.load_progress.setCancelButton(None)
-        self.load_worker.finished.connect(self.load_file_callback)
-        self.load_worker.terminated.connect(self.load_file_callback)
         self.load_progress.show()
-        self.load_worker.start()
+        self._start_load_workers()
+
+    def _start_load_workers(self):
+        """ Start load worker threads for queued files until the maximum
+        number of parallel workers is reached.
+        """
+        max_workers = max(1, api.config.load_workers)
+        while self.load_queue and len(self.load_workers) < max_workers:
+            index = self.load_queue.pop(0)
+            worker = self.LoadWorker(self.load_paths[index], index)
+            worker.finished.connect(
+                lambda w=worker: self.load_file_callback(w))
+            worker.terminated.connect(
+                lambda w=worker: self.load_file_callback(w))
+            self.load_workers[index] = worker
+            worker.start()
+        self._update_load_progress()
+
+    def _update_load_progress(self):
+        """ Show the status of each file that is currently loading.
+        """
+        lines = ['Loaded %d of %d files' %
+                 (self.load_next_index, len(self.load_paths))]
+        for index in sorted(self.load_workers.keys()):
+            lines.append('Loading: %s' % os.path.basename(
+                self.load_paths[index]))
+        for index in sorted(self.load_results.keys()):
+            lines.append('Waiting: %s' % os.path.basename(
+                self.load_paths[index]))
+        self.load_progress.setLabelText('\n'.join(lines))
+        self.load_progress.setValue(self.load_next_index)
 
     def edit_annotations(self, data):
         """ Edit annotations of a Neo object.
@@ -219,72 +415,78 @@ class MainWindowNeo(MainWindow):
         data.annotations = editor.get_value()
 
     @ignores_cancel
-    def load_file_callback(self):
-        if not self.load_worker:
-            self.progress.done()
+    def load_file_callback(self, worker):
+        if self.load_workers.pop(worker.index, None) is None:
+            return  # Finished and terminated signals for the same worker
+
+        # Blocks are added in the order of the file list, so results of
+        # workers that finish early wait for their predecessors
+        self.load_results[worker.index] = worker
+        while self.load_next_index in self.load_results:
+            self._add_loaded_blocks(
+                self.load_results.pop(self.load_next_index))
+            self.load_next_index += 1
+            try:
+                self.progress.step()
+            except CancelException:
+                del self.load_queue[:]
+
+        if self.load_queue:
+            self._start_load_workers()
+            return
+        if self.load_workers:
+            self._update_load_progress()
             return
 
-        # Load worker thread finished
-        blocks = self.load_worker.blocks
-        if blocks is None:
+        # All files loaded
+        self.load_progress.reset()
+        self.progress.done()
+        del self.load_paths[:]
+
+        if self.load_errors:
             QMessageBox.critical(
                 self, 'File could not be loaded',
-                'Could not read "%s": No suitable IO found.' %
-                self.load_worker.paths[0])
-            logger.error('Could not read "%s": No suitable IO found.' %
-                         self.load_worker.paths[0])
-            self.progress.done()
-            self.load_progress.reset()
+                '\n\n'.join(self.load_errors) +
+                '\n\nSee the console for more details.')
             self.raise_()
-            return
 
-        if self.load_worker.error:
-            QMessageBox.critical(
-                self, 'File could not be loaded',
+        if not self.was_empty:
+            self.refresh_neo_view()
+        else:
+            self.neoNavigationDock.populate_neo_block_list()
+            self.was_empty = False
+
+    def _add_loaded_blocks(self, worker):
+        """ Add the blocks from a finished load worker to the loaded
+        blocks or record the error that occured.
+        """
+        path = worker.path
+        if worker.error:
+            self.load_errors.append(
                 'While loading "%s", the following error occured:'
-                '\n\n%s\n%s\n\nSee the console for more details.' % (
-                    self.load_worker.paths[0],
-                    type(self.load_worker.error).__name__,
-                    str(self.load_worker.error)))
-            self.progress.done()
-            self.load_progress.reset()
-            self.raise_()
+                '\n%s\n%s' % (path, type(worker.error).__name__,
+                               str(worker.error)))
+            return
+
+        blocks = worker.blocks
+        if blocks is None:
+            self.load_errors.append(
+                'Could not read "%s": No suitable IO found.' % path)
+            logger.error('Could not read "%s": No suitable IO found.' %
+                         path)
             return
 
         for block in blocks:
             name = block.name
             if not name or name == 'One segment only':
-                name = os.path.splitext(os.path.basename(
-                    self.load_worker.paths[0]))[0]
+                name = os.path.splitext(os.path.basename(path))[0]
             name += ' (%s)' % self.get_letter_id(self.block_index)
 
             self.block_names[block] = name
             self.block_ids[block] = self.get_letter_id(self.block_index)
-            self.block_files[block] = self.load_worker.paths[0]
+            self.block_files[block] = path
             self.block_index += 1
 
-        self.load_progress.reset()
-        self.progress.step()
-
-        # Create new load worker thread
-        paths = self.load_worker.paths[1:]
-        if not paths:
-            self.progress.done()
-            if not self.was_empty:
-                self.refresh_neo_view()
-            else:
-                self.neoNavigationDock.populate_neo_block_list()
-                self.was_empty = False
-            self.load_worker = None
-            return
-
-        self.load_worker = self.LoadWorker(paths)
-        self.load_progress.setLabelText(paths[0])
-        self.load_progress.show()
-        self.load_worker.finished.connect(self.load_file_callback)
-        self.load_worker.terminated.connect(self.load_file_callback)
-        self.load_worker.start()
-
     @ignores_cancel
     def on_loadFilesButton_pressed(self):
         if not self.block_index:
@@ -330,15 +532,26 @@ class MainWindowNeo(MainWindow):
                 'Do you really want to unload all data?',
                 QMessageBox.Yes | QMessageBox.No) == QMessageBox.No:
             return
+        self._stop_prefetch(True)
         NeoDataProvider.clear()
         self.neoNavigationDock.clear()
         self.block_ids.clear()
+        self.block_usage.clear()
         self.block_files.clear()
         self.block_names.clear()
         self.block_index = 0
 
         self.neoNavigationDock.populate_neo_block_list()
 
+    def job_provider(self, provider):
+        """ Return a function that creates a copy of a data provider for
+        use in a background job, given a progress indicator. The copy
+        uses the data of the provider at the time this method is called,
+        so later changes of the selection in the GUI have no effect.
+        """
+        data = copy.deepcopy(provider.data_dict())
+        return lambda progress: NeoStoredProvider(data, progress)
+
     def add_neo_selection(self, data):
         """ Adds a new neo selection provider with the given data
         """
@@ -433,6 +646,7 @@ class MainWindowNeo(MainWindow):
                                 'No data to save found!')
             self.progress.done()
             return
+        self._stop_prefetch(True)
         self.progress.set_ticks(0)
         self.progress.setWindowTitle('Writing data...')
         self.progress.set_status('')
@@ -512,14 +726,17 @@ class MainWindowNeo(MainWindow):
     @pyqtSignature("")
     def on_actionFull_Load_triggered(self):
         NeoDataProvider.data_lazy_mode = 0
+        self._stop_prefetch()
 
     @pyqtSignature("")
     def on_actionLazy_Load_triggered(self):
         NeoDataProvider.data_lazy_mode = 1
+        self._stop_prefetch()
 
     @pyqtSignature("")
     def on_actionCached_Lazy_Load_triggered(self):
         NeoDataProvider.data_lazy_mode = 2
+        self._schedule_prefetch()
 
     @pyqtSignature("")
     def on_actionFull_triggered(self):
@@ -551,19 +768,28 @@ class MainWindowNeo(MainWindow):
             self.io_write_params[io] = d.get_write_params()
 
     def _execute_remote_plugin(self, plugin, current=None, selections=None):
+        self.send_plugin_info(
+            *self._remote_plugin_info(plugin, current, selections))
+
+    def _remote_plugin_info(self, plugin, current=None, selections=None):
+        """ Return the information needed to start a plugin remotely as a
+        tuple of arguments for :meth:`send_plugin_info`.
+        """
         sl = list()
 
         if current is None:
             sl.append(self.provider_factory('__current__', self).data_dict())
         else:
-            d = copy.copy(current.data_dict())
+            # Stored selections return their internal dictionary, which
+            # must not be changed by the path transformation below
+            d = copy.deepcopy(current.data_dict())
             d['name'] = '__current__'
             sl.append(d)
         if selections is None:
             selections = self.selections
 
         for s in selections:
-            sl.append(s.data_dict())
+            sl.append(copy.deepcopy(s.data_dict()))
 
         io_plugin_files = []
         transform_path = getattr(api.config, 'remote_path_transform',
@@ -585,9 +811,10 @@ class MainWindowNeo(MainWindow):
         config = pickle.dumps(plugin.get_parameters())
         name = type(plugin).__name__
         path = plugin.source_file
-        self.send_plugin_info(name, path, selections, config, io_plugin_files)
+        return name, path, selections, config, io_plugin_files
 
     def closeEvent(self, event):
         super(MainWindowNeo, self).closeEvent(event)
 
+        self._stop_prefetch(True)
         NeoDataProvider.clear()
@@ -0,0 +1,100 @@
+from PyQt4.QtCore import Qt, QAbstractListModel, QModelIndex
+
+
+#noinspection PyMethodOverriding
+class NeoListModel(QAbstractListModel):
+    """ A Qt list model for Neo objects, e.g. for use in a QListView.
+    Instead of creating an item for every entry, the model keeps the
+    displayed objects and their parent objects in lists. Display names
+    are only created when the view requests them. Data slots:
+    Qt.DisplayRole: The display name, created by ``name_function``
+    Qt.UserRole: The Neo object
+    Qt.UserRole+1: The value of ``index_function`` for the object (only
+    if ``index_function`` is given)
+    """
+    def __init__(self, name_function, index_function=None, parent=None):
+        """ Create a new list model.
+
+        :param function name_function: Returns the display name given
+            the row, the object and its parent object.
+        :param function index_function: Returns the data for
+            ``Qt.UserRole + 1`` given an object. Default: ``None``
+        """
+        QAbstractListModel.__init__(self, parent)
+        self.name_function = name_function
+        self.index_function = index_function
+        self.objects = []
+        self.parents = []
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.objects)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.objects):
+            return None
+
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return self.name_function(row, self.objects[row],
+                                      self.parents[row])
+        if role == Qt.UserRole:
+            return self.objects[row]
+        if role == Qt.UserRole + 1 and self.index_function:
+            return self.index_function(self.objects[row])
+
+        return None
+
+    def clear(self):
+        """ Remove all entries.
+        """
+        self.set_objects([], [])
+
+    def set_objects(self, objects, parents):
+        """ Replace all entries.
+
+        :param list objects: The objects to display.
+        :param list parents: The parent object for each entry of
+            ``objects``.
+        """
+        self.beginResetModel()
+        self.objects = list(objects)
+        self.parents = list(parents)
+        self.endResetModel()
+
+    def insert_objects(self, row, objects, parents):
+        """ Insert entries before the given row.
+
+        :param int row: The position of the first new entry.
+        :param list objects: The objects to insert.
+        :param list parents: The parent object for each entry of
+            ``objects``.
+        """
+        if not objects:
+            return
+        self.beginInsertRows(QModelIndex(), row, row + len(objects) - 1)
+        self.objects[row:row] = objects
+        self.parents[row:row] = parents
+        self.endInsertRows()
+
+    def remove_objects(self, row, count):
+        """ Remove entries.
+
+        :param int row: The position of the first entry to remove.
+        :param int count: The number of entries to remove.
+        """
+        if count < 1:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+        del self.objects[row:row + count]
+        del self.parents[row:row + count]
+        self.endRemoveRows()
+
+    def names_changed(self, first_row=0):
+        """ Notify views that the display names starting from the given
+        row have changed.
+        """
+        if first_row < len(self.objects):
+            self.dataChanged.emit(self.index(first_row),
+                                  self.index(len(self.objects) - 1))
@@ -1,6 +1,7 @@
+from collections import OrderedDict
+
 from PyQt4.QtGui import (QDockWidget, QMenu, QAction, QMessageBox,
                          QItemSelectionRange, QItemSelection,
-                         QStandardItemModel, QStandardItem,
                          QItemSelectionModel)
 from PyQt4.QtCore import Qt, pyqtSignal
 from spyderlib.utils.qthelpers import get_icon
@@ -10,6 +11,7 @@ from spykeutils.plugin.data_provider_neo import NeoDataProvider
 import spykeutils.tools
 
 from neo_navigation_ui import Ui_neoNavigationDock
+from neo_list_model import NeoListModel
 from .. import api
 
 
@@ -20,6 +22,7 @@ class NeoNavigationDock(QDockWidget, Ui_neoNavigationDock):
     """
 
     object_removed = pyqtSignal()  # Signal to remove an object
+    selection_changed = pyqtSignal()  # Signal that selected objects changed
 
     def __init__(self, parent):
         QDockWidget.__init__(self, parent)
@@ -27,11 +30,12 @@ class NeoNavigationDock(QDockWidget, Ui_neoNavigationDock):
 
         self.setupUi(self)
 
-        self.block_model = QStandardItemModel()
-        self.segment_model = QStandardItemModel()
-        self.channelgroup_model = QStandardItemModel()
-        self.channel_model = QStandardItemModel()
-        self.unit_model = QStandardItemModel()
+        self.block_model = NeoListModel(self._block_name)
+        self.segment_model = NeoListModel(self._segment_name)
+        self.channelgroup_model = NeoListModel(self._channel_group_name)
+        self.channel_model = NeoListModel(self._channel_name,
+                                          lambda rc: rc.index)
+        self.unit_model = NeoListModel(self._unit_name)
 
         self.neoBlockList.setModel(self.block_model)
         self.neoSegmentList.setModel(self.segment_model)
@@ -61,11 +65,16 @@ class NeoNavigationDock(QDockWidget, Ui_neoNavigationDock):
         self.neoSegmentList.selectionModel().selectionChanged.connect(
             self.selected_segments_changed)
 
+        # Incremental list updates: Parent objects with their children
+        # and number of displayed rows for each list model
+        self.list_groups = {}
+
     def clear(self):
         """ Clear all lists
         """
         self.neoBlockList.clearSelection()
         self.block_model.clear()
+        self.list_groups.clear()
 
     def get_letter_id(self, id_, small=False):
         """ Return a name consisting of letters given an integer
@@ -138,153 +147,273 @@ class NeoNavigationDock(QDockWidget, Ui_neoNavigationDock):
         """ Fill the block list with appropriate entries.
         Qt.UserRole: The :class:`neo.Block` object
         """
-        self.block_model.clear()
-
         filters = self.parent.get_active_filters('Block')
 
         blocks = self.filter_ordered(
             self.parent.block_names.keys(), filters)
-        for b in blocks:
-            item = QStandardItem(self.parent.block_names[b])
-            item.setData(b, Qt.UserRole)
-            self.block_model.appendRow(item)
+        self.block_model.set_objects(blocks, [None] * len(blocks))
 
         self.neoBlockList.setCurrentIndex(self.block_model.index(0, 0))
         self.set_blocks_label()
         if not blocks:
             self.selected_blocks_changed()
 
+    def _fill_list(self, view, model, groups, filter_type, autoselect,
+                   select_first=True):
+        """ Fill a list model from scratch.
+
+        :param view: The list view that displays the model.
+        :param model: The :class:`neo_list_model.NeoListModel` to fill.
+        :param OrderedDict groups: The objects to display, grouped by
+            their parent objects.
+        :param str filter_type: The type of filters to apply.
+        :param bool autoselect: Select all entries after filling the list.
+        :param bool select_first: Make the first entry current (and
+            thereby selected) after filling the list.
+        """
+        view.clearSelection()
+
+        filters = self.parent.get_active_filters(filter_type)
+        parents = []
+        if any(f[0].combined for f in filters):
+            # Combined filters can only be applied to the whole list, so
+            # no incremental updates are possible
+            objects = []
+            parent_of = {}
+            for p, children in groups.iteritems():
+                objects.extend(children)
+                for c in children:
+                    parent_of.setdefault(c, p)
+            objects = self.filter_ordered(objects, filters)
+            parents = [parent_of[o] for o in objects]
+            self.list_groups[model] = None
+        else:
+            state = OrderedDict()
+            objects = []
+            for p, children in groups.iteritems():
+                visible = self.filter_ordered(children, filters)
+                objects.extend(visible)
+                parents.extend([p] * len(visible))
+                state[p] = (list(children), len(visible))
+            self.list_groups[model] = state
+
+        model.set_objects(objects, parents)
+        if model is self.channelgroup_model:
+            self._set_channel_group_names()
+
+        if select_first:
+            view.setCurrentIndex(model.index(0, 0))
+        if autoselect:
+            view.selectAll()
+
+    def _update_list(self, view, model, groups, filter_type, autoselect,
+                     select_first=True):
+        """ Update a list model incrementally. Rows are only removed for
+        parent objects that are no longer in ``groups`` and only inserted
+        for parent objects that are new, so the selection of all other
+        rows is kept. If this is not possible (e.g. because of combined
+        filters), the list is filled from scratch. The parameters are
+        the same as for :meth:`_fill_list`.
+        """
+        state = self.list_groups.get(model)
+        filters = self.parent.get_active_filters(filter_type)
+        if state is None or any(f[0].combined for f in filters):
+            self._fill_list(view, model, groups, filter_type, autoselect,
+                            select_first)
+            return
+
+        kept = set(p for p in state if p in groups and
+                   groups[p] == state[p][0])
+        if [p for p in state if p in kept] != \
+                [p for p in groups if p in kept]:
+            # Order of remaining parents changed
+            self._fill_list(view, model, groups, filter_type, autoselect,
+                            select_first)
+            return
+
+        had_rows = bool(model.objects)
+
+        # Remove rows of parents that are gone or have changed children
+        row = 0
+        for p, (children, count) in state.items():
+            if p in kept:
+                row += count
+                continue
+            model.remove_objects(row, count)
+            del state[p]
+
+        # Insert rows for new parents
+        new_state = OrderedDict()
+        inserted = QItemSelection()
+        row = 0
+        for p, children in groups.iteritems():
+            if p in state:
+                new_state[p] = state[p]
+                row += state[p][1]
+                continue
+
+            visible = self.filter_ordered(children, filters)
+            model.insert_objects(row, visible, [p] * len(visible))
+            if visible:
+                inserted.append(QItemSelectionRange(
+                    model.index(row), model.index(row + len(visible) - 1)))
+            new_state[p] = (list(children), len(visible))
+            row += len(visible)
+        self.list_groups[model] = new_state
+
+        # Names contain the row and the channel group name, so they can
+        # change even if the list does not
+        if model is self.channelgroup_model:
+            self._set_channel_group_names()
+        model.names_changed()
+
+        if autoselect and not inserted.isEmpty():
+            view.selectionModel().select(
+                inserted, QItemSelectionModel.Select)
+        elif select_first and model.objects and (
+                not had_rows or not view.selectedIndexes()):
+            view.setCurrentIndex(model.index(0))
+
+    def _set_channel_group_names(self):
+        """ Create the short names of all displayed channel groups. They
+        are used in the names of channels and units.
+        """
+        names = self.parent.channel_group_names
+        names.clear()
+        model = self.channelgroup_model
+        for row, rcg in enumerate(model.objects):
+            names[rcg] = self._channel_group_identifier(
+                row, model.parents[row])
+
+    def _channel_group_identifier(self, row, block):
+        return '%s-%s' % (self.parent.block_ids[block],
+                          self.get_letter_id(row, True))
+
+    def _block_name(self, row, block, parent):
+        return self.parent.block_names[block]
+
+    def _segment_name(self, row, segment, block):
+        identifier = '%s-%i' % (self.parent.block_ids[block], row)
+        if segment.name:
+            return segment.name + ' (%s)' % identifier
+        return identifier
+
+    def _channel_group_name(self, row, rcg, block):
+        identifier = self._channel_group_identifier(row, block)
+        if rcg.name:
+            return rcg.name + ' (%s)' % identifier
+        return identifier
+
+    def _channel_name(self, row, rc, rcg):
+        identifier = '%s.%d' % (self.parent.channel_group_names[rcg],
+                                rc.index)
+        if rc.name:
+            return rc.name + ' (%s)' % identifier
+        return identifier
+
+    def _unit_name(self, row, unit, rcg):
+        identifier = '%s-%d' % (self.parent.channel_group_names[rcg], row)
+        if unit.name:
+            return unit.name + ' (%s)' % identifier
+        return identifier
+
+    def _segment_groups(self):
+        return OrderedDict((b, b.segments) for b in self.blocks())
+
+    def _channel_group_groups(self):
+        return OrderedDict((b, b.recordingchannelgroups)
+                           for b in self.blocks())
+
+    def _channel_groups(self):
+        groups = OrderedDict()
+        channels = set()
+        for rcg in self.recording_channel_groups():
+            rcs = []
+            for rc in rcg.recordingchannels:
+                if not api.config.duplicate_channels and rc in channels:
+                    continue
+                channels.add(rc)
+                rcs.append(rc)
+            groups[rcg] = rcs
+        return groups
+
+    def _unit_groups(self):
+        return OrderedDict((rcg, rcg.units)
+                           for rcg in self.recording_channel_groups())
+
     def populate_neo_segment_list(self):
         """ Fill the segment list with appropriate entries.
         Qt.UserRole: The :class:`neo.Segment` object
         """
-        self.segment_model.clear()
-
-        segments = []
-        for b in self.blocks():
-            segments.extend(b.segments)
-
-        filters = self.parent.get_active_filters('Segment')
-        segments = self.filter_ordered(segments, filters)
-        for i, s in enumerate(segments):
-            if s.name:
-                name = s.name + ' (%s-%i)' % \
-                    (self.parent.block_ids[s.block], i)
-            else:
-                name = '%s-%i' % (self.parent.block_ids[s.block], i)
-
-            new_item = QStandardItem(name)
-            new_item.setData(s, Qt.UserRole)
-            self.segment_model.appendRow(new_item)
+        self._fill_list(self.neoSegmentList, self.segment_model,
+                        self._segment_groups(), 'Segment',
+                        api.config.autoselect_segments)
+        self.selected_segments_changed()
 
-        self.neoSegmentList.setCurrentIndex(self.segment_model.index(0, 0))
-        if api.config.autoselect_segments:
-            self.neoSegmentList.selectAll()
+    def update_neo_segment_list(self):
+        """ Update the segment list after the block selection changed.
+        """
+        self._update_list(self.neoSegmentList, self.segment_model,
+                          self._segment_groups(), 'Segment',
+                          api.config.autoselect_segments)
         self.selected_segments_changed()
 
     def populate_neo_channel_group_list(self):
         """ Fill the channel group list with appropriate entries.
         Qt.UserRole: The :class:`neo.RecordingChannelGroup` object
         """
-        self.neoChannelGroupList.clearSelection()
-        self.channelgroup_model.clear()
         self.parent.channel_group_names.clear()
-
-        rcgs = []
-        for b in self.blocks():
-            rcgs.extend(b.recordingchannelgroups)
-
-        filters = self.parent.get_active_filters(
-            'Recording Channel Group')
-        rcgs = self.filter_ordered(rcgs, filters)
-
-        for i, rcg in enumerate(rcgs):
-            self.parent.channel_group_names[rcg] = '%s-%s' % (
-                self.parent.block_ids[rcg.block],
-                self.get_letter_id(i, True))
-            if rcg.name:
-                name = rcg.name + ' (%s)' % \
-                                  self.parent.channel_group_names[rcg]
-            else:
-                name = self.parent.channel_group_names[rcg]
-            new_item = QStandardItem(name)
-            new_item.setData(rcg, Qt.UserRole)
-            self.channelgroup_model.appendRow(new_item)
-
-        self.neoChannelGroupList.setCurrentIndex(
-            self.channelgroup_model.index(0, 0))
-        if api.config.autoselect_channel_groups:
-            self.neoChannelGroupList.selectAll()
-        elif not rcgs:
-            self.selected_channel_groups_changed()
+        self._fill_list(self.neoChannelGroupList, self.channelgroup_model,
+                        self._channel_group_groups(),
+                        'Recording Channel Group',
+                        api.config.autoselect_channel_groups)
+        self.selected_channel_groups_changed()
+
+    def update_neo_channel_group_list(self):
+        """ Update the channel group list after the block selection
+        changed.
+        """
+        self._update_list(self.neoChannelGroupList, self.channelgroup_model,
+                          self._channel_group_groups(),
+                          'Recording Channel Group',
+                          api.config.autoselect_channel_groups)
+        self.selected_channel_groups_changed()
 
     def populate_neo_channel_list(self):
         """ Fill the channel list with appropriate entries. Data slots:
         Qt.UserRole: The :class:`neo.RecordingChannel`
         Qt.UserRole+1: The channel index
         """
-        self.channel_model.clear()
-        channels = set()
-
-        rcs = []
-        rc_group_name = {}
-        for rcg in self.recording_channel_groups():
-            for rc in rcg.recordingchannels:
-                if not api.config.duplicate_channels and rc in channels:
-                    continue
-                channels.add(rc)
-                rcs.append(rc)
-                rc_group_name[rc] = self.parent.channel_group_names[rcg]
-
-        filters = self.parent.get_active_filters(
-            'Recording Channel')
-        rcs = self.filter_ordered(rcs, filters)
-
-        for rc in rcs:
-            identifier = '%s.%d' % \
-                         (rc_group_name[rc],
-                          rc.index)
-            if rc.name:
-                name = rc.name + ' (%s)' % identifier
-            else:
-                name = identifier
-
-            new_item = QStandardItem(name)
-            new_item.setData(rc, Qt.UserRole)
-            new_item.setData(rc.index, Qt.UserRole + 1)
-            self.channel_model.appendRow(new_item)
+        self._fill_list(self.neoChannelList, self.channel_model,
+                        self._channel_groups(), 'Recording Channel',
+                        api.config.autoselect_channels, False)
+        self.selected_channels_changed()
 
-        if api.config.autoselect_channels:
-            self.neoChannelList.selectAll()
+    def update_neo_channel_list(self):
+        """ Update the channel list after the channel group selection
+        changed.
+        """
+        self._update_list(self.neoChannelList, self.channel_model,
+                          self._channel_groups(), 'Recording Channel',
+                          api.config.autoselect_channels, False)
         self.selected_channels_changed()
 
     def populate_neo_unit_list(self):
         """ Fill the unit list with appropriate entries.
         Qt.UserRole: The :class:`neo.Unit` object
         """
-        self.unit_model.clear()
-
-        units = []
-        for rcg in self.recording_channel_groups():
-            units.extend(rcg.units)
-
-        filters = self.parent.get_active_filters('Unit')
-        units = self.filter_ordered(units, filters)
-
-        for i, u in enumerate(units):
-            if self.parent.is_filtered(u, filters):
-                continue
-            if u.name:
-                name = u.name + ' (%s-%d)' % \
-                       (self.parent.channel_group_names[rcg], i)
-            else:
-                name = '%s-%d' % (self.parent.channel_group_names[rcg], i)
-            new_item = QStandardItem(name)
-            new_item.setData(u, Qt.UserRole)
-            self.unit_model.appendRow(new_item)
+        self._fill_list(self.neoUnitList, self.unit_model,
+                        self._unit_groups(), 'Unit',
+                        api.config.autoselect_units, False)
+        self.selected_units_changed()
 
-        if api.config.autoselect_units:
-            self.neoUnitList.selectAll()
+    def update_neo_unit_list(self):
+        """ Update the unit list after the channel group selection
+        changed.
+        """
+        self._update_list(self.neoUnitList, self.unit_model,
+                          self._unit_groups(), 'Unit',
+                          api.config.autoselect_units, False)
         self.selected_units_changed()
 
     def set_blocks_label(self):
@@ -300,31 +429,36 @@ class NeoNavigationDock(QDockWidget, Ui_neoNavigationDock):
 
     def selected_blocks_changed(self):
         self.set_blocks_label()
-        self.populate_neo_channel_group_list()
-        self.populate_neo_segment_list()
+        self.update_neo_channel_group_list()
+        self.update_neo_segment_list()
+        self.selection_changed.emit()
 
     def selected_channel_groups_changed(self):
         self.set_channel_groups_label()
-        self.populate_neo_channel_list()
-        self.populate_neo_unit_list()
+        self.update_neo_channel_list()
+        self.update_neo_unit_list()
+        self.selection_changed.emit()
 
     def selected_channels_changed(self):
         self.channelsLabel.setText(
             'Channels (%d/%d):' % (
                 len(self.neoChannelList.selectedIndexes()),
                 self.channel_model.rowCount()))
+        self.selection_changed.emit()
 
     def selected_units_changed(self):
         self.unitsLabel.setText(
             'Units (%d/%d):' % (
                 len(self.neoUnitList.selectedIndexes()),
                 self.unit_model.rowCount()))
+        self.selection_changed.emit()
 
     def selected_segments_changed(self):
         self.segmentsLabel.setText(
             'Segments (%d/%d):' % (
                 len(self.neoSegmentList.selectedIndexes()),
                 self.segment_model.rowCount()))
+        self.selection_changed.emit()
 
     def _edit_item_annotations(self, index, model):
         api.annotation_editor(model.data(index, Qt.UserRole))
@@ -447,6 +581,32 @@ class NeoNavigationDock(QDockWidget, Ui_neoNavigationDock):
         return [self.unit_model.data(i, Qt.UserRole) for i in
                 self.neoUnitList.selectedIndexes()]
 
+    def _select_rows(self, view, rows):
+        """ Select the given sorted rows in a list view, replacing the
+        previous selection. Consecutive rows are selected as one range.
+        """
+        model = view.model()
+        selection = QItemSelection()
+        start = None
+        for i, row in enumerate(rows):
+            if start is None:
+                start = row
+            if i + 1 == len(rows) or rows[i + 1] != row + 1:
+                selection.append(QItemSelectionRange(
+                    model.index(start), model.index(row)))
+                start = None
+        view.selectionModel().select(
+            selection, QItemSelectionModel.ClearAndSelect)
+
+    def _select_objects(self, view, objects):
+        """ Select all entries of a list view that display one of the given
+        objects, replacing the previous selection.
+        """
+        wanted = set(objects)
+        self._select_rows(
+            view, [row for row, o in enumerate(view.model().objects)
+                   if o in wanted])
+
     def set_selection(self, data):
         """ Set the selected data.
         """
@@ -470,18 +630,12 @@ class NeoNavigationDock(QDockWidget, Ui_neoNavigationDock):
         self.ensure_not_filtered(block_list, self.parent.block_names.keys(),
                                  self.parent.get_active_filters('Block'))
         self.populate_neo_block_list()
-        selection = QItemSelection()
-        for i in self.block_model.findItems(
-                '*', Qt.MatchWrap | Qt.MatchWildcard):
-            block = i.data(Qt.UserRole)
-            t = (NeoDataProvider.block_indices[block],
-                 self.parent.block_files[block])
-
-            if t in block_set:
-                selection.append(QItemSelectionRange(
-                    self.block_model.indexFromItem(i)))
-        self.neoBlockList.selectionModel().select(
-            selection, QItemSelectionModel.ClearAndSelect)
+        block_indices = NeoDataProvider.block_indices
+        block_files = self.parent.block_files
+        self._select_rows(
+            self.neoBlockList,
+            [row for row, block in enumerate(self.block_model.objects)
+             if (block_indices[block], block_files[block]) in block_set])
 
         # Select segments
         seg_list = [block_list[idx[1]].segments[idx[0]]
@@ -492,21 +646,7 @@ class NeoNavigationDock(QDockWidget, Ui_neoNavigationDock):
         self.ensure_not_filtered(seg_list, all_segs,
                                  self.parent.get_active_filters('Segment'))
         self.populate_neo_segment_list()
-
-        selection = QItemSelection()
-        for i in self.segment_model.findItems(
-                '*', Qt.MatchWrap | Qt.MatchWildcard):
-            segment = i.data(Qt.UserRole)
-            if not segment.block in block_list:
-                continue
-
-            seg_idx = segment.block.segments.index(segment)
-            block_idx = block_list.index(segment.block)
-            if [seg_idx, block_idx] in data['segments']:
-                selection.append(QItemSelectionRange(
-                    self.segment_model.indexFromItem(i)))
-        self.neoSegmentList.selectionModel().select(
-            selection, QItemSelectionModel.ClearAndSelect)
+        self._select_objects(self.neoSegmentList, seg_list)
 
         # Select recording channel groups
         rcg_list = [block_list[rcg[1]].recordingchannelgroups[rcg[0]]
@@ -518,52 +658,19 @@ class NeoNavigationDock(QDockWidget, Ui_neoNavigationDock):
             rcg_list, all_rcgs,
             self.parent.get_active_filters('Recording Channel Group'))
         self.populate_neo_channel_group_list()
-
-        selection = QItemSelection()
-        for i in self.channelgroup_model.findItems(
-                '*', Qt.MatchWrap | Qt.MatchWildcard):
-            rcg = i.data(Qt.UserRole)
-            if not rcg.block in block_list:
-                continue
-
-            rcg_idx = rcg.block.recordingchannelgroups.index(rcg)
-            block_idx = block_list.index(rcg.block)
-            if [rcg_idx, block_idx] in data['channel_groups']:
-                selection.append(QItemSelectionRange(
-                    self.channelgroup_model.indexFromItem(i)))
-        self.neoChannelGroupList.selectionModel().select(
-            selection, QItemSelectionModel.ClearAndSelect)
+        self._select_objects(self.neoChannelGroupList, rcg_list)
 
         # Select channels
         rc_list = [rcg_list[rc[1]].recordingchannels[rc[0]]
                    for rc in data['channels']]
         all_rcs = []
-        for rcg in self.recording_channel_groups():
-            for rc in rcg.recordingchannels:
-                if not api.config.duplicate_channels and rc in all_rcs:
-                    continue
-                all_rcs.append(rc)
+        for rcs in self._channel_groups().itervalues():
+            all_rcs.extend(rcs)
         self.ensure_not_filtered(
             rc_list, all_rcs,
             self.parent.get_active_filters('Recording Channel'))
         self.populate_neo_channel_list()
-
-        selection = QItemSelection()
-        rcg_set = set(rcg_list)
-        for i in self.channel_model.findItems(
-                '*', Qt.MatchWrap | Qt.MatchWildcard):
-            channel = i.data(Qt.UserRole)
-            if not set(channel.recordingchannelgroups).intersection(rcg_set):
-                continue
-
-            for rcg in channel.recordingchannelgroups:
-                if [rcg.recordingchannels.index(channel),
-                        rcg_list.index(rcg)] in data['channels']:
-                    selection.append(QItemSelectionRange(
-                        self.channel_model.indexFromItem(i)))
-                    break
-        self.neoChannelList.selectionModel().select(
-            selection, QItemSelectionModel.ClearAndSelect)
+        self._select_objects(self.neoChannelList, rc_list)
 
         # Select units
         unit_list = [rcg_list[u[1]].units[u[0]]
@@ -575,20 +682,6 @@ class NeoNavigationDock(QDockWidget, Ui_neoNavigationDock):
             unit_list, all_units,
             self.parent.get_active_filters('Unit'))
         self.populate_neo_unit_list()
-
-        selection = QItemSelection()
-        for i in self.unit_model.findItems(
-                '*', Qt.MatchWrap | Qt.MatchWildcard):
-            unit = i.data(Qt.UserRole)
-            if unit.recordingchannelgroup not in rcg_list:
-                continue
-
-            rcg_idx = rcg_list.index(unit.recordingchannelgroup)
-            unit_idx = unit.recordingchannelgroup.units.index(unit)
-            if [unit_idx, rcg_idx] in data['units']:
-                selection.append(QItemSelectionRange(
-                    self.unit_model.indexFromItem(i)))
-        self.neoUnitList.selectionModel().select(
-            selection, QItemSelectionModel.ClearAndSelect)
+        self._select_objects(self.neoUnitList, unit_list)
 
         self.parent.refresh_filters()
\ No newline at end of file
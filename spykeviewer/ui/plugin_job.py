@@ -0,0 +1,193 @@
+import sys
+import threading
+
+from PyQt4.QtCore import QThread, QCoreApplication, pyqtSignal
+
+from spykeutils.progress_indicator import ProgressIndicator, CancelException
+
+from ..plugin_framework.result_cache import cached_compute
+
+
+def supports_background(plugin):
+    """ Return if a plugin can be run as a background job. This is the
+    case if it implements ``compute(current, selections)``, which
+    returns a result without creating any GUI elements, and
+    ``plot_result(result)``, which displays a result.
+    """
+    return hasattr(plugin, 'compute') and hasattr(plugin, 'plot_result')
+
+
+class JobProgress(ProgressIndicator):
+    """ Progress indicator for a :class:`PluginJob`. Progress is
+    reported through signals of the job, so it can be used in the
+    worker thread. Raises a
+    :class:`spykeutils.progress_indicator.CancelException` when the
+    job has been cancelled.
+    """
+    def __init__(self, job):
+        self.job = job
+        self.ticks = 0
+        self.steps = 0
+
+    def set_ticks(self, ticks):
+        self.ticks = ticks
+        self.steps = 0
+        self.job.progress_changed.emit(self.steps, self.ticks)
+
+    def begin(self, title=''):
+        self._check_cancel()
+        self.job.status_changed.emit(title)
+
+    def step(self, num_steps=1):
+        self._check_cancel()
+        self.steps += num_steps
+        self.job.progress_changed.emit(self.steps, self.ticks)
+
+    def set_status(self, new_status):
+        self._check_cancel()
+        self.job.status_changed.emit(new_status)
+
+    def _check_cancel(self):
+        if self.job.is_cancelled():
+            raise CancelException()
+
+
+class PluginJob(QThread):
+    """ Runs the ``compute`` method of a plugin in a worker thread. The
+    job also acts as a handle to the result, similar to a future:
+    :meth:`done`, :meth:`result`, :meth:`exception` and :meth:`cancel`
+    can be used from the console or other plugins.
+
+    The job uses a copy of the plugin, so changing the configuration
+    while the job is running has no effect on the result.
+
+    Signals:
+
+    * ``progress_changed(int, int)``: Emitted with the number of completed
+      steps and the total number of steps.
+    * ``status_changed(str)``: Emitted when the status description
+      changes.
+    * ``cancel_requested()``: Emitted when :meth:`cancel` is called.
+    """
+    progress_changed = pyqtSignal(int, int)
+    status_changed = pyqtSignal(str)
+    cancel_requested = pyqtSignal()
+
+    def __init__(self, plugin, current, selections, parent=None):
+        """ Create a new job. The job does not start running until
+        ``start()`` is called.
+
+        :param plugin: The plugin to run. It needs to support background
+            execution, see :func:`supports_background`.
+        :param function current: Creates the data provider to use as
+            current selection given a progress indicator.
+        :param list selections: A list of functions, each creating a
+            data provider given a progress indicator.
+        """
+        QThread.__init__(self, parent)
+        self.plugin = type(plugin)()
+        self.plugin.set_parameters(plugin.get_parameters())
+        self.plugin.source_file = plugin.source_file
+        self.name = plugin.get_name()
+
+        self.progress = JobProgress(self)
+        self.current = current(self.progress)
+        self.selections = [s(self.progress) for s in selections]
+
+        self._result = None
+        self._exc_info = None
+        self._cancelled = False
+        self._done = threading.Event()
+
+    def run(self):
+        try:
+            if self._cancelled:
+                raise CancelException()
+            self._result = cached_compute(
+                self.plugin, self.current, self.selections)
+        except CancelException:
+            self._cancelled = True
+        except Exception:
+            self._exc_info = sys.exc_info()
+        finally:
+            self._done.set()
+
+    def cancel(self):
+        """ Cancel the job. A job that has not been started is done
+        immediately, a running job stops the next time it reports
+        progress.
+        """
+        self._cancelled = True
+        if not self.isRunning() and not self.isFinished():
+            self._done.set()
+        self.cancel_requested.emit()
+
+    def is_started(self):
+        """ Return if the job has been started.
+        """
+        return self.isRunning() or self.isFinished()
+
+    def is_cancelled(self):
+        """ Return if the job has been cancelled.
+        """
+        return self._cancelled
+
+    def done(self):
+        """ Return if the job has finished, was cancelled or raised an
+        exception.
+        """
+        return self._done.is_set()
+
+    def wait_done(self, timeout=None):
+        """ Wait until the job is done. Events are processed while waiting
+        in the GUI thread, so other jobs can be started and finished.
+
+        :param float timeout: Maximum time to wait in seconds. If ``None``,
+            wait until the job is done.
+        :returns: bool -- ``True`` if the job is done.
+        """
+        app = QCoreApplication.instance()
+        if app is None or QThread.currentThread() != app.thread():
+            return self._done.wait(timeout)
+
+        waited = 0.0
+        while not self._done.is_set():
+            if timeout is not None and waited >= timeout:
+                break
+            QCoreApplication.processEvents()
+            self._done.wait(0.05)
+            waited += 0.05
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """ Return the result of the ``compute`` method of the plugin.
+        Waits until the job is done.
+
+        :param float timeout: Maximum time to wait in seconds. If ``None``,
+            wait until the job is done.
+        :raises: The exception raised by the plugin,
+            :class:`spykeutils.progress_indicator.CancelException` if the
+            job was cancelled, or :class:`RuntimeError` if the timeout was
+            reached.
+        """
+        if not self.wait_done(timeout):
+            raise RuntimeError('Plugin job "%s" is not done' % self.name)
+        if self._cancelled:
+            raise CancelException()
+        if self._exc_info:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+    def exception(self):
+        """ Return the exception raised by the plugin or ``None``.
+        Does not wait for the job to finish.
+        """
+        if self._exc_info:
+            return self._exc_info[1]
+        return None
+
+    def exc_info(self):
+        """ Return the exception information tuple of the exception raised
+        by the plugin (as returned by ``sys.exc_info()``) or ``None``.
+        """
+        return self._exc_info
@@ -11,8 +11,8 @@ class PluginModel(PluginManager, QAbstractItemModel):
     DataRole = Qt.UserRole
     FilePathRole = Qt.UserRole + 1
 
-    def __init__(self, parent=None):
-        PluginManager.__init__(self)
+    def __init__(self, manifest_path=None, parent=None):
+        PluginManager.__init__(self, manifest_path)
         QAbstractItemModel.__init__(self, parent)
 
     def columnCount(self, parent):
@@ -40,7 +40,9 @@ class PluginModel(PluginManager, QAbstractItemModel):
         if not index.isValid():
             return Qt.NoItemFlags
 
-        if not index.internalPointer().data:
+        # Do not access the data attribute here, it would load plugins
+        # that were found in the manifest
+        if isinstance(index.internalPointer(), PluginManager.DirNode):
             return Qt.NoItemFlags
         return Qt.ItemIsEnabled | Qt.ItemIsSelectable
 
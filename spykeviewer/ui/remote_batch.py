@@ -0,0 +1,99 @@
+import os
+
+from PyQt4.QtCore import QObject, pyqtSignal
+
+from worker_pool import WorkerPool
+
+
+def _file_times(directory):
+    """ Return a dictionary of modification times for all files in a
+    directory and its subdirectories, indexed by path.
+    """
+    times = {}
+    if not directory or not os.path.isdir(directory):
+        return times
+    for root, _, files in os.walk(directory):
+        for f in files:
+            p = os.path.join(root, f)
+            try:
+                times[p] = os.path.getmtime(p)
+            except OSError:
+                pass
+    return times
+
+
+class RemoteBatch(QObject):
+    """ Runs one plugin for a number of selections in parallel worker
+    processes. The batch uses its own
+    :class:`worker_pool.WorkerPool`. The worker processes exit when
+    all jobs are done and all windows created by the plugins are closed.
+
+    Signals:
+
+    * ``job_finished(int, bool)``: Emitted with the job id and ``True``
+      if the plugin finished successfully.
+    * ``finished()``: Emitted when all jobs are done.
+    """
+    job_finished = pyqtSignal(int, bool)
+    finished = pyqtSignal()
+
+    def __init__(self, script, jobs, max_workers, data_dir, parent=None):
+        """ Create and start a new batch.
+
+        :param str script: Path of the worker script.
+        :param list jobs: Job dictionaries for the worker processes.
+        :param int max_workers: Maximum number of worker processes.
+        :param str data_dir: The data directory of the plugins. Files in
+            this directory that are created or modified while the batch
+            is running are included in the summary.
+        """
+        QObject.__init__(self, parent)
+        self.job_ids = [j['id'] for j in jobs]
+        self.pending = set(self.job_ids)
+        self.failed = set()
+        self.data_dir = data_dir
+        self.file_times = _file_times(data_dir)
+        self.files = []
+
+        self.pool = WorkerPool(script, max_workers, self)
+        self.pool.job_failed.connect(self.failed.add)
+        self.pool.job_done.connect(self._job_done)
+        for j in jobs:
+            self.pool.submit(j)
+
+    def _job_done(self, job_id):
+        if job_id not in self.pending:
+            return
+        self.pending.remove(job_id)
+        self.job_finished.emit(job_id, job_id not in self.failed)
+
+        if not self.pending:
+            self.pool.stop()
+            new_times = _file_times(self.data_dir)
+            self.files = sorted(p for p, t in new_times.iteritems()
+                                if self.file_times.get(p) != t)
+            self.finished.emit()
+
+    def done(self):
+        """ Return if all jobs are done.
+        """
+        return not self.pending
+
+    def summary(self):
+        """ Return a dictionary describing the batch:
+
+        * ``jobs``: List of job ids in the order of the selections.
+        * ``finished``: List of ids of jobs that finished successfully.
+        * ``failed``: List of ids of jobs that failed.
+        * ``pending``: List of ids of jobs that are not done yet.
+        * ``files``: List of files in the data directory that were created
+          or modified while the batch was running. Only available when
+          all jobs are done.
+        """
+        return {
+            'jobs': list(self.job_ids),
+            'finished': [i for i in self.job_ids
+                         if i not in self.pending and i not in self.failed],
+            'failed': [i for i in self.job_ids if i in self.failed],
+            'pending': [i for i in self.job_ids if i in self.pending],
+            'files': list(self.files)}
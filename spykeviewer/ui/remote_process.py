@@ -0,0 +1,96 @@
+import sip
+from PyQt4.QtCore import QObject, QProcess, pyqtSignal
+
+
+class RemoteProcess(QObject):
+    """ Supervises a remotely started plugin process. Output is read
+    whenever it is available, split into lines and decoded as UTF-8.
+
+    Signals:
+
+    * ``output_std(int, str)``: A line of standard output.
+    * ``output_err(int, str)``: A line of error output.
+    * ``execution_complete(int)``: The process exited or could not be
+      started.
+    """
+    output_std = pyqtSignal(int, str)
+    output_err = pyqtSignal(int, str)
+    execution_complete = pyqtSignal(int)
+
+    def __init__(self, id_code, command, parent=None, input_data=None):
+        """ Create and start a new process.
+
+        :param int id_code: Identifier used in all signals.
+        :param list command: The program to start, followed by its
+            arguments.
+        :param str input_data: Data written to the standard input of the
+            process. The input is closed afterwards. If ``None``, the
+            input stays open.
+        """
+        QObject.__init__(self, parent)
+        self.id = id_code
+        self.buffers = {QProcess.StandardOutput: '',
+                        QProcess.StandardError: ''}
+        self.complete = False
+
+        self.process = QProcess(self)
+        self.process.readyReadStandardOutput.connect(
+            lambda: self._read(QProcess.StandardOutput))
+        self.process.readyReadStandardError.connect(
+            lambda: self._read(QProcess.StandardError))
+        self.process.finished.connect(lambda: self._finished())
+        self.process.error.connect(self._error)
+        self.process.start(command[0], command[1:])
+        if input_data is not None:
+            self.process.write(input_data)
+            self.process.closeWriteChannel()
+
+    def is_running(self):
+        """ Return if the process is still running.
+        """
+        return not self.complete
+
+    def detach(self):
+        """ Stop receiving output and signals from the process. The
+        process is not killed when this object is destroyed, so it can
+        keep running after Spyke Viewer exits.
+        """
+        self.process.closeWriteChannel()
+        for signal in (self.process.readyReadStandardOutput,
+                       self.process.readyReadStandardError,
+                       self.process.finished, self.process.error):
+            signal.disconnect()
+        self.process.setParent(None)
+        # Without an owner, the process object is never deleted
+        sip.transferto(self.process, None)
+
+    def _read(self, channel):
+        self.process.setReadChannel(channel)
+        data = str(self.process.readAll())
+        lines = (self.buffers[channel] + data).split('\n')
+        self.buffers[channel] = lines.pop()
+        for line in lines:
+            self._line(channel, line)
+
+    def _line(self, channel, line):
+        line = line.rstrip().decode('utf-8', 'replace')
+        if channel == QProcess.StandardOutput:
+            self.output_std.emit(self.id, line)
+        else:
+            self.output_err.emit(self.id, line)
+
+    def _error(self, error):
+        if error == QProcess.FailedToStart:
+            self.output_err.emit(self.id, 'Could not start remote script')
+            self._finished()
+
+    def _finished(self):
+        if self.complete:
+            return
+        for channel in self.buffers:
+            self._read(channel)
+            rest, self.buffers[channel] = self.buffers[channel], ''
+            if rest:
+                self._line(channel, rest)
+        self.complete = True
+        self.execution_complete.emit(self.id)
@@ -0,0 +1,212 @@
+import json
+
+import sip
+from PyQt4.QtCore import QObject, QProcess, pyqtSignal
+
+from ..plugin_framework.plugin_worker import split_marker
+
+
+class WorkerProcess(QObject):
+    """ A persistent worker process running
+    :mod:`spykeviewer.plugin_framework.plugin_worker`. Output lines are
+    decoded as UTF-8 and attributed to the job that is currently running.
+    """
+    def __init__(self, pool, command):
+        QObject.__init__(self, pool)
+        self.pool = pool
+        self.job_id = None
+        self.job_failed = False
+        self.buffers = {QProcess.StandardOutput: '',
+                        QProcess.StandardError: ''}
+        self.markers = set()
+
+        self.process = QProcess(self)
+        self.process.readyReadStandardOutput.connect(
+            lambda: self._read(QProcess.StandardOutput))
+        self.process.readyReadStandardError.connect(
+            lambda: self._read(QProcess.StandardError))
+        self.process.finished.connect(lambda: self._finished())
+        self.process.error.connect(self._error)
+        self.process.start(command[0], command[1:])
+
+    def is_busy(self):
+        return self.job_id is not None
+
+    def run(self, job):
+        """ Send a job to the worker process.
+        """
+        self.job_id = job['id']
+        self.job_failed = False
+        self.markers.clear()
+        self.process.write(json.dumps(job) + '\n')
+
+    def stop(self):
+        """ Close the input of the worker, it exits after the current
+        job is finished.
+        """
+        self.process.closeWriteChannel()
+
+    def detach(self):
+        """ Stop receiving output and signals from the worker process. The
+        process is not killed when this object is destroyed, so it can
+        finish its current job and keep windows open after Spyke Viewer
+        exits.
+        """
+        self.stop()
+        for signal in (self.process.readyReadStandardOutput,
+                       self.process.readyReadStandardError,
+                       self.process.finished, self.process.error):
+            signal.disconnect()
+        self.process.setParent(None)
+        # Without an owner, the process object is never deleted
+        sip.transferto(self.process, None)
+
+    def _read(self, channel):
+        self.process.setReadChannel(channel)
+        data = str(self.process.readAll())
+        lines = (self.buffers[channel] + data).split('\n')
+        self.buffers[channel] = lines.pop()
+        for line in lines:
+            self._line(channel, line.rstrip('\r').decode('utf-8', 'replace'))
+
+    def _line(self, channel, line):
+        # The marker can follow output without newline, e.g. from
+        # extension modules that write to the stream directly
+        text, marker = split_marker(line)
+        if marker is not None:
+            if text:
+                self._output(channel, text)
+            if marker[1] != 'ok':
+                self.job_failed = True
+            self.markers.add(channel)
+            if len(self.markers) == 2:
+                self._job_done()
+            return
+        self._output(channel, line)
+
+    def _output(self, channel, line):
+        if self.job_id is None:
+            return
+        if channel == QProcess.StandardOutput:
+            self.pool.output_std.emit(self.job_id, line)
+        else:
+            self.pool.output_err.emit(self.job_id, line)
+
+    def _job_done(self):
+        job_id = self.job_id
+        self.job_id = None
+        if self.job_failed:
+            self.pool.job_failed.emit(job_id)
+        self.pool.job_done.emit(job_id)
+        self.pool.worker_idle(self)
+
+    def _error(self, error):
+        if error == QProcess.FailedToStart:
+            self._finished(failed=True)
+
+    def _finished(self, failed=False):
+        for channel, rest in self.buffers.items():
+            if rest:
+                self._line(channel, rest.decode('utf-8', 'replace'))
+        if self.job_id is not None:
+            if failed:
+                message = 'Could not start worker process'
+            else:
+                message = 'Worker process exited unexpectedly'
+            self.pool.output_err.emit(self.job_id, message)
+            job_id = self.job_id
+            self.job_id = None
+            self.pool.job_failed.emit(job_id)
+            self.pool.job_done.emit(job_id)
+        self.pool.worker_finished(self, failed)
+
+
+class WorkerPool(QObject):
+    """ Pool of persistent worker processes for remote plugin execution.
+    Jobs are queued and sent to idle workers. Workers are started when
+    they are needed, up to a maximum number.
+
+    Signals:
+
+    * ``output_std(int, str)``: A line of standard output of a job.
+    * ``output_err(int, str)``: A line of error output of a job.
+    * ``job_failed(int)``: A job did not finish successfully. Emitted
+      before ``job_done``.
+    * ``job_done(int)``: A job is finished.
+    """
+    output_std = pyqtSignal(int, str)
+    output_err = pyqtSignal(int, str)
+    job_failed = pyqtSignal(int)
+    job_done = pyqtSignal(int)
+
+    def __init__(self, script, max_workers, parent=None):
+        """ Create a new pool.
+
+        :param str script: Path of the worker script.
+        :param int max_workers: Maximum number of worker processes.
+        """
+        QObject.__init__(self, parent)
+        self.script = script
+        self.max_workers = max_workers
+        self.workers = []
+        self.queue = []
+
+    def submit(self, job):
+        """ Queue a job. The job is a dictionary that is sent to the
+        worker, it needs to include an ``id`` entry.
+        """
+        self.queue.append(job)
+        self._dispatch()
+
+    def worker_idle(self, worker):
+        self._dispatch()
+
+    def worker_finished(self, worker, failed=False):
+        if worker in self.workers:
+            self.workers.remove(worker)
+        if failed and not self.workers:
+            # No worker can be started, so queued jobs cannot run
+            queue, self.queue = self.queue, []
+            for job in queue:
+                self.output_err.emit(
+                    job['id'], 'Could not start worker process')
+                self.job_failed.emit(job['id'])
+                self.job_done.emit(job['id'])
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.queue:
+            idle = [w for w in self.workers if not w.is_busy()]
+            if idle:
+                worker = idle[0]
+            elif len(self.workers) < max(1, self.max_workers):
+                # Workers run at the same time, so plugins in them
+                # should not start further processes
+                worker = WorkerProcess(
+                    self, ['python', '-u', self.script, '-ap', '1'])
+                self.workers.append(worker)
+            else:
+                return
+            worker.run(self.queue.pop(0))
+
+    def stop(self):
+        """ Close the input of all worker processes. Each worker exits
+        when its current job is done and all windows it created are
+        closed. Queued jobs are discarded.
+        """
+        self.queue = []
+        for w in self.workers:
+            w.stop()
+
+    def shutdown(self):
+        """ Release all worker processes without waiting for them. Queued
+        jobs are discarded. Like with :meth:`stop`, each worker exits when
+        its current job is done and all windows it created are closed,
+        even if the pool is destroyed before.
+        """
+        self.queue = []
+        for w in self.workers:
+            w.stop()
+        for w in self.workers:
+            w.detach()
+        self.workers = []